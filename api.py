@@ -1,12 +1,345 @@
 """
 API routes for form submissions
 """
-from flask import Blueprint, request, jsonify
-from models import db, ContactSubmission, QuoteSubmission
-from datetime import datetime
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from sqlalchemy import and_, or_, select, text, union_all, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from werkzeug.datastructures import MultiDict
+from models import (
+    db, ContactSubmission, QuoteSubmission, SubmissionDedupe, SubmissionStats,
+    ARCHIVES, SEARCH_COLUMNS, STATS_ROW_ID, SUBMISSION_MODELS, read_stats, search_table
+)
+from dedupe import dedupe_key
+from events import CLOSED, publish_change, publish_submissions
+from metrics import EXPOSITION_CONTENT_TYPE
+from rate_limit import client_address
+from outbox import queue_notifications, wake_outbox
+from serialize import dumps, encode_rows, row_fields
+from datetime import datetime, timedelta, timezone
+import csv
+import html
+import io
+import itertools
+import json
+import re
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+# Submission list paging
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Columns each list endpoint accepts exact-match filters on
+LIST_FILTERS = {
+    'contact': ('project_type',),
+    'quote': ('package',)
+}
+
+def parse_bool(value):
+    """Parse a boolean query parameter ('true'/'false', '1'/'0')"""
+    lowered = value.strip().lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(f'Invalid boolean value: {value}')
+
+# Largest SQLite INTEGER; a cursor id beyond it cannot be bound as a parameter
+MAX_ROW_ID = 2 ** 63 - 1
+
+def parse_row_id(value):
+    """Parse the id part of a cursor (ValueError if not a SQLite-sized integer)"""
+    row_id = int(value)
+    if abs(row_id) > MAX_ROW_ID:
+        raise ValueError(f'Id out of range: {value}')
+    return row_id
+
+def encode_cursor(submission):
+    """Encode a row's (submitted_at, id) position as a 'before' cursor"""
+    return f'{submission.submitted_at.isoformat()}_{submission.id}'
+
+def decode_cursor(cursor):
+    """Decode a 'before' cursor into (submitted_at, id)"""
+    timestamp, _, submission_id = cursor.rpartition('_')
+    try:
+        return datetime.fromisoformat(timestamp), parse_row_id(submission_id)
+    except ValueError:
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+def _page_select(table, fields, filter_fields, args, limit):
+    """Newest-first page query on one table, selecting fields"""
+    statement = select(*[table.c[name] for name in fields])
+    read = args.get('read')
+    if read is not None:
+        statement = statement.where(table.c.read == parse_bool(read))
+    for field in filter_fields:
+        value = args.get(field)
+        if value:
+            statement = statement.where(table.c[field] == value)
+
+    before = args.get('before')
+    if before:
+        submitted_at, submission_id = decode_cursor(before)
+        statement = statement.where(or_(
+            table.c.submitted_at < submitted_at,
+            and_(table.c.submitted_at == submitted_at, table.c.id < submission_id)
+        ))
+
+    return statement.order_by(table.c.submitted_at.desc(), table.c.id.desc()).limit(limit + 1)
+
+def submission_page_statement(model, filter_fields, args):
+    """
+    Build the query for one page of submissions, newest first
+
+    Only the model's columns are selected (see serialize.row_fields), as
+    plain rows: no ORM objects are loaded. One row more than the page size
+    is fetched to tell whether another page exists. With include_archived
+    the page is merged from the newest rows of the hot and archive tables
+    (ids are shared, so cursors work across both).
+
+    Args:
+        model: Submission model to list
+        filter_fields: Columns that accept exact-match filters
+        args: Query parameters (see list_submissions)
+
+    Returns:
+        (select statement, page size)
+
+    Raises:
+        ValueError: If a query parameter is malformed
+    """
+    limit = args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    fields = row_fields(model)
+
+    statement = _page_select(model.__table__, fields, filter_fields, args, limit)
+    if parse_bool(args.get('include_archived', 'false')):
+        archived = _page_select(ARCHIVES[model].__table__, fields, filter_fields, args, limit)
+        merged = union_all(select(statement.subquery()), select(archived.subquery())).subquery()
+        statement = (
+            select(*[merged.c[name] for name in fields])
+            .order_by(merged.c.submitted_at.desc(), merged.c.id.desc())
+            .limit(limit + 1)
+        )
+    return statement, limit
+
+def encode_submission_page(model, rows, limit):
+    """
+    Encode fetched page rows straight to JSON bytes (see serialize.py)
+
+    Returns:
+        JSON bytes of {success, submissions, has_more, next_before}
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_before = encode_cursor(rows[-1]) if has_more else None
+    return b'{"has_more":%s,"next_before":%s,"submissions":%s,"success":true}' % (
+        b'true' if has_more else b'false', dumps(next_before), encode_rows(row_fields(model), rows)
+    )
+
+def list_submissions(model, filter_fields, args=None):
+    """
+    Return one page of submissions, newest first, using keyset pagination
+
+    Args:
+        model: Submission model to list
+        filter_fields: Columns that accept exact-match filters
+        args: Parameters to use instead of the request's query string
+
+    Query parameters:
+        limit: Page size (default 50, max 200)
+        before: Cursor from a previous page's 'next_before'
+        read: Only read ('true') or unread ('false') submissions
+        include_archived: Also list archived submissions ('true')
+        <filter_fields>: Exact-match filters on the given columns
+
+    Returns:
+        JSON bytes of {success, submissions, has_more, next_before}
+
+    Raises:
+        ValueError: If a query parameter is malformed
+    """
+    statement, limit = submission_page_statement(model, filter_fields, request.args if args is None else args)
+    # Through the session's connection: plain Core rows, skipping the ORM result machinery
+    rows = db.session.connection().execute(statement).all()
+    return encode_submission_page(model, rows, limit)
+
+def json_response(body, status=200):
+    """Response for already-encoded JSON bytes"""
+    return Response(body, status=status, mimetype='application/json')
+
+@api_bp.before_request
+def shed_excess_submissions():
+    """Reject form POSTs over the rate limit before the body is parsed"""
+    limiter = current_app.extensions.get('rate_limiter')
+    if limiter is None or request.method != 'POST':
+        return None
+    if request.endpoint not in current_app.config['RATE_LIMIT_ENDPOINTS']:
+        return None
+
+    client = client_address(
+        request.remote_addr,
+        request.headers.get('X-Forwarded-For'),
+        current_app.config['RATE_LIMIT_PROXY_HOPS']
+    )
+    allowed, retry_after = limiter.check(client or 'unknown')
+    if allowed:
+        return None
+
+    response = jsonify({'error': 'Too many requests, please try again shortly'})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+# Expired dedupe keys are purged once every this many stored submissions
+DEDUPE_PURGE_EVERY = 100
+_dedupe_writes = itertools.count(1)
+
+def find_duplicate(key):
+    """Return the id a repeat of an unexpired dedupe key is answered with, or None"""
+    entry = db.session.get(SubmissionDedupe, key)
+    if entry is not None and entry.expires_at > datetime.utcnow():
+        return entry.provisional_id or entry.submission_id
+    return None
+
+def claim_dedupe_key(key, kind, ttl):
+    """
+    Reserve a dedupe key in the current transaction, before its submission is stored
+
+    The row is written with a plain INSERT (no upsert), so of several
+    concurrent requests with the same key only the first stores a
+    submission; the others wait for its commit and read its id.
+
+    Returns:
+        None if the key was claimed (the caller fills in submission_id),
+        else the id the submission already stored under it was acknowledged with
+    """
+    now = datetime.utcnow()
+    SubmissionDedupe.query.filter(
+        SubmissionDedupe.key == key,
+        SubmissionDedupe.expires_at <= now
+    ).delete(synchronize_session=False)
+    result = db.session.execute(
+        sqlite_insert(SubmissionDedupe)
+        .values(key=key, kind=kind, submission_id=0, expires_at=now + timedelta(seconds=ttl))
+        .on_conflict_do_nothing(index_elements=['key'])
+    )
+    if result.rowcount:
+        return None
+    row = db.session.execute(
+        select(SubmissionDedupe.submission_id, SubmissionDedupe.provisional_id)
+        .where(SubmissionDedupe.key == key)
+    ).one()
+    return row.provisional_id or row.submission_id
+
+def save_submission(kind, fields, content, message):
+    """
+    Store a validated submission, or answer a repeat with the original id
+
+    Repeats are matched on the Idempotency-Key header, or on a hash of the
+    normalized email and content within a short window (see dedupe.py).
+
+    Args:
+        kind: 'contact' or 'quote'
+        fields: Column values for the submission model
+        content: Message body used for the content hash
+        message: Success message for the response
+    """
+    key, ttl = dedupe_key(kind, request.headers.get('Idempotency-Key'), fields['email'], content)
+    original_id = find_duplicate(key)
+    if original_id is not None:
+        return jsonify({'success': True, 'message': message, 'id': original_id, 'duplicate': True}), 200
+
+    # Queue mode: acknowledge now, the ingest writer commits in batches
+    ingest = current_app.extensions.get('ingest')
+    if ingest is not None:
+        return jsonify({
+            'success': True,
+            'message': message,
+            'id': ingest.submit(kind, fields, dedupe=(key, ttl)),
+            'queued': True
+        }), 202
+
+    # Claim the key, then create the submission and its notification, in one
+    # transaction; a concurrent repeat conflicts on the key and gets the winner's id
+    original_id = claim_dedupe_key(key, kind, ttl)
+    if original_id is not None:
+        db.session.rollback()
+        return jsonify({'success': True, 'message': message, 'id': original_id, 'duplicate': True}), 200
+    submission = SUBMISSION_MODELS[kind](**fields)
+    db.session.add(submission)
+    db.session.flush()
+    db.session.execute(
+        update(SubmissionDedupe)
+        .where(SubmissionDedupe.key == key)
+        .values(submission_id=submission.id)
+    )
+    published = submission.to_dict()
+    queue_notifications([(kind, published)])
+    db.session.commit()
+
+    if next(_dedupe_writes) % DEDUPE_PURGE_EVERY == 0:
+        SubmissionDedupe.query.filter(SubmissionDedupe.expires_at <= datetime.utcnow()).delete()
+        db.session.commit()
+
+    publish_submissions([(kind, published)])
+    wake_outbox()
+    return jsonify({
+        'success': True,
+        'message': message,
+        'id': published['id']
+    }), 201
+
+def contact_fields(data):
+    """
+    Validate a contact form body
+
+    Returns:
+        (column values for ContactSubmission, content used for dedupe)
+
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    if not data:
+        raise ValueError('No data received')
+    if not data.get('name') or not data.get('email') or not data.get('message'):
+        raise ValueError('Missing required fields: name, email, and message are required')
+    fields = {
+        'name': data.get('name').strip(),
+        'email': data.get('email').strip(),
+        'project_type': data.get('project', '').strip() or None,
+        'message': data.get('message').strip()
+    }
+    return fields, fields['message']
+
+def quote_fields(data):
+    """
+    Validate a quote request body
+
+    Returns:
+        (column values for QuoteSubmission, content used for dedupe)
+
+    Raises:
+        ValueError: With the message for a 400 response
+    """
+    if not data:
+        raise ValueError('No data received')
+    if not data.get('name') or not data.get('email') or not data.get('project'):
+        raise ValueError('Missing required fields: name, email, and project are required')
+    fields = {
+        'name': data.get('name').strip(),
+        'email': data.get('email').strip(),
+        'package': data.get('package', '').strip() or None,
+        'project_details': data.get('project').strip()
+    }
+    return fields, fields['project_details']
+
+# Validator and success message per form (shared with asgi.py)
+SUBMIT_FORMS = {
+    'contact': (contact_fields, 'Thank you! Your message has been received.'),
+    'quote': (quote_fields, 'Thank you! Your quote request has been received.')
+}
+
 @api_bp.route('/test', methods=['GET'])
 def test_api():
     """Test endpoint to verify API is working"""
@@ -19,40 +352,21 @@ def submit_contact():
         # Handle preflight request
         response = jsonify({'status': 'ok'})
         response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Idempotency-Key')
         response.headers.add('Access-Control-Allow-Methods', 'POST')
         return response
     
     try:
-        # Get JSON data
         if not request.is_json:
             return jsonify({'error': 'Content-Type must be application/json'}), 400
         
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No data received'}), 400
-        
-        # Validate required fields
-        if not data.get('name') or not data.get('email') or not data.get('message'):
-            return jsonify({'error': 'Missing required fields: name, email, and message are required'}), 400
-        
-        # Create submission
-        submission = ContactSubmission(
-            name=data.get('name').strip(),
-            email=data.get('email').strip(),
-            project_type=data.get('project', '').strip() or None,
-            message=data.get('message').strip()
-        )
-        
-        db.session.add(submission)
-        db.session.commit()
+        validate, message = SUBMIT_FORMS['contact']
+        try:
+            fields, content = validate(request.get_json())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        return jsonify({
-            'success': True,
-            'message': 'Thank you! Your message has been received.',
-            'id': submission.id
-        }), 201
+        return save_submission('contact', fields, content, message)
         
     except Exception as e:
         db.session.rollback()
@@ -68,40 +382,21 @@ def submit_quote():
         # Handle preflight request
         response = jsonify({'status': 'ok'})
         response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Idempotency-Key')
         response.headers.add('Access-Control-Allow-Methods', 'POST')
         return response
     
     try:
-        # Get JSON data
         if not request.is_json:
             return jsonify({'error': 'Content-Type must be application/json'}), 400
         
-        data = request.get_json()
-        
-        if not data:
-            return jsonify({'error': 'No data received'}), 400
-        
-        # Validate required fields
-        if not data.get('name') or not data.get('email') or not data.get('project'):
-            return jsonify({'error': 'Missing required fields: name, email, and project are required'}), 400
+        validate, message = SUBMIT_FORMS['quote']
+        try:
+            fields, content = validate(request.get_json())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Create submission
-        submission = QuoteSubmission(
-            name=data.get('name').strip(),
-            email=data.get('email').strip(),
-            package=data.get('package', '').strip() or None,
-            project_details=data.get('project').strip()
-        )
-        
-        db.session.add(submission)
-        db.session.commit()
-        
-        return jsonify({
-            'success': True,
-            'message': 'Thank you! Your quote request has been received.',
-            'id': submission.id
-        }), 201
+        return save_submission('quote', fields, content, message)
         
     except Exception as e:
         db.session.rollback()
@@ -112,37 +407,188 @@ def submit_quote():
 
 @api_bp.route('/submissions/contact', methods=['GET'])
 def get_contact_submissions():
-    """Get all contact form submissions (admin only)"""
+    """Get a page of contact form submissions (admin only)"""
     try:
         # TODO: Add authentication here
-        submissions = ContactSubmission.query.order_by(ContactSubmission.submitted_at.desc()).all()
-        return jsonify({
-            'success': True,
-            'submissions': [s.to_dict() for s in submissions]
-        }), 200
+        return json_response(list_submissions(ContactSubmission, LIST_FILTERS['contact']))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch submissions', 'details': str(e)}), 500
 
 @api_bp.route('/submissions/quote', methods=['GET'])
 def get_quote_submissions():
-    """Get all quote form submissions (admin only)"""
+    """Get a page of quote form submissions (admin only)"""
     try:
         # TODO: Add authentication here
-        submissions = QuoteSubmission.query.order_by(QuoteSubmission.submitted_at.desc()).all()
+        return json_response(list_submissions(QuoteSubmission, LIST_FILTERS['quote']))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch submissions', 'details': str(e)}), 500
+
+# Full-text search: bm25 column weights (name, email, body) and snippet length
+SEARCH_WEIGHTS = (3.0, 3.0, 1.0)
+SEARCH_SNIPPET_TOKENS = 12
+# Word boundaries close to FTS5's unicode61 tokenizer
+_SEARCH_WORD = re.compile(r'\w+')
+
+def fts_query(q):
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix"""
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in q.split()]
+    if not terms:
+        raise ValueError('q is required')
+    return ' '.join(terms) + '*'
+
+def encode_search_cursor(score, kind, submission_id):
+    """Encode a result's (score, kind, id) position as an 'after' cursor"""
+    return f'{score!r}_{kind}_{submission_id}'
+
+def decode_search_cursor(cursor):
+    """Decode an 'after' cursor into (score, kind, id)"""
+    try:
+        score, kind, submission_id = cursor.split('_')
+        if kind not in SUBMISSION_MODELS:
+            raise ValueError
+        return float(score), kind, parse_row_id(submission_id)
+    except ValueError:
+        raise ValueError(f'Invalid cursor: {cursor}')
+
+def search_kind(kind, match, after, limit):
+    """
+    Return up to limit (score, kind, id) matches from one kind's index
+
+    Ordered by (score, kind, id) like the merged result list, starting
+    after the cursor position.
+    """
+    fts = search_table(kind)
+    score = f"bm25({fts}, {', '.join(map(str, SEARCH_WEIGHTS))})"
+    sql = f"SELECT rowid, {score} FROM {fts} WHERE {fts} MATCH :match"
+    params = {'match': match, 'limit': limit}
+    if after is not None:
+        after_score, after_kind, after_id = after
+        params.update(after_score=after_score, after_id=after_id)
+        if kind > after_kind:
+            sql += f" AND {score} >= :after_score"
+        elif kind == after_kind:
+            sql += f" AND ({score} > :after_score OR ({score} = :after_score AND rowid > :after_id))"
+        else:
+            sql += f" AND {score} > :after_score"
+    sql += f" ORDER BY {score}, rowid LIMIT :limit"
+    return [(row[1], kind, row[0]) for row in db.session.execute(text(sql), params)]
+
+def search_snippet(submission, kind, q):
+    """
+    Build an HTML-escaped snippet with matching words wrapped in <mark>
+
+    Built from the row already loaded for the response; FTS5's snippet()
+    would re-read the whole doclist of every term, which for common words
+    costs more than the ranking query itself.
+    """
+    terms = _SEARCH_WORD.findall(q.casefold())
+    if not terms:
+        return None
+
+    def matches(word):
+        word = word.casefold()
+        return word in terms[:-1] or word.startswith(terms[-1])
+
+    # Prefer the column with the most matching words
+    best = None
+    for column in SEARCH_COLUMNS[kind]:
+        text_value = getattr(submission, column) or ''
+        words = list(_SEARCH_WORD.finditer(text_value))
+        hits = [i for i, word in enumerate(words) if matches(word.group())]
+        if hits and (best is None or len(hits) > len(best[2])):
+            best = (text_value, words, hits)
+    if best is None:
+        return None
+
+    text_value, words, hits = best
+    first = max(0, hits[0] - 2)
+    last = min(len(words), first + SEARCH_SNIPPET_TOKENS)
+    parts = ['…'] if first > 0 else []
+    position = words[first].start()
+    for word in words[first:last]:
+        parts.append(html.escape(text_value[position:word.start()]))
+        if matches(word.group()):
+            parts.append(f'<mark>{html.escape(word.group())}</mark>')
+        else:
+            parts.append(html.escape(word.group()))
+        position = word.end()
+    if last < len(words):
+        parts.append('…')
+    return ''.join(parts)
+
+@api_bp.route('/submissions/search', methods=['GET'])
+def search_submissions():
+    """
+    Full-text search over submissions, best matches first (admin only)
+
+    Query parameters:
+        q: Words to find in name, email and message / project details;
+           the last word also matches as a prefix
+        kind: 'contact' or 'quote' (default both)
+        limit: Page size (default 50, max 200)
+        after: Cursor from a previous page's 'next_after'
+    """
+    # TODO: Add authentication here
+    if not current_app.extensions.get('search'):
+        return jsonify({'error': 'Full-text search needs SQLite with FTS5'}), 501
+
+    kind = request.args.get('kind')
+    if kind is not None and kind not in SEARCH_COLUMNS:
+        return jsonify({'error': f'Unknown submission kind: {kind}'}), 400
+    limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+
+    try:
+        q = request.args.get('q', '')
+        match = fts_query(q)
+        after = request.args.get('after')
+        after = decode_search_cursor(after) if after else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # Each index returns its own best limit + 1; merge and cut
+        matches = []
+        for search in ([kind] if kind else sorted(SEARCH_COLUMNS)):
+            matches.extend(search_kind(search, match, after, limit + 1))
+        matches.sort()
+        has_more = len(matches) > limit
+        matches = matches[:limit]
+
+        # Rows only for the page being returned
+        rows = {}
+        for search in {result_kind for _, result_kind, _ in matches}:
+            model = SUBMISSION_MODELS[search]
+            ids = [submission_id for _, result_kind, submission_id in matches if result_kind == search]
+            rows.update(((search, s.id), s) for s in model.query.filter(model.id.in_(ids)))
+
         return jsonify({
             'success': True,
-            'submissions': [s.to_dict() for s in submissions]
+            'results': [{
+                'kind': result_kind,
+                'score': score,
+                'snippet': search_snippet(rows[(result_kind, submission_id)], result_kind, q),
+                'submission': rows[(result_kind, submission_id)].to_dict()
+            } for score, result_kind, submission_id in matches if (result_kind, submission_id) in rows],
+            'has_more': has_more,
+            'next_after': encode_search_cursor(*matches[-1]) if has_more else None
         }), 200
     except Exception as e:
-        return jsonify({'error': 'Failed to fetch submissions', 'details': str(e)}), 500
+        return jsonify({'error': 'Search failed', 'details': str(e)}), 500
 
 @api_bp.route('/submissions/contact/<int:submission_id>/read', methods=['PUT'])
 def mark_contact_read(submission_id):
     """Mark a contact submission as read"""
     try:
         submission = ContactSubmission.query.get_or_404(submission_id)
+        changed = not submission.read
         submission.read = True
         db.session.commit()
+        if changed:
+            publish_change('read', 'contact', ids=[submission_id], read=True)
         return jsonify({'success': True}), 200
     except Exception as e:
         db.session.rollback()
@@ -153,38 +599,307 @@ def mark_quote_read(submission_id):
     """Mark a quote submission as read"""
     try:
         submission = QuoteSubmission.query.get_or_404(submission_id)
+        changed = not submission.read
         submission.read = True
         db.session.commit()
+        if changed:
+            publish_change('read', 'quote', ids=[submission_id], read=True)
         return jsonify({'success': True}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to update submission', 'details': str(e)}), 500
 
+# Most ids accepted by one bulk read-state update
+MAX_BULK_IDS = 1000
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp into a naive UTC datetime"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+@api_bp.route('/submissions/<kind>/read', methods=['PUT'])
+def bulk_mark_read(kind):
+    """
+    Set the read state of many submissions with a single UPDATE
+
+    JSON body:
+        ids: List of submission ids, or
+        before: ISO timestamp; every submission received before it
+        read: Target state (default true)
+    """
+    model = SUBMISSION_MODELS.get(kind)
+    if model is None:
+        return jsonify({'error': f'Unknown submission kind: {kind}'}), 404
+
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    before = data.get('before')
+    read = data.get('read', True)
+
+    if not isinstance(read, bool):
+        return jsonify({'error': 'read must be true or false'}), 400
+    if (ids is None) == (before is None):
+        return jsonify({'error': 'Provide exactly one of ids or before'}), 400
+
+    # Only touch rows whose state actually changes
+    query = model.query.filter(model.read != read)
+    if ids is not None:
+        if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+            return jsonify({'error': 'ids must be a list of integers'}), 400
+        if len(ids) > MAX_BULK_IDS:
+            return jsonify({'error': f'At most {MAX_BULK_IDS} ids per request'}), 400
+        query = query.filter(model.id.in_(ids))
+    else:
+        try:
+            query = query.filter(model.submitted_at < parse_timestamp(str(before)))
+        except ValueError:
+            return jsonify({'error': f'Invalid timestamp: {before}'}), 400
+
+    try:
+        updated = query.update({model.read: read}, synchronize_session=False)
+        db.session.commit()
+        if updated:
+            publish_change('read', kind, ids=ids, before=before, read=read, updated=updated)
+        return jsonify({'success': True, 'updated': updated}), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': 'Failed to update submissions', 'details': str(e)}), 500
+
+@api_bp.route('/rate-limit/stats', methods=['GET'])
+def get_rate_limit_stats():
+    """Get counters for requests allowed and shed by the rate limiter"""
+    limiter = current_app.extensions.get('rate_limiter')
+    return jsonify({
+        'success': True,
+        'enabled': limiter is not None,
+        'stats': limiter.stats() if limiter is not None else {}
+    }), 200
+
+@api_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Request and SQL metrics in the Prometheus text format"""
+    metrics = current_app.extensions.get('metrics')
+    if metrics is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), content_type=EXPOSITION_CONTENT_TYPE)
+
 @api_bp.route('/submissions/stats', methods=['GET'])
 def get_stats():
-    """Get submission statistics"""
+    """
+    Get submission statistics
+
+    Query parameters:
+        include_archived: Totals span the archive tables too, and
+            <kind>_archived counts are added ('true')
+    """
+    try:
+        include_archived = parse_bool(request.args.get('include_archived', 'false'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
-        contact_count = ContactSubmission.query.count()
-        quote_count = QuoteSubmission.query.count()
-        unread_contact = ContactSubmission.query.filter_by(read=False).count()
-        unread_quote = QuoteSubmission.query.filter_by(read=False).count()
-        
         return jsonify({
             'success': True,
-            'stats': {
-                'contact_total': contact_count,
-                'quote_total': quote_count,
-                'contact_unread': unread_contact,
-                'quote_unread': unread_quote
-            }
+            'stats': read_stats(include_archived)
         }), 200
     except Exception as e:
         return jsonify({'error': 'Failed to fetch stats', 'details': str(e)}), 500
 
+def generate_events(subscription, backlog, reset, keepalive):
+    """Yield SSE frames for one subscriber until it disconnects"""
+    try:
+        # Browsers reconnect after this many ms and resend Last-Event-ID
+        yield 'retry: 3000\n\n'
+        if reset:
+            yield 'event: reset\ndata: {}\n\n'
+        yield from backlog
+        while True:
+            if subscription.overflowed:
+                # Fell more than a buffer behind; let the client reload
+                yield 'event: reset\ndata: {}\n\n'
+                return
+            frame = subscription.get(keepalive)
+            if frame is CLOSED:
+                return
+            # A comment line keeps proxies from timing out an idle stream
+            yield frame if frame is not None else ': keepalive\n\n'
+    finally:
+        subscription.close()
+
+@api_bp.route('/submissions/stream', methods=['GET'])
+def stream_submissions():
+    """Push new-submission and read-state events as Server-Sent Events (admin only)"""
+    # TODO: Add authentication here
+    bus = current_app.extensions.get('events')
+    if bus is None:
+        return jsonify({'error': 'Event stream is disabled'}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = 0  # unknown id: resume as a reset
+
+    subscribed = bus.subscribe(last_event_id)
+    if subscribed is None:
+        response = jsonify({'error': 'Too many open event streams'})
+        response.headers['Retry-After'] = '30'
+        return response, 503
+
+    subscription, backlog, reset = subscribed
+    # The request context (and its teardown, which ends the in-flight
+    # count in metrics.py) lasts until the stream closes
+    response = Response(
+        stream_with_context(generate_events(subscription, backlog, reset, current_app.config['EVENTS_KEEPALIVE'])),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@api_bp.route('/submissions/stream/stats', methods=['GET'])
+def get_stream_stats():
+    """Get subscriber and event counters for the change feed"""
+    bus = current_app.extensions.get('events')
+    return jsonify({
+        'success': True,
+        'enabled': bus is not None,
+        'stats': bus.stats() if bus is not None else {}
+    }), 200
+
+def dashboard_etag(version, limit):
+    """ETag of the dashboard from the stats counters' version and the page size"""
+    return f'dashboard-{version}-{limit}'
+
+def dashboard_body(stats, contact_page, quote_page):
+    """Join the stats and two encoded list pages into the dashboard JSON"""
+    return b'{"contact":%s,"quote":%s,"stats":%s,"success":true}' % (contact_page, quote_page, dumps(stats))
+
+@api_bp.route('/dashboard', methods=['GET'])
+def get_dashboard():
+    """
+    Stats plus the newest page of each submission kind in one response
+
+    The ETag comes from the counters row's version, which the triggers
+    bump on every insert, delete and read-state change. A matching
+    If-None-Match is answered with 304 after that one primary-key lookup,
+    before any list query runs.
 
+    Query parameters:
+        limit: Page size for each list (default 50, max 200)
+    """
+    # TODO: Add authentication here
+    try:
+        limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+        counters = db.session.get(SubmissionStats, STATS_ROW_ID)
+        etag = dashboard_etag(counters.version, limit) if counters is not None else None
+        if etag is not None and etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            page_args = MultiDict({'limit': limit})
+            response = json_response(dashboard_body(
+                counters.to_dict() if counters is not None else read_stats(),
+                list_submissions(ContactSubmission, (), page_args),
+                list_submissions(QuoteSubmission, (), page_args)
+            ))
+        if etag is not None:
+            response.set_etag(etag)
+        # Cache, but revalidate on every load
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch dashboard', 'details': str(e)}), 500
+
+# Rows fetched per query when streaming an export
+EXPORT_BATCH_SIZE = 1000
 
+def iter_export_batches(model, include_archived=False):
+    """
+    Yield lists of export rows (dicts) in id order, one batch at a time
 
+    Each batch is its own short keyset query (id > last id) on a fresh
+    connection, so a long export never holds a read transaction open
+    against SQLite's single writer and memory stays at one batch. With
+    include_archived, each batch merges the next ids of both tables.
+    """
+    fields = [column.name for column in model.__table__.columns]
+    tables = [model.__table__] + ([ARCHIVES[model].__table__] if include_archived else [])
+    last_id = 0
+    while True:
+        parts = [
+            select(*[table.c[name] for name in fields])
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(EXPORT_BATCH_SIZE)
+            for table in tables
+        ]
+        if len(parts) == 1:
+            statement = parts[0]
+        else:
+            merged = union_all(*[select(part.subquery()) for part in parts]).subquery()
+            statement = select(*[merged.c[name] for name in fields]).order_by(merged.c.id).limit(EXPORT_BATCH_SIZE)
+        with db.engine.connect() as conn:
+            rows = conn.execute(statement).mappings().all()
+        if not rows:
+            return
+        batch = []
+        for row in rows:
+            row = dict(row)
+            if row['submitted_at'] is not None:
+                row['submitted_at'] = row['submitted_at'].isoformat()
+            batch.append(row)
+        yield batch
+        last_id = rows[-1]['id']
 
+def generate_ndjson(model, include_archived=False):
+    """Stream submissions as newline-delimited JSON"""
+    for batch in iter_export_batches(model, include_archived):
+        yield ''.join(json.dumps(row) + '\n' for row in batch)
 
+def generate_csv(model, include_archived=False):
+    """Stream submissions as CSV with a header row"""
+    fields = [column.name for column in model.__table__.columns]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for batch in iter_export_batches(model, include_archived):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
 
+EXPORT_FORMATS = {
+    'ndjson': (generate_ndjson, 'application/x-ndjson'),
+    'csv': (generate_csv, 'text/csv')
+}
+
+@api_bp.route('/submissions/<kind>/export', methods=['GET'])
+def export_submissions(kind):
+    """
+    Stream every submission of a kind as NDJSON or CSV (admin only)
+
+    Query parameters:
+        format: 'ndjson' (default) or 'csv'
+        include_archived: Also export archived submissions ('true')
+    """
+    # TODO: Add authentication here
+    model = SUBMISSION_MODELS.get(kind)
+    if model is None:
+        return jsonify({'error': f'Unknown submission kind: {kind}'}), 404
+
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    try:
+        include_archived = parse_bool(request.args.get('include_archived', 'false'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
+    generate, mimetype = EXPORT_FORMATS[export_format]
+    response = Response(stream_with_context(generate(model, include_archived)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename={model.__tablename__}.{export_format}'
+    )
+    return response
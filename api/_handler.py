@@ -0,0 +1,112 @@
+"""
+Shared request handling for the Vercel serverless functions
+
+Each function in api/*/index.py subclasses JSONHandler and implements
+handle_json(). The base class answers CORS preflights without touching
+the request body, reads and parses JSON bodies with a size cap, and
+turns errors into JSON responses. Vercel's underscore prefix keeps this
+module from being deployed as a function of its own.
+
+Anything a function keeps at module level (SDK clients, caches) survives
+between warm invocations of the same instance, so heavy SDKs should be
+imported lazily inside the code path that needs them rather than at
+module load, where every cold start and OPTIONS preflight would pay for it.
+"""
+from http.server import BaseHTTPRequestHandler
+import json
+import os
+import sys
+
+# Project-root modules (e.g. dedupe.py) are shared with the Flask app
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# Form posts are small; anything bigger is refused before it is read
+MAX_BODY_BYTES = 64 * 1024
+
+
+class RequestError(Exception):
+    """Raised to answer the request with a 4xx JSON error"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class JSONHandler(BaseHTTPRequestHandler):
+    """BaseHTTPRequestHandler for JSON POST endpoints with CORS"""
+
+    allowed_methods = 'POST, OPTIONS'
+    allowed_headers = 'Content-Type, Idempotency-Key'
+
+    def do_OPTIONS(self):
+        """Answer preflights from headers alone"""
+        self.send_response(200)
+        self._set_cors()
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        try:
+            data = self.read_json()
+            status, payload = self.handle_json(data)
+        except RequestError as e:
+            status, payload = e.status, {'error': e.message}
+        except Exception as e:
+            status, payload = 500, self.error_payload(e)
+        self.respond(status, payload)
+
+    def handle_json(self, data):
+        """
+        Handle a parsed JSON body
+
+        Args:
+            data: Decoded JSON object
+
+        Returns:
+            (status, payload) tuple
+        """
+        raise NotImplementedError
+
+    def error_payload(self, error):
+        """Body for unexpected errors; subclasses may override"""
+        return {'error': 'Failed to process request', 'details': str(error)}
+
+    def read_json(self):
+        """Read and decode the request body as a JSON object"""
+        try:
+            content_length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            raise RequestError(400, 'Invalid Content-Length')
+        if content_length > MAX_BODY_BYTES:
+            raise RequestError(413, 'Request body too large')
+
+        body = self.rfile.read(content_length)
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            raise RequestError(400, 'Invalid JSON body')
+        if not isinstance(data, dict):
+            raise RequestError(400, 'JSON body must be an object')
+        return data
+
+    def respond(self, status, data):
+        """Send a JSON response with CORS headers"""
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self._set_cors()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _set_cors(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', self.allowed_methods)
+        self.send_header('Access-Control-Allow-Headers', self.allowed_headers)
+
+    def log_message(self, format, *args):
+        # Vercel captures stderr per invocation; skip the per-request access line
+        pass
@@ -0,0 +1,78 @@
+"""
+Pluggable submission storage for the Vercel serverless functions
+
+SUBMISSION_STORAGE selects the backend:
+    none     validate and acknowledge only (the original behaviour)
+    journal  append to the segmented journal in SUBMISSION_JOURNAL_DIR
+             (journal.py); `flask compact-journal` loads it into the
+             contact_submissions / quote_submissions tables
+
+SUBMISSION_JOURNAL_DIR has no default: it must be durable storage that
+the machine running compact-journal also mounts. A function's own /tmp
+is neither, so submissions acknowledged into it would be lost.
+
+The backend is created on first use and kept at module level, so a warm
+instance reuses its open segment file.
+"""
+import os
+from datetime import datetime
+
+
+class NullStorage:
+    """Stores nothing; ids are request timestamps"""
+
+    def save(self, kind, fields, dedupe=None):
+        return datetime.utcnow().timestamp()
+
+
+class JournalStorage:
+    """Appends each submission to the journal"""
+
+    def __init__(self, directory):
+        from journal import Journal
+        self.journal = Journal(directory)
+
+    def save(self, kind, fields, dedupe=None):
+        """
+        Append a submission
+
+        Args:
+            kind: 'contact' or 'quote'
+            fields: Column values for the submission model
+            dedupe: Optional (key, ttl) pair, re-checked at compaction
+
+        Returns:
+            Journal id of the record
+        """
+        return self.journal.append({
+            'kind': kind,
+            'submitted_at': datetime.utcnow().isoformat(),
+            'fields': fields,
+            'dedupe': list(dedupe) if dedupe else None
+        })
+
+
+def journal_storage():
+    directory = os.environ.get('SUBMISSION_JOURNAL_DIR')
+    if not directory:
+        raise ValueError('SUBMISSION_STORAGE=journal needs SUBMISSION_JOURNAL_DIR set to durable shared storage')
+    return JournalStorage(directory)
+
+
+BACKENDS = {
+    'none': lambda: NullStorage(),
+    'journal': journal_storage,
+}
+
+_storage = None
+
+
+def get_storage():
+    """Return the configured storage backend, creating it on first use"""
+    global _storage
+    if _storage is None:
+        name = os.environ.get('SUBMISSION_STORAGE', 'none')
+        if name not in BACKENDS:
+            raise ValueError(f'Unknown SUBMISSION_STORAGE: {name}')
+        _storage = BACKENDS[name]()
+    return _storage
@@ -4,81 +4,183 @@ for custom print order deposits.
 
 Secret key is read from STRIPE_SECRET_KEY environment variable.
 Set this in: Vercel Dashboard → Project → Settings → Environment Variables
+
+The stripe SDK is imported on the first POST rather than at module load,
+so cold starts and OPTIONS preflights never pay for it. A warm instance
+keeps one StripeClient (with a keep-alive HTTP session), the deposit
+Price id and recently created sessions, so a repeat of the same order
+gets the still-open session back instead of a new one.
+
+Set STRIPE_API_BASE to point the client at a local stub (see stripe_stub.py).
 """
-from http.server import BaseHTTPRequestHandler
-import json
+import hashlib
 import os
-import stripe
+import sys
+import time
+
+# Shared handler base lives in api/_handler.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from _handler import JSONHandler
+from dedupe import TTLCache, normalize
 
 DEPOSIT_CENTS = 2500  # $25.00 deposit — change here to adjust
 
+# The deposit Price is found (or created) by this lookup key
+DEPOSIT_LOOKUP_KEY = f'custom-print-deposit-{DEPOSIT_CENTS}'
 
-class handler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self._set_cors()
-        self.end_headers()
+# Identical orders inside this window reuse the open session
+SESSION_REUSE_SECONDS = 10 * 60
+# Stripe's minimum session lifetime, counted from the end of the reuse window...
+SESSION_LIFETIME_SECONDS = 30 * 60
+# ...plus slack for clock skew between this function and Stripe
+SESSION_EXPIRY_MARGIN_SECONDS = 10 * 60
+# New sessions one order may get in a window once earlier ones are paid or expired
+MAX_SESSIONS_PER_WINDOW = 5
 
-    def do_POST(self):
-        try:
-            stripe.api_key = os.environ.get('STRIPE_SECRET_KEY', '')
-            if not stripe.api_key:
-                self._respond(500, {'error': 'Stripe not configured. Add STRIPE_SECRET_KEY to Vercel env vars.'})
-                return
-
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode('utf-8'))
-
-            order_summary = data.get('orderSummary', 'Custom Print Order')
-            customer_email = data.get('customerEmail', '')
-            customer_name = data.get('customerName', '')
-
-            origin = (
-                self.headers.get('Origin')
-                or self.headers.get('Referer', 'https://visualizestudio.com').rstrip('/')
+# Module-level state, reused across warm invocations
+_stripe = None
+_client = None
+_deposit_price_id = os.environ.get('STRIPE_DEPOSIT_PRICE_ID')
+recent_sessions = TTLCache()
+
+
+def get_client():
+    """Build the StripeClient once per instance"""
+    global _stripe, _client
+    if _client is None:
+        import requests
+        import stripe
+        base = os.environ.get('STRIPE_API_BASE')
+        _client = stripe.StripeClient(
+            os.environ.get('STRIPE_SECRET_KEY', ''),
+            base_addresses={'api': base} if base else {},
+            # One pooled session for every thread, so TLS connections are reused
+            http_client=stripe.RequestsClient(session=requests.Session()),
+            max_network_retries=2
+        )
+        _stripe = stripe
+    return _client
+
+
+def get_deposit_price_id(client):
+    """Return the deposit Price id, creating the Product/Price on first use"""
+    global _deposit_price_id
+    if _deposit_price_id is None:
+        prices = client.prices.list(params={'lookup_keys': [DEPOSIT_LOOKUP_KEY], 'active': True})
+        if prices.data:
+            _deposit_price_id = prices.data[0].id
+        else:
+            product = client.products.create(
+                params={'name': 'Custom Print — Order Deposit'},
+                options={'idempotency_key': f'product-{DEPOSIT_LOOKUP_KEY}'}
+            )
+            price = client.prices.create(
+                params={
+                    'currency': 'usd',
+                    'unit_amount': DEPOSIT_CENTS,
+                    'product': product.id,
+                    'lookup_key': DEPOSIT_LOOKUP_KEY
+                },
+                options={'idempotency_key': f'price-{DEPOSIT_LOOKUP_KEY}'}
             )
+            _deposit_price_id = price.id
+    return _deposit_price_id
+
+
+def order_key(customer_email, order_summary):
+    """Identify an order by its normalized email and summary"""
+    return hashlib.sha256(
+        f'{normalize(customer_email)}\0{normalize(order_summary)}'.encode('utf-8')
+    ).hexdigest()
+
 
-            session = stripe.checkout.Session.create(
-                payment_method_types=['card'],
-                mode='payment',
-                customer_email=customer_email or None,
-                line_items=[{
-                    'price_data': {
-                        'currency': 'usd',
-                        'product_data': {
-                            'name': 'Custom Print — Order Deposit',
-                            'description': order_summary,
-                        },
-                        'unit_amount': DEPOSIT_CENTS,
-                    },
-                    'quantity': 1,
-                }],
-                metadata={
+def checkout_idempotency_key(key, customer_name, origin, window, attempt):
+    """
+    Stripe idempotency key for one checkout attempt
+
+    Hashes every input that goes into the session params, so a retry
+    with the same key always sends the same params, and keeps the key
+    well under Stripe's 255 characters whatever the origin.
+    """
+    digest = hashlib.sha256(f'{key}\0{customer_name}\0{origin}'.encode('utf-8')).hexdigest()
+    return f'checkout-{digest}-{window}-{attempt}'
+
+
+def open_session_url(client, session_id):
+    """Return the session URL if it can still be paid, else None"""
+    session = client.checkout.sessions.retrieve(session_id)
+    return session.url if session.status == 'open' else None
+
+
+class handler(JSONHandler):
+    def handle_json(self, data):
+        if not os.environ.get('STRIPE_SECRET_KEY'):
+            return 500, {'error': 'Stripe not configured. Add STRIPE_SECRET_KEY to Vercel env vars.'}
+
+        client = get_client()
+        stripe = _stripe
+
+        order_summary = data.get('orderSummary', 'Custom Print Order')
+        customer_email = data.get('customerEmail', '')
+        customer_name = data.get('customerName', '')
+
+        origin = (
+            self.headers.get('Origin')
+            or self.headers.get('Referer', 'https://visualizestudio.com').rstrip('/')
+        )
+
+        key = order_key(customer_email, order_summary)
+        try:
+            # Same order again (double-click, back button, retry)
+            session_id = recent_sessions.get(key)
+            if session_id is not None:
+                url = open_session_url(client, session_id)
+                if url:
+                    return 200, {'url': url, 'reused': True}
+
+            # Retries on another instance inside the same window map to the
+            # same Stripe idempotency key and get the same session back, so
+            # every param (expires_at included) must be the same on a retry
+            window = int(time.time() // SESSION_REUSE_SECONDS)
+            params = {
+                'payment_method_types': ['card'],
+                'mode': 'payment',
+                'customer_email': customer_email or None,
+                'line_items': [{'price': get_deposit_price_id(client), 'quantity': 1}],
+                'payment_intent_data': {'description': order_summary},
+                'metadata': {
                     'customer_name': customer_name,
                     'order_summary': order_summary,
                 },
-                success_url=f'{origin}/prints?payment=success',
-                cancel_url=f'{origin}/prints?payment=canceled',
-            )
+                'expires_at': ((window + 1) * SESSION_REUSE_SECONDS + SESSION_LIFETIME_SECONDS
+                               + SESSION_EXPIRY_MARGIN_SECONDS),
+                'success_url': f'{origin}/prints?payment=success',
+                'cancel_url': f'{origin}/prints?payment=canceled',
+            }
+            for attempt in range(MAX_SESSIONS_PER_WINDOW):
+                session = client.checkout.sessions.create(
+                    params=params,
+                    options={'idempotency_key': checkout_idempotency_key(
+                        key, customer_name, origin, window, attempt
+                    )}
+                )
+                # A replayed key returns the session as it was created; if it
+                # has since been paid or expired, this is a new order
+                if session.last_response.headers.get('Idempotent-Replayed') != 'true':
+                    break
+                url = open_session_url(client, session.id)
+                if url:
+                    recent_sessions.set(key, session.id, SESSION_REUSE_SECONDS)
+                    return 200, {'url': url, 'reused': True}
+            else:
+                return 429, {'error': 'Too many checkout sessions for this order, please try again later.'}
+        except stripe.AuthenticationError:
+            return 500, {'error': 'Invalid Stripe API key. Check your STRIPE_SECRET_KEY env var.'}
+        except stripe.StripeError as e:
+            return 500, {'error': str(e.user_message or e)}
+
+        recent_sessions.set(key, session.id, SESSION_REUSE_SECONDS)
+        return 200, {'url': session.url}
 
-            self._respond(200, {'url': session.url})
-
-        except stripe.error.AuthenticationError:
-            self._respond(500, {'error': 'Invalid Stripe API key. Check your STRIPE_SECRET_KEY env var.'})
-        except stripe.error.StripeError as e:
-            self._respond(500, {'error': str(e.user_message or e)})
-        except Exception as e:
-            self._respond(500, {'error': str(e)})
-
-    def _respond(self, status, data):
-        self.send_response(status)
-        self.send_header('Content-Type', 'application/json')
-        self._set_cors()
-        self.end_headers()
-        self.wfile.write(json.dumps(data).encode())
-
-    def _set_cors(self):
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+    def error_payload(self, error):
+        return {'error': str(error)}
@@ -2,67 +2,50 @@
 Vercel serverless function for quote form submissions
 Uses Vercel's serverless function format
 """
-from http.server import BaseHTTPRequestHandler
-import json
 import os
-from datetime import datetime
-
-class handler(BaseHTTPRequestHandler):
-    def do_OPTIONS(self):
-        self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
-        return
+import sys
+
+# Shared handler base lives in api/_handler.py
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from _handler import JSONHandler
+from _storage import get_storage
+from dedupe import TTLCache, dedupe_key
+
+# Recent submissions, remembered across warm invocations of this instance
+recent_submissions = TTLCache()
+
+MESSAGE = 'Thank you! Your quote request has been received.'
+
+class handler(JSONHandler):
+    def handle_json(self, data):
+        # Validate required fields
+        if not data.get('name') or not data.get('email') or not data.get('project'):
+            return 400, {'error': 'Missing required fields'}
+        
+        # Answer double-clicks and retries with the original id
+        key, ttl = dedupe_key('quote', self.headers.get('Idempotency-Key'),
+                              data.get('email'), data.get('project'))
+        original_id = recent_submissions.get(key)
+        if original_id is not None:
+            return 200, {'success': True, 'message': MESSAGE, 'id': original_id, 'duplicate': True}
+        
+        # Same columns as the Flask API, so the journal compacts into models.py tables
+        fields = {
+            'name': data.get('name').strip(),
+            'email': data.get('email').strip(),
+            'package': (data.get('package') or '').strip() or None,
+            'project_details': data.get('project').strip()
+        }
+
+        # The notification email is queued in the outbox when the journal is
+        # compacted into the database (see outbox.py), not sent from here
+        response = {
+            'success': True,
+            'message': MESSAGE,
+            'id': get_storage().save('quote', fields, (key, ttl))
+        }
+        recent_submissions.set(key, response['id'], ttl)
+        return 201, response
     
-    def do_POST(self):
-        try:
-            # Read request body
-            content_length = int(self.headers.get('Content-Length', 0))
-            body = self.rfile.read(content_length)
-            data = json.loads(body.decode('utf-8'))
-            
-            # Validate required fields
-            if not data.get('name') or not data.get('email') or not data.get('project'):
-                self.send_response(400)
-                self.send_header('Content-Type', 'application/json')
-                self.send_header('Access-Control-Allow-Origin', '*')
-                self.end_headers()
-                self.wfile.write(json.dumps({'error': 'Missing required fields'}).encode())
-                return
-            
-            # Here you would typically:
-            # 1. Save to a database (like Supabase, MongoDB, etc.)
-            # 2. Send email notification
-            # 3. Store in a service like Airtable
-            
-            # For now, we'll return success
-            # TODO: Integrate with your preferred storage/email service
-            
-            response = {
-                'success': True,
-                'message': 'Thank you! Your quote request has been received.',
-                'id': datetime.utcnow().timestamp()
-            }
-            
-            self.send_response(201)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps(response).encode())
-            
-        except Exception as e:
-            self.send_response(500)
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': 'Failed to submit form', 'details': str(e)}).encode())
-
-
-
-
-
-
-
-
+    def error_payload(self, error):
+        return {'error': 'Failed to submit form', 'details': str(error)}
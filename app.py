@@ -2,12 +2,28 @@
 VISUALIZE STUDIO - MAIN APPLICATION
 """
 
-from flask import Flask, send_from_directory
+from flask import Flask, Response, abort, request, send_from_directory
 from flask_cors import CORS
+import click
 import os
+import threading
 from config import config
-from models import db
+from models import (
+    db, configure_sqlite, ensure_schema, rebuild_search_index, rebuild_submission_stats,
+    search_index_available
+)
 from api import api_bp
+from archive import archive_submissions
+from page_cache import PageCache
+from static_cache import StaticCache
+from image_variants import ImageVariants, VARIANTS_DIR, build_variants
+from asset_manifest import AssetManifest, BUILD_DIR, build_assets, cache_forever
+from events import EventBus
+from ingest import IngestQueue, insert_records
+from journal import compact
+from metrics import Metrics
+from outbox import OutboxWorker
+from rate_limit import RateLimiter
 
 def create_app(config_name=None):
     """
@@ -41,70 +57,229 @@ def create_app(config_name=None):
     # Register blueprints (must be before catch-all routes)
     app.register_blueprint(api_bp)
     
-    # Create database tables
+    # Create or upgrade the schema (skipped when the database is up to date)
     with app.app_context():
-        db.create_all()
+        configure_sqlite(db.engine, app.config['SQLITE_PRAGMAS'])
+        ensure_schema()
+        # Full-text search is only offered when the FTS5 index could be set up
+        app.extensions['search'] = search_index_available()
     
+    # Per-endpoint latency, status and SQL counters (served at /api/metrics)
+    if app.config['METRICS_ENABLED']:
+        metrics = Metrics(sql_sample_rate=app.config['METRICS_SQL_SAMPLE_RATE'])
+        metrics.register(app)
+        with app.app_context():
+            metrics.instrument_engine(db.engine)
+        app.extensions['metrics'] = metrics
+    
+    # Shed form floods before they reach the database (checked in api.py)
+    if app.config['RATE_LIMIT_ENABLED']:
+        app.extensions['rate_limiter'] = RateLimiter(
+            app.config['RATE_LIMIT_CLIENT_RATE'],
+            app.config['RATE_LIMIT_CLIENT_BURST'],
+            app.config['RATE_LIMIT_GLOBAL_RATE'],
+            app.config['RATE_LIMIT_GLOBAL_BURST'],
+            max_clients=app.config['RATE_LIMIT_MAX_CLIENTS']
+        )
+    
+    # Change feed for the admin dashboard (published from api.py and ingest.py)
+    if app.config['EVENTS_ENABLED']:
+        app.extensions['events'] = EventBus(
+            buffer_size=app.config['EVENTS_BUFFER_SIZE'],
+            max_subscribers=app.config['EVENTS_MAX_SUBSCRIBERS']
+        )
+    
+    # Optional write-behind ingest; the writer thread starts on first submit
+    if app.config['INGEST_MODE'] == 'queue':
+        app.extensions['ingest'] = IngestQueue(
+            app,
+            app.config['INGEST_SPILL_DIR'] or os.path.join(app.instance_path, 'ingest'),
+            batch_size=app.config['INGEST_BATCH_SIZE'],
+            flush_interval=app.config['INGEST_FLUSH_INTERVAL'],
+            fsync=app.config['INGEST_FSYNC'],
+            max_attempts=app.config['INGEST_MAX_ATTEMPTS']
+        )
+    
+    # Notification emails queued with each submission; the sender thread starts on the first request
+    if app.config['MAIL_NOTIFY_TO']:
+        outbox = OutboxWorker(app)
+        app.extensions['outbox'] = outbox
+        app.before_request(outbox.start)
+    
+    @app.cli.command('replay-ingest')
+    def replay_ingest_command():
+        """Commit submissions left in spill files by a stopped process"""
+        ingest = app.extensions.get('ingest') or IngestQueue(
+            app, app.config['INGEST_SPILL_DIR'] or os.path.join(app.instance_path, 'ingest')
+        )
+        print(f"✓ Replayed {ingest.replay_orphans()} queued submissions")
+    
+    @app.cli.command('compact-journal')
+    @click.argument('directory', required=False)
+    def compact_journal_command(directory):
+        """Load sealed serverless journal segments into the database"""
+        directory = directory or os.environ.get('SUBMISSION_JOURNAL_DIR')
+        if not directory:
+            print("✗ Pass the journal directory or set SUBMISSION_JOURNAL_DIR")
+            return
+        segments, records = compact(directory, insert_records)
+        print(f"✓ Compacted {segments} segments ({records} records) from {directory}")
+
+    @app.cli.command('send-outbox')
+    @click.option('--force', is_flag=True, help='Send digests without waiting for MAIL_DIGEST_INTERVAL')
+    def send_outbox_command(force):
+        """Send every due notification email in the outbox"""
+        outbox = app.extensions.get('outbox')
+        if outbox is None:
+            print("✗ Notification emails are disabled; set MAIL_NOTIFY_TO")
+            raise SystemExit(1)
+        outbox.drain(force=force)
+        print(f"✓ Sent {outbox.sent} notifications ({outbox.failed} failed sends left for retry)")
+
+    @app.cli.command('rebuild-search')
+    def rebuild_search_command():
+        """Re-derive the full-text search index from the submission tables"""
+        if not app.extensions['search']:
+            print("✗ Full-text search needs SQLite with FTS5")
+            return
+        rebuild_search_index()
+        print("✓ Search index rebuilt")
+    
+    @app.cli.command('build-images')
+    @click.option('--force', is_flag=True, help='Re-encode unchanged sources')
+    def build_images_command(force):
+        """Build resized WebP/AVIF variants of assets/images and public/showcase"""
+        manifest, built, reused = build_variants(basedir, force=force)
+        print(f"✓ {built} images built, {reused} unchanged ({', '.join(manifest['formats'])})")
+    
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Fingerprint assets/ and public/ into static-build/ for immutable caching"""
+        _, count = build_assets(basedir)
+        print(f"✓ {count} assets fingerprinted into {BUILD_DIR}/")
+    
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables, indexes, triggers and the search index even if up to date"""
+        ensure_schema(force=True)
+        app.extensions['search'] = search_index_available()
+        print("✓ Database schema set up")
+    
+    @app.cli.command('archive-submissions')
+    @click.option('--older-than-days', type=int, help='Minimum age (default ARCHIVE_AFTER_DAYS)')
+    @click.option('--batch-size', type=int, help='Rows per transaction (default ARCHIVE_BATCH_SIZE)')
+    def archive_submissions_command(older_than_days, batch_size):
+        """Move read submissions older than the cutoff into the archive tables"""
+        days = older_than_days if older_than_days is not None else app.config['ARCHIVE_AFTER_DAYS']
+        moved = archive_submissions(
+            days,
+            batch_size=batch_size or app.config['ARCHIVE_BATCH_SIZE'],
+            pause=app.config['ARCHIVE_BATCH_PAUSE']
+        )
+        print(f"✓ Archived {moved['contact']} contact and {moved['quote']} quote submissions older than {days} days")
+    
+    @app.cli.command('rebuild-stats')
+    def rebuild_stats_command():
+        """Re-derive the submission counters from the submission tables"""
+        rebuild_submission_stats()
+        print("✓ Submission stats rebuilt")
+    
+    # Hashed asset URLs from the last build-assets run, if any
+    asset_manifest = AssetManifest(basedir, check_interval=app.config['STATIC_CACHE_CHECK_INTERVAL'])
+    app.extensions['asset_manifest'] = asset_manifest
+
+    # Pages are assembled with their header/footer once and served from memory
+    page_cache = PageCache(basedir, asset_manifest)
+    app.extensions['page_cache'] = page_cache
+
+    def serve_page(filename):
+        """Serve an assembled page from the page cache"""
+        try:
+            page = page_cache.get(filename)
+        except FileNotFoundError:
+            abort(404)
+        response = Response(page.body, mimetype='text/html')
+        response.set_etag(page.etag)
+        response.last_modified = int(page.last_modified)
+        return response.make_conditional(request)
+
+    # assets/, public/ and built image variants are served precompressed from memory
+    static_cache = StaticCache(
+        basedir,
+        dirs=('assets', 'public', VARIANTS_DIR, BUILD_DIR),
+        max_bytes=app.config['STATIC_CACHE_MAX_BYTES'],
+        check_interval=app.config['STATIC_CACHE_CHECK_INTERVAL']
+    )
+    app.extensions['static_cache'] = static_cache
+    if app.config['STATIC_CACHE_WARM']:
+        # In the background so the first requests are not held up; misses
+        # meanwhile are loaded on demand as usual
+        threading.Thread(target=static_cache.warm, name='static-cache-warm', daemon=True).start()
+    
+    # Original image URLs are answered with a WebP/AVIF variant when accepted
+    image_variants = ImageVariants(basedir, check_interval=app.config['STATIC_CACHE_CHECK_INTERVAL'])
+    app.extensions['image_variants'] = image_variants
+
     # Main website routes (existing static site)
     @app.route('/')
     def index():
         """Serve the main website index"""
-        return send_from_directory('.', 'index.html')
+        return serve_page('index.html')
 
     @app.route('/process')
     def process_page():
         """Serve the process page with clean URL"""
-        return send_from_directory('pages', 'Process.html')
+        return serve_page('pages/Process.html')
 
     @app.route('/payments')
     def payments_page():
         """Serve the payments page with clean URL"""
-        return send_from_directory('pages', 'Payments.html')
+        return serve_page('pages/Payments.html')
 
     @app.route('/terms')
     def terms_page():
         """Serve the Terms of Service page with clean URL"""
-        return send_from_directory('pages', 'Terms.html')
+        return serve_page('pages/Terms.html')
 
     @app.route('/portfolio')
     def portfolio_page():
         """Serve the Portfolio page with clean URL"""
-        return send_from_directory('pages', 'Portfolio.html')
+        return serve_page('pages/Portfolio.html')
 
     @app.route('/work')
     def work_page():
         """Serve the Work page with clean URL"""
-        return send_from_directory('pages', 'Work.html')
+        return serve_page('pages/Work.html')
 
     @app.route('/about')
     def about_page():
         """Serve the About page with clean URL"""
-        return send_from_directory('pages', 'About.html')
+        return serve_page('pages/About.html')
 
     @app.route('/contact')
     def contact_page():
         """Serve the Contact/Let's Chat page with clean URL"""
-        return send_from_directory('pages', 'Contact.html')
+        return serve_page('pages/Contact.html')
 
     @app.route('/quote')
     def quote_page():
         """Serve the Request a Quote page with clean URL"""
-        return send_from_directory('pages', 'Quote.html')
+        return serve_page('pages/Quote.html')
 
     @app.route('/stickers')
     def stickers_page():
         """Serve the Custom Stickers page with clean URL"""
-        return send_from_directory('pages', 'Stickers.html')
+        return serve_page('pages/Stickers.html')
 
     @app.route('/order-stickers')
     def order_stickers_page():
         """Serve the Order Custom Stickers product page with clean URL"""
-        return send_from_directory('pages', 'OrderStickers.html')
+        return serve_page('pages/OrderStickers.html')
 
     @app.route('/admin')
     def admin_page():
         """Serve the admin dashboard page"""
-        return send_from_directory('pages', 'Admin.html')
+        return serve_page('pages/Admin.html')
 
     # Static files catch-all (must be last route, exclude API routes)
     @app.route('/<path:filename>')
@@ -113,6 +288,29 @@ def create_app(config_name=None):
         # Don't serve API routes as static files
         if filename.startswith('api/'):
             return '', 404
+        if asset_manifest.is_hashed(filename):
+            # Content-hashed URL: never revalidated (an image still gets its best variant)
+            source = asset_manifest.source_for(filename)
+            if source is not None and image_variants.has(source):
+                variant = image_variants.choose(source, request.accept_mimetypes, request.args.get('w', type=int))
+                path = variant[0] if variant else f'{BUILD_DIR}/{filename}'
+                response = static_cache.serve(path, request) or send_from_directory('.', path)
+                response.vary.add('Accept')
+            else:
+                response = (static_cache.serve(f'{BUILD_DIR}/{filename}', request)
+                            or send_from_directory(BUILD_DIR, filename))
+            return cache_forever(response)
+        if image_variants.has(filename):
+            variant = image_variants.choose(filename, request.accept_mimetypes, request.args.get('w', type=int))
+            response = static_cache.serve(variant[0] if variant else filename, request)
+            if response is None:
+                response = send_from_directory('.', variant[0] if variant else filename)
+            response.vary.add('Accept')
+            return response
+        if static_cache.handles(filename):
+            response = static_cache.serve(filename, request)
+            if response is not None:
+                return response
         try:
             return send_from_directory('.', filename)
         except:
@@ -131,10 +329,21 @@ def create_app(config_name=None):
     
     return app
 
-# Create app instance
-app = create_app()
+def __getattr__(name):
+    """
+    Build the module-level app on first access
+
+    `flask --app app`, `gunicorn app:app` and the like look up app.app and
+    get one instance, built once; importing create_app (tests, benchmarks,
+    scripts) no longer builds an app and touches the default database.
+    """
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
+    app = create_app()
     # Development server
     print("🚀 Starting Visualize Studio...")
     print("📋 Available routes:")
@@ -156,6 +365,13 @@ if __name__ == '__main__':
     print("     GET /api/submissions/contact - Get contact submissions")
     print("     GET /api/submissions/quote - Get quote submissions")
     print("     GET /api/submissions/stats - Get submission statistics")
+    print("     GET /api/dashboard - Stats and newest submissions (ETag/304)")
+    print("     GET /api/submissions/search?q=... - Full-text search with snippets")
+    print("     PUT /api/submissions/<kind>/read - Mark many submissions read/unread")
+    print("     GET /api/rate-limit/stats - Get load-shedding counters")
+    print("     GET /api/metrics - Request and SQL metrics (Prometheus)")
+    print("     GET /api/submissions/stream - Live submission events (Server-Sent Events)")
+    print("     GET /api/submissions/<kind>/export?format=ndjson|csv - Stream all submissions")
     print("\n💡 To test the API, run: python3 test_api.py")
     
     app.run(debug=True, port=5001)
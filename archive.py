@@ -0,0 +1,97 @@
+"""
+Hot/cold archival of old submissions
+
+contact_submissions and quote_submissions only ever grow, and every
+admin query, count and index walk runs against them. flask
+archive-submissions (run it from cron) moves submissions that are read
+and older than ARCHIVE_AFTER_DAYS into contact_submissions_archive /
+quote_submissions_archive in the same database, so the hot tables and
+their indexes stay the size of the recent working set.
+
+Rows move in batches of ARCHIVE_BATCH_SIZE, each its own short write
+transaction (copy, then delete the same rows), with a pause between
+batches so form submits are not queued behind the job for long. The
+counters triggers keep the stats current: deleting from a hot table
+lowers its total, and inserting into an archive table raises
+<kind>_archived. Archived rows leave the full-text search index.
+
+The list, stats and export endpoints read the hot tables unless asked
+for include_archived=true. Ids are kept, so cursors and exports stay
+valid across both tables. The newest row of each table is never
+archived: SQLite hands out max(id) + 1 for new rows, so moving it away
+could reuse an archived id.
+"""
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, func, insert, literal, select
+
+from models import db, ARCHIVE_MODELS, SUBMISSION_MODELS
+
+
+def archive_batch(kind, cutoff, batch_size):
+    """
+    Move up to batch_size of the oldest eligible submissions of one kind
+
+    Args:
+        kind: 'contact' or 'quote'
+        cutoff: Read submissions from before this time are eligible
+        batch_size: Most rows moved in the one transaction
+
+    Returns:
+        Number of rows moved
+    """
+    table = SUBMISSION_MODELS[kind].__table__
+    archive = ARCHIVE_MODELS[kind].__table__
+    eligible = and_(table.c.read == True, table.c.submitted_at < cutoff)  # noqa: E712
+
+    # Candidates are picked outside the write transaction (read, submitted_at, id index)
+    with db.engine.connect() as conn:
+        newest = conn.execute(select(func.max(table.c.id))).scalar()
+        if newest is None:
+            return 0
+        ids = conn.execute(
+            select(table.c.id)
+            .where(eligible, table.c.id < newest)
+            .order_by(table.c.submitted_at, table.c.id)
+            .limit(batch_size)
+        ).scalars().all()
+    if not ids:
+        return 0
+
+    # Re-checked under the write lock in case a row was marked unread meanwhile
+    moving = and_(table.c.id.in_(ids), eligible)
+    archived_at = literal(datetime.utcnow(), archive.c.archived_at.type)
+    columns = [column.name for column in table.columns]
+    with db.engine.begin() as conn:
+        conn.execute(insert(archive).from_select(
+            columns + ['archived_at'],
+            select(*table.columns, archived_at).where(moving)
+        ))
+        return conn.execute(delete(table).where(moving)).rowcount
+
+
+def archive_submissions(older_than_days, batch_size=500, pause=0.05, kinds=None):
+    """
+    Archive every read submission older than older_than_days (needs an app context)
+
+    Args:
+        older_than_days: Minimum age in days, by submitted_at
+        batch_size: Rows moved per transaction
+        pause: Seconds to sleep between batches, letting other writers in
+        kinds: Submission kinds to archive (default: all)
+
+    Returns:
+        Rows moved per kind
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = {}
+    for kind in kinds or SUBMISSION_MODELS:
+        moved[kind] = 0
+        while True:
+            count = archive_batch(kind, cutoff, batch_size)
+            moved[kind] += count
+            if count < batch_size:
+                break
+            time.sleep(pause)
+    return moved
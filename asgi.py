@@ -0,0 +1,571 @@
+"""
+Optional ASGI deployment mode
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+    (pip install uvicorn aiosqlite greenlet)
+
+The busiest /api/* routes run as async handlers on the event loop with
+SQLAlchemy's async engine over aiosqlite: the form submits, the
+submission lists, stats, the dashboard and the Server-Sent Events stream.
+Waiting on a slow client or on an open stream then costs a coroutine
+instead of a worker thread. Every other request (pages, static files and
+the remaining /api/* routes) is passed to the Flask app from create_app()
+on a bounded thread pool, after its body has been read on the loop, so
+the whole site keeps working. Without a SQLite database every request
+goes to the Flask app.
+
+Both halves share one Flask app, so the rate limiter, the event bus, the
+ingest queue and /api/metrics cover both. Requests to the async handlers
+are recorded under the Flask endpoint names; their SQL statements run on
+the event loop thread and are reported under endpoint="background".
+"""
+import asyncio
+import io
+import json
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from urllib.parse import parse_qsl
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import MultiDict
+from werkzeug.http import parse_etags
+
+from api import (
+    DEDUPE_PURGE_EVERY, DEFAULT_PAGE_SIZE, LIST_FILTERS, MAX_PAGE_SIZE, SUBMIT_FORMS,
+    dashboard_body, dashboard_etag, encode_submission_page, parse_bool, submission_page_statement
+)
+from app import create_app
+from dedupe import dedupe_key
+from events import CLOSED
+from models import (
+    db, configure_sqlite, ARCHIVE_MODELS, STATS_ROW_ID, SUBMISSION_MODELS, EmailOutbox, SubmissionDedupe,
+    SubmissionStats, with_archived
+)
+from outbox import outbox_values
+from rate_limit import client_address
+from serialize import dumps
+
+STATS_FIELDS = ('contact_total', 'quote_total', 'contact_unread', 'quote_unread')
+
+
+class Request:
+    """The parts of an HTTP request the async handlers use"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.headers = {}
+        for name, value in scope['headers']:
+            name, value = name.decode('latin-1').lower(), value.decode('latin-1')
+            # Repeated headers are joined, as WSGI servers do (X-Forwarded-For)
+            self.headers[name] = f'{self.headers[name]},{value}' if name in self.headers else value
+        self.args = MultiDict(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        self.client = scope['client'][0] if scope.get('client') else None
+        self.body = body
+
+    @property
+    def is_json(self):
+        mimetype = self.headers.get('content-type', '').split(';')[0].strip().lower()
+        return mimetype == 'application/json' or (mimetype.startswith('application/') and mimetype.endswith('+json'))
+
+
+def wsgi_environ(scope, body):
+    """Build a PEP 3333 environ for an ASGI HTTP scope and its read body"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class AsyncAPI:
+    """ASGI app: async handlers for the hot /api/* routes, the Flask app for the rest"""
+
+    def __init__(self, flask_app):
+        """
+        Args:
+            flask_app: App from create_app(); serves every route without
+                an async handler and holds the shared extensions
+        """
+        self.flask_app = flask_app
+        self.extensions = flask_app.extensions
+        self.max_body_bytes = flask_app.config['ASGI_MAX_BODY_BYTES']
+        self.keepalive = flask_app.config['EVENTS_KEEPALIVE']
+        self.proxy_hops = flask_app.config['RATE_LIMIT_PROXY_HOPS']
+        self.rate_limited = set(flask_app.config['RATE_LIMIT_ENDPOINTS'])
+        self.notify = bool(flask_app.config['MAIL_NOTIFY_TO'])
+        self.executor = ThreadPoolExecutor(flask_app.config['ASGI_WSGI_THREADS'], thread_name_prefix='wsgi')
+        self._dedupe_writes = 0
+
+        self.engine = None
+        with flask_app.app_context():
+            url = db.engine.url
+        if url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:'):
+            self.engine = create_async_engine(
+                url.set(drivername='sqlite+aiosqlite'),
+                **flask_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+            )
+            configure_sqlite(self.engine.sync_engine, flask_app.config['SQLITE_PRAGMAS'])
+            # Handlers queue here in arrival order instead of racing for the pool (and timing out)
+            options = flask_app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})
+            self._connections = asyncio.Semaphore(options.get('pool_size', 5) + options.get('max_overflow', 10))
+
+        # (method, path) -> (endpoint name shared with the Flask routes, handler)
+        self.routes = {
+            ('GET', '/api/test'): ('api.test_api', self.test_api),
+            ('POST', '/api/contact'): ('api.submit_contact', lambda r: self.submit('contact', r)),
+            ('POST', '/api/quote'): ('api.submit_quote', lambda r: self.submit('quote', r)),
+            ('GET', '/api/submissions/contact'): ('api.get_contact_submissions', lambda r: self.list_page('contact', r)),
+            ('GET', '/api/submissions/quote'): ('api.get_quote_submissions', lambda r: self.list_page('quote', r)),
+            ('GET', '/api/submissions/stats'): ('api.get_stats', self.get_stats),
+            ('GET', '/api/dashboard'): ('api.get_dashboard', self.get_dashboard),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+        key = (scope['method'], scope['path'])
+        if self.engine is not None and key == ('GET', '/api/submissions/stream'):
+            return await self.observe('api.stream_submissions', scope, self.stream(scope, receive, send))
+        route = self.routes.get(key) if self.engine is not None else None
+        if route is None:
+            return await self.call_wsgi(scope, receive, send)
+        endpoint, handler = route
+        await self.observe(endpoint, scope, self.handle(endpoint, handler, scope, receive, send))
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                outbox = self.extensions.get('outbox')
+                if outbox is not None:
+                    outbox.start()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                bus = self.extensions.get('events')
+                if bus is not None:
+                    bus.close()
+                outbox = self.extensions.get('outbox')
+                if outbox is not None:
+                    await asyncio.get_running_loop().run_in_executor(self.executor, outbox.close)
+                if self.engine is not None:
+                    await self.engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def observe(self, endpoint, scope, handling):
+        """Run one async handler, recording it in /api/metrics when enabled"""
+        metrics = self.extensions.get('metrics')
+        if metrics is None:
+            return await handling
+        metrics.begin(endpoint)
+        started = time.perf_counter()
+        status = 500
+        try:
+            status = await handling
+        finally:
+            metrics.finish(endpoint, scope['method'], status, time.perf_counter() - started)
+
+    async def read_body(self, receive):
+        """Return the request body, or None if it exceeds ASGI_MAX_BODY_BYTES"""
+        chunks, size = [], 0
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if size > self.max_body_bytes:
+                return None
+            chunks.append(chunk)
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    async def send_response(self, send, request_headers, status, body=b'', headers=(),
+                            content_type='application/json'):
+        raw = [(b'content-type', content_type.encode('latin-1')), (b'content-length', str(len(body)).encode())]
+        raw += self.cors_headers(request_headers)
+        raw += [(name.encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+        await send({'type': 'http.response.start', 'status': status, 'headers': raw})
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    def cors_headers(request_headers):
+        """What Flask-CORS adds to /api/* responses (origins '*', with credentials)"""
+        origin = request_headers.get('origin')
+        if not origin:
+            return []
+        return [(b'access-control-allow-origin', origin.encode('latin-1')),
+                (b'access-control-allow-credentials', b'true'),
+                (b'vary', b'Origin')]
+
+    def client_address(self, request):
+        return client_address(request.client, request.headers.get('x-forwarded-for'), self.proxy_hops)
+
+    async def handle(self, endpoint, handler, scope, receive, send):
+        """Shed, read the body, run handler and send its (status, body, headers)"""
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        limiter = self.extensions.get('rate_limiter')
+        if limiter is not None and endpoint in self.rate_limited:
+            request = Request(scope, b'')
+            allowed, retry_after = limiter.check(self.client_address(request) or 'unknown')
+            if not allowed:
+                body = dumps({'error': 'Too many requests, please try again shortly'})
+                await self.send_response(send, headers, 429, body, [('Retry-After', str(retry_after))])
+                return 429
+
+        body = await self.read_body(receive)
+        if body is None:
+            await self.send_response(send, headers, 413, dumps({'error': 'Request body too large'}))
+            return 413
+        status, body, extra = await handler(Request(scope, body))
+        await self.send_response(send, headers, status, body, extra)
+        return status
+
+    async def call_wsgi(self, scope, receive, send):
+        """Serve a request with the Flask app on the thread pool"""
+        body = await self.read_body(receive)
+        if body is None:
+            await send({'type': 'http.response.start', 'status': 413, 'headers': [(b'content-type', b'text/plain')]})
+            await send({'type': 'http.response.body', 'body': b'Request body too large'})
+            return
+
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            # The server sends its own Date header
+            started['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                  for name, value in headers if name.lower() != 'date']
+
+        def first_chunk():
+            result = self.flask_app(wsgi_environ(scope, body), start_response)
+            chunks = iter(result)
+            return result, chunks, next(chunks, None)
+
+        result, chunks, chunk = await loop.run_in_executor(self.executor, first_chunk)
+        try:
+            await send({'type': 'http.response.start', 'status': started['status'], 'headers': started['headers']})
+            # Most responses are one chunk; streamed ones (exports) are pulled chunk by chunk
+            while chunk is not None:
+                following = await loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk or following is None:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': following is not None})
+                chunk = following
+                if chunk is None:
+                    return
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await loop.run_in_executor(self.executor, result.close)
+
+    @asynccontextmanager
+    async def connect(self):
+        """Check out an async connection, waiting in turn when the pool is busy"""
+        async with self._connections:
+            async with self.engine.connect() as conn:
+                yield conn
+
+    async def test_api(self, request):
+        return 200, dumps({'success': True, 'message': 'API is working!'}), ()
+
+    async def find_duplicate(self, conn, key):
+        """Return the id a repeat of an unexpired dedupe key is answered with, or None"""
+        table = SubmissionDedupe.__table__
+        row = (await conn.execute(
+            select(table.c.submission_id, table.c.provisional_id, table.c.expires_at).where(table.c.key == key)
+        )).first()
+        if row is not None and row.expires_at > datetime.utcnow():
+            return row.provisional_id or row.submission_id
+        return None
+
+    async def submit(self, kind, request):
+        """Async twin of the Flask submit routes (see api.save_submission)"""
+        if not request.is_json:
+            return 400, dumps({'error': 'Content-Type must be application/json'}), ()
+        validate, message = SUBMIT_FORMS[kind]
+        try:
+            try:
+                data = json.loads(request.body)
+            except ValueError as e:
+                return 500, dumps({'error': 'Failed to submit form', 'details': f'Invalid JSON: {e}'}), ()
+            try:
+                fields, content = validate(data)
+            except ValueError as e:
+                return 400, dumps({'error': str(e)}), ()
+
+            key, ttl = dedupe_key(kind, request.headers.get('idempotency-key'), fields['email'], content)
+            # One pooled connection for the lookup, the insert and the stats read
+            async with self.connect() as conn:
+                original_id = await self.find_duplicate(conn, key)
+                await conn.rollback()  # end the read transaction before writing
+                if original_id is not None:
+                    return 200, dumps({'success': True, 'message': message, 'id': original_id, 'duplicate': True}), ()
+
+                # Queue mode: the ingest writer commits in batches; the spill write may fsync
+                ingest = self.extensions.get('ingest')
+                if ingest is not None:
+                    queued_id = await asyncio.get_running_loop().run_in_executor(
+                        self.executor, ingest.submit, kind, fields, (key, ttl)
+                    )
+                    return 202, dumps({'success': True, 'message': message, 'id': queued_id, 'queued': True}), ()
+
+                submission_id, published = await self.insert_submission(conn, kind, fields, key, ttl)
+                if submission_id is None:
+                    return 200, dumps({'success': True, 'message': message, 'id': published, 'duplicate': True}), ()
+                await self.publish_submission(conn, kind, published)
+            outbox = self.extensions.get('outbox')
+            if outbox is not None:
+                outbox.wake()
+            return 201, dumps({'success': True, 'message': message, 'id': submission_id}), ()
+        except Exception as e:
+            print(f"Error in submit_{kind}: {traceback.format_exc()}")
+            return 500, dumps({'error': 'Failed to submit form', 'details': str(e)}), ()
+
+    async def insert_submission(self, conn, kind, fields, key, ttl):
+        """
+        Claim a dedupe key, then insert its submission and notification, in one transaction
+
+        Returns:
+            (new id, to_dict()-shaped row), or (None, original id) when a
+            concurrent request with the same key committed first
+        """
+        table = SUBMISSION_MODELS[kind].__table__
+        dedupe = SubmissionDedupe.__table__
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl)
+        async with conn.begin() as transaction:
+            # Plain INSERT, as api.claim_dedupe_key: concurrent repeats conflict on the key
+            await conn.execute(delete(dedupe).where(dedupe.c.key == key, dedupe.c.expires_at <= now))
+            claimed = await conn.execute(
+                sqlite_insert(dedupe)
+                .values(key=key, kind=kind, submission_id=0, expires_at=expires_at)
+                .on_conflict_do_nothing(index_elements=[dedupe.c.key])
+            )
+            if not claimed.rowcount:
+                row = (await conn.execute(
+                    select(dedupe.c.submission_id, dedupe.c.provisional_id).where(dedupe.c.key == key)
+                )).one()
+                original_id = row.provisional_id or row.submission_id
+                await transaction.rollback()
+                return None, original_id
+            result = await conn.execute(insert(table).values(**fields, submitted_at=now, read=False))
+            submission_id = result.inserted_primary_key[0]
+            await conn.execute(update(dedupe).where(dedupe.c.key == key).values(submission_id=submission_id))
+            if self.notify:
+                await conn.execute(insert(EmailOutbox.__table__).values(
+                    **outbox_values(kind, dict(fields, id=submission_id), now)
+                ))
+
+        self._dedupe_writes += 1
+        if self._dedupe_writes % DEDUPE_PURGE_EVERY == 0:
+            async with conn.begin():
+                await conn.execute(delete(dedupe).where(dedupe.c.expires_at <= datetime.utcnow()))
+        return submission_id, dict(fields, id=submission_id, submitted_at=now.isoformat(), read=False)
+
+    async def read_stats(self, conn, include_archived=False):
+        """Async models.read_stats(): the counters row, else direct counts"""
+        table = SubmissionStats.__table__
+        row = (await conn.execute(select(table).where(table.c.id == STATS_ROW_ID))).first()
+        if row is not None:
+            stats = {name: getattr(row, name) for name in STATS_FIELDS}
+            if include_archived:
+                stats = with_archived(stats, {kind: getattr(row, f'{kind}_archived') for kind in ARCHIVE_MODELS})
+            return stats, row.version
+        counts = {}
+        for kind, model in SUBMISSION_MODELS.items():
+            table = model.__table__
+            counts[f'{kind}_total'] = (await conn.execute(select(func.count()).select_from(table))).scalar()
+            counts[f'{kind}_unread'] = (await conn.execute(
+                select(func.count()).select_from(table).where(table.c.read == False)  # noqa: E712
+            )).scalar()
+        if include_archived:
+            archived = {}
+            for kind, model in ARCHIVE_MODELS.items():
+                archived[kind] = (await conn.execute(select(func.count()).select_from(model.__table__))).scalar()
+            counts = with_archived(counts, archived)
+        return counts, None
+
+    async def publish_submission(self, conn, kind, submission):
+        bus = self.extensions.get('events')
+        if bus is None:
+            return
+        stats, _ = await self.read_stats(conn)
+        await conn.rollback()
+        bus.publish('submission', {'kind': kind, 'submission': submission, 'stats': stats})
+
+    async def list_page(self, kind, request):
+        """Async twin of the list routes; same statement and encoder as api.list_submissions"""
+        model = SUBMISSION_MODELS[kind]
+        try:
+            statement, limit = submission_page_statement(model, LIST_FILTERS[kind], request.args)
+        except ValueError as e:
+            return 400, dumps({'error': str(e)}), ()
+        try:
+            async with self.connect() as conn:
+                rows = (await conn.execute(statement)).all()
+            return 200, encode_submission_page(model, rows, limit), ()
+        except Exception as e:
+            return 500, dumps({'error': 'Failed to fetch submissions', 'details': str(e)}), ()
+
+    async def get_stats(self, request):
+        try:
+            include_archived = parse_bool(request.args.get('include_archived', 'false'))
+        except ValueError as e:
+            return 400, dumps({'error': str(e)}), ()
+        try:
+            async with self.connect() as conn:
+                stats, _ = await self.read_stats(conn, include_archived)
+            return 200, dumps({'success': True, 'stats': stats}), ()
+        except Exception as e:
+            return 500, dumps({'error': 'Failed to fetch stats', 'details': str(e)}), ()
+
+    async def get_dashboard(self, request):
+        """Async twin of api.get_dashboard, including the ETag/304 shortcut"""
+        try:
+            limit = max(1, min(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+            async with self.connect() as conn:
+                stats, version = await self.read_stats(conn)
+                etag = dashboard_etag(version, limit) if version is not None else None
+                headers = [('Cache-Control', 'private, no-cache')]
+                if etag is not None:
+                    headers.append(('ETag', f'"{etag}"'))
+                    if etag in parse_etags(request.headers.get('if-none-match')):
+                        return 304, b'', headers
+                page_args = MultiDict({'limit': limit})
+                pages = []
+                for kind in ('contact', 'quote'):
+                    model = SUBMISSION_MODELS[kind]
+                    statement, _ = submission_page_statement(model, (), page_args)
+                    pages.append(encode_submission_page(model, (await conn.execute(statement)).all(), limit))
+            return 200, dashboard_body(stats, *pages), headers
+        except Exception as e:
+            return 500, dumps({'error': 'Failed to fetch dashboard', 'details': str(e)}), ()
+
+    async def stream(self, scope, receive, send):
+        """Async twin of api.stream_submissions: one coroutine per open stream"""
+        request = Request(scope, b'')
+        bus = self.extensions.get('events')
+        if bus is None:
+            await self.send_response(send, request.headers, 404, dumps({'error': 'Event stream is disabled'}))
+            return 404
+
+        last_event_id = request.headers.get('last-event-id') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = 0  # unknown id: resume as a reset
+
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def notify():
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:  # loop already closed
+                pass
+
+        subscribed = bus.subscribe(last_event_id, notify=notify)
+        if subscribed is None:
+            await self.send_response(send, request.headers, 503, dumps({'error': 'Too many open event streams'}),
+                                     [('Retry-After', '30')])
+            return 503
+
+        subscription, backlog, reset = subscribed
+        disconnected = asyncio.Event()
+
+        async def watch_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            disconnected.set()
+            wake.set()
+
+        watcher = asyncio.ensure_future(watch_disconnect())
+        try:
+            headers = [(b'content-type', b'text/event-stream; charset=utf-8'), (b'cache-control', b'no-cache'),
+                       (b'x-accel-buffering', b'no')] + self.cors_headers(request.headers)
+            await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+            # Browsers reconnect after this many ms and resend Last-Event-ID
+            opening = 'retry: 3000\n\n' + ('event: reset\ndata: {}\n\n' if reset else '') + ''.join(backlog)
+            await send({'type': 'http.response.body', 'body': opening.encode(), 'more_body': True})
+            while not disconnected.is_set():
+                if subscription.overflowed:
+                    # Fell more than a buffer behind; let the client reload
+                    await send({'type': 'http.response.body', 'body': b'event: reset\ndata: {}\n\n', 'more_body': True})
+                    break
+                frame = subscription.get_nowait()
+                if frame is None:
+                    wake.clear()
+                    # Checked again after clear() so a frame queued in between is not missed
+                    frame = subscription.get_nowait()
+                if frame is None:
+                    try:
+                        await asyncio.wait_for(wake.wait(), self.keepalive)
+                        continue
+                    except asyncio.TimeoutError:
+                        # A comment line keeps proxies from timing out an idle stream
+                        frame = ': keepalive\n\n'
+                if frame is CLOSED:
+                    break
+                await send({'type': 'http.response.body', 'body': frame.encode(), 'more_body': True})
+            if not disconnected.is_set():
+                await send({'type': 'http.response.body', 'body': b''})
+        except OSError:
+            pass  # client went away mid-send
+        finally:
+            subscription.close()
+            watcher.cancel()
+        return 200
+
+
+def create_asgi_app(config_name=None):
+    """
+    Build the ASGI app around a Flask app from create_app()
+
+    Args:
+        config_name: Configuration environment (see create_app)
+    """
+    return AsyncAPI(create_app(config_name))
+
+
+def __getattr__(name):
+    """Build the module-level ASGI app on first access (uvicorn asgi:app)"""
+    if name == 'app':
+        globals()['app'] = create_asgi_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Content-hashed asset URLs for the static site
+
+The build step (flask build-assets, or this script) copies every file
+under assets/ and public/ into static-build/ twice: under its own name
+and under a name carrying a hash of its content (main.css ->
+main.1b2c3d4e5f.css). References to those files in index.html,
+pages/*.html, includes/*.html and local url()s in stylesheets are
+rewritten to the hashed names, and static-build/manifest.json maps each
+source to its hashed path. static-build/ is a complete deployable copy of
+the static site: _redirects is copied as is, and a Netlify _headers file
+marks every hashed file immutable (_redirects itself cannot set headers).
+
+A hashed URL's content never changes, so it is served with
+Cache-Control: public, max-age=31536000, immutable and browsers do not
+revalidate it on repeat visits. The Flask app rewrites references the
+same way when it assembles pages (see PageCache) and serves hashed URLs
+from static-build/. Without a build everything keeps its original URL
+and revalidates as before. Paths built in JavaScript at runtime (the
+portfolio loader) are not rewritten and keep their original URLs.
+
+Usage:
+    python3 asset_manifest.py
+"""
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import threading
+import time
+
+from image_variants import file_sha256
+
+SOURCE_DIRS = ('assets', 'public')
+PAGE_FILES = ('index.html', 'pages', 'includes')
+BUILD_DIR = 'static-build'
+HASH_LENGTH = 10
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+MANIFEST_VERSION = 1
+
+# src="..." / href="..." attributes in HTML, url(...) in CSS
+HTML_REFERENCE = re.compile(r'''(\b(?:src|href)\s*=\s*["'])([^"'#?]+)''', re.I)
+CSS_REFERENCE = re.compile(r'''(url\(\s*["']?)([^"')#?]+)''', re.I)
+
+
+def hashed_name(path, digest):
+    """assets/css/main.css -> assets/css/main.<hash>.css"""
+    stem, extension = os.path.splitext(path)
+    return f'{stem}.{digest[:HASH_LENGTH]}{extension}'
+
+
+def find_files(root, dirs):
+    """Yield file paths under dirs relative to root, with '/' separators"""
+    for directory in dirs:
+        top = os.path.join(root, directory)
+        if os.path.isfile(top):
+            yield directory
+            continue
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if not filename.startswith('.'):
+                    path = os.path.join(dirpath, filename)
+                    yield os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def rewrite_references(text, files, pattern=HTML_REFERENCE, base=''):
+    """
+    Point references to fingerprinted files at their hashed names
+
+    Args:
+        text: HTML or CSS source
+        files: Source path -> hashed path, both relative to the site root
+        pattern: HTML_REFERENCE or CSS_REFERENCE
+        base: Directory of the CSS file, for its relative url()s
+
+    Returns:
+        text with each matching reference's path replaced; a leading
+        '/', './' or '../' in HTML references is kept
+    """
+    def replace(match):
+        reference = match.group(2)
+        if ':' in reference or reference.startswith('//'):
+            return match.group(0)  # absolute URL
+        if base and not reference.startswith('/'):
+            source = posixpath.normpath(posixpath.join(base, reference))
+            if source not in files:
+                return match.group(0)
+            return match.group(1) + posixpath.relpath(files[source], base)
+        source = reference.lstrip('/')
+        while source.startswith(('./', '../')):
+            source = source.split('/', 1)[1]
+        if source not in files:
+            return match.group(0)
+        return match.group(1) + reference[:len(reference) - len(source)] + files[source]
+
+    return pattern.sub(replace, text)
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def _copy(source, destination):
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    shutil.copy2(source, destination)
+
+
+def build_assets(root):
+    """
+    Fingerprint assets/ and public/ into static-build/ and rewrite the pages
+
+    Hashed files of the previous build are kept, so pages already open in
+    a browser can still load theirs; older ones are removed.
+
+    Args:
+        root: Site root (the directory holding assets/, public/ and pages/)
+
+    Returns:
+        (manifest, files fingerprinted)
+    """
+    build = os.path.join(root, BUILD_DIR)
+    manifest_path = os.path.join(build, 'manifest.json')
+    previous = load_manifest(manifest_path) or {'files': {}, 'previous': []}
+
+    sources = list(find_files(root, SOURCE_DIRS))
+    # Stylesheets are hashed after the files they reference, since
+    # rewriting their url()s changes their content
+    sources.sort(key=lambda path: path.endswith('.css'))
+    files = {}
+    for source in sources:
+        source_path = os.path.join(root, source)
+        if source.endswith('.css'):
+            with open(source_path, encoding='utf-8') as f:
+                css = rewrite_references(f.read(), files, CSS_REFERENCE, os.path.dirname(source))
+            data = css.encode('utf-8')
+            files[source] = hashed_name(source, hashlib.sha256(data).hexdigest())
+            _write(os.path.join(build, source), data)
+            _write(os.path.join(build, files[source]), data)
+            continue
+        files[source] = hashed_name(source, file_sha256(source_path))
+        _copy(source_path, os.path.join(build, source))
+        _copy(source_path, os.path.join(build, files[source]))
+
+    for page in find_files(root, PAGE_FILES):
+        if not page.endswith('.html'):
+            continue
+        with open(os.path.join(root, page), encoding='utf-8') as f:
+            html = rewrite_references(f.read(), files)
+        _write(os.path.join(build, page), html.encode('utf-8'))
+
+    if os.path.exists(os.path.join(root, '_redirects')):
+        _copy(os.path.join(root, '_redirects'), os.path.join(build, '_redirects'))
+    hashed = sorted(set(files.values()) | set(previous['files'].values()))
+    rules = ''.join(f'/{path}\n  Cache-Control: public, max-age={IMMUTABLE_MAX_AGE}, immutable\n' for path in hashed)
+    _write(os.path.join(build, '_headers'), rules.encode('utf-8'))
+
+    # Keep this build's and the previous build's hashed files
+    kept = set(files.values()) | set(previous['files'].values())
+    for path in previous.get('previous', []):
+        if path not in kept:
+            try:
+                os.remove(os.path.join(build, path))
+            except FileNotFoundError:
+                pass
+
+    manifest = {'version': MANIFEST_VERSION, 'files': files, 'previous': sorted(set(previous['files'].values()))}
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+    return manifest, len(files)
+
+
+def cache_forever(response):
+    """Mark a response for a hashed URL as never changing"""
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+class AssetManifest:
+    """Hashed asset names from the last build, reloaded when it is rebuilt"""
+
+    def __init__(self, root, check_interval=1.0):
+        """
+        Args:
+            root: Site root holding static-build/manifest.json
+            check_interval: Seconds between checks for a rebuilt manifest
+        """
+        self.path = os.path.join(root, BUILD_DIR, 'manifest.json')
+        self.check_interval = check_interval
+        self._files = {}
+        self._sources = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _current(self):
+        """
+        Return (source -> hashed path, hashed path -> source), reloading
+        them if the manifest changed. Hashed paths of the previous build
+        map to None.
+        """
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return self._files, self._sources
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                self._files, self._sources, self._mtime = {}, {}, None
+                return self._files, self._sources
+            if mtime != self._mtime:
+                manifest = load_manifest(self.path) or {'files': {}, 'previous': []}
+                sources = dict.fromkeys(manifest['previous'])
+                sources.update((hashed, source) for source, hashed in manifest['files'].items())
+                self._files, self._sources = manifest['files'], sources
+                self._mtime = mtime
+        return self._files, self._sources
+
+    @property
+    def mtime(self):
+        """Change token for caches built from the manifest (0.0 without a build)"""
+        self._current()
+        return self._mtime or 0.0
+
+    def is_hashed(self, filename):
+        """Return True if filename is a hashed path of this or the previous build"""
+        return filename in self._current()[1]
+
+    def source_for(self, filename):
+        """Return the source path of a hashed path of this build, else None"""
+        return self._current()[1].get(filename)
+
+    def rewrite(self, html):
+        """Point an assembled page's asset references at their hashed names"""
+        files = self._current()[0]
+        return rewrite_references(html, files) if files else html
+
+
+def main():
+    root = os.path.dirname(os.path.abspath(__file__))
+    manifest, count = build_assets(root)
+    print(f"✓ {count} assets fingerprinted into {BUILD_DIR}/")
+
+
+if __name__ == '__main__':
+    main()
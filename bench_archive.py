@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Hot/cold archival benchmark
+
+Seeds --years of contact submissions (--per-day a day, nearly all of the
+old ones read) into a fresh database, then runs the archival job and
+reports:
+
+    size     bytes of the hot table and its indexes before and after
+    queries  admin queries on the hot table before and after: the unread
+             and project_type list pages, a full search and the row
+             counts the stats fall back to
+    batches  the longest write transaction (per batch) the job held, the
+             time a form submit waits behind it at most
+
+Usage:
+    python3 bench_archive.py [--years 5] [--per-day 50] [--days 180]
+                             [--batch-size 500] [--repeat 20]
+"""
+import argparse
+import datetime
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import event, text
+
+from bench_sqlite import percentile
+
+QUERIES = {
+    'unread page': '/api/submissions/contact?read=false&limit=50',
+    'project_type page': '/api/submissions/contact?project_type=website&limit=50',
+    'search': '/api/submissions/search?q=website',
+}
+
+
+def seed(db, years, per_day):
+    """Insert years of submissions; everything older than a month is read"""
+    rng = random.Random(1)
+    now = datetime.datetime.utcnow()
+    total = int(years * 365 * per_day)
+    rows = []
+    for i in range(total):
+        submitted_at = now - datetime.timedelta(days=years * 365 * (1 - i / total))
+        old = (now - submitted_at).days > 30
+        rows.append({
+            'name': f'Customer {i}', 'email': f'customer{i}@example.com',
+            'project_type': rng.choice(['website', 'logo', 'print', 'social']),
+            'message': f'Hello, I need help with a new website and logo ({i}). ' * 2,
+            # Keep the ORM's timestamp format so cursors compare correctly
+            'submitted_at': submitted_at.strftime('%Y-%m-%d %H:%M:%S.%f'),
+            'read': old or rng.random() < 0.5,
+        })
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO contact_submissions (name, email, project_type, message, submitted_at, read) "
+            "VALUES (:name, :email, :project_type, :message, :submitted_at, :read)"
+        ), rows)
+    return total
+
+
+def hot_bytes(db):
+    """Bytes of contact_submissions and its indexes (dbstat)"""
+    with db.engine.connect() as conn:
+        return conn.execute(text(
+            "SELECT SUM(pgsize) FROM dbstat WHERE name = 'contact_submissions' "
+            "OR (name LIKE 'ix\\_contact\\_%' ESCAPE '\\' AND name NOT LIKE '%archive%')"
+        )).scalar()
+
+
+def time_queries(app, repeat):
+    from models import count_stats
+
+    client = app.test_client()
+    results = {}
+    for label, url in QUERIES.items():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            client.get(url)
+            samples.append(time.perf_counter() - start)
+        results[label] = percentile(samples, 50)
+    with app.app_context():
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            count_stats()
+            samples.append(time.perf_counter() - start)
+    results['count_stats'] = percentile(samples, 50)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=float, default=5)
+    parser.add_argument('--per-day', type=float, default=50)
+    parser.add_argument('--days', type=int, default=180, help='archive read rows older than this')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench-archive-'), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+    from app import create_app
+    from archive import archive_submissions
+    from models import db
+
+    app = create_app('production')
+    with app.app_context():
+        rows = seed(db, args.years, args.per_day)
+        size_before = hot_bytes(db)
+    before = time_queries(app, args.repeat)
+
+    # Time each committed transaction of the job, i.e. each batch's copy and delete
+    transactions, opened = [], {}
+    with app.app_context():
+        engine = db.engine
+
+        def on_begin(conn):
+            opened[id(conn)] = time.perf_counter()
+
+        def on_commit(conn):
+            started = opened.pop(id(conn), None)
+            if started is not None:
+                transactions.append(time.perf_counter() - started)
+
+        event.listen(engine, 'begin', on_begin)
+        event.listen(engine, 'commit', on_commit)
+        started = time.perf_counter()
+        moved = archive_submissions(args.days, batch_size=args.batch_size, pause=0)
+        elapsed = time.perf_counter() - started
+        event.remove(engine, 'begin', on_begin)
+        event.remove(engine, 'commit', on_commit)
+        size_after = hot_bytes(db)
+    after = time_queries(app, args.repeat)
+
+    print(f"{rows} rows over {args.years:g} years; archived {moved['contact']} "
+          f"(read, older than {args.days} days) in {elapsed:.2f} s")
+    print(f"longest write transaction {max(transactions) * 1000:.1f} ms "
+          f"({len(transactions)} transactions of up to {args.batch_size} rows)")
+    print(f"hot table + indexes {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB\n")
+    print(f"{'query (p50 ms)':<20}{'before':>9}{'after':>9}")
+    for label in before:
+        print(f"{label:<20}{before[label] * 1000:>9.2f}{after[label] * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
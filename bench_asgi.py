@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+ASGI vs WSGI concurrency benchmark
+
+Starts each server on a local port against its own freshly seeded
+database, then holds --connections keep-alive HTTP/1.1 connections open
+from one asyncio load generator in this process and drives them for
+--duration seconds per scenario:
+
+    stats    GET /api/submissions/stats
+    list     GET /api/submissions/contact?limit=50
+    submit   POST /api/contact with unique payloads
+    slow     --slow clients trickle request headers a byte a second while
+             the other connections GET /api/submissions/stats
+
+Servers (each one process; the rate limiter is switched off):
+
+    asgi     uvicorn asgi:app
+    wsgi     gunicorn -k gthread --threads --wsgi-threads app:app
+
+Each scenario reports throughput, p50/p95/p99 latency and failed requests
+(errors, non-2xx or connections refused/reset). The load generator shares
+the machine with the server, so compare the two servers with each other,
+not with other hosts. Needs uvicorn, aiosqlite and gunicorn installed.
+
+Usage:
+    python3 bench_asgi.py [--servers asgi,wsgi] [--connections 1000]
+                          [--duration 10] [--scenarios stats,list,submit,slow]
+                          [--slow 200] [--rows 1000] [--wsgi-threads 16]
+                          [--output bench-asgi.json]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_sqlite import percentile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = {
+    'stats': ('GET', '/api/submissions/stats'),
+    'list': ('GET', '/api/submissions/contact?limit=50'),
+    'submit': ('POST', '/api/contact'),
+    'slow': ('GET', '/api/submissions/stats'),
+}
+
+# Unique payloads so dedupe never short-circuits a submit
+_submit_ids = itertools.count()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port, args):
+    if server == 'asgi':
+        return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+                '--log-level', 'warning', '--no-access-log', '--backlog', str(args.connections * 2)]
+    return [sys.executable, '-m', 'gunicorn', '-k', 'gthread', '--workers', '1',
+            '--threads', str(args.wsgi_threads), '--worker-connections', str(args.connections * 2),
+            '--backlog', str(args.connections * 2), '--bind', f'127.0.0.1:{port}',
+            '--log-level', 'warning', 'app:app']
+
+
+def seed_database(path, rows):
+    """Create a database at path with rows contact submissions"""
+    code = (
+        "import sys\n"
+        "from sqlalchemy import text\n"
+        "from app import create_app\n"
+        "from models import db, rebuild_submission_stats\n"
+        "app = create_app('production')\n"
+        "with app.app_context():\n"
+        "    with db.engine.begin() as conn:\n"
+        "        conn.execute(text(\"INSERT INTO contact_submissions (name, email, project_type, message, \"\n"
+        "            \"submitted_at, read) VALUES (:name, :email, 'website', :message, CURRENT_TIMESTAMP, 0)\"),\n"
+        "            [{'name': f'Seed {i}', 'email': f'seed{i}@example.com', 'message': f'Seed message {i}'}\n"
+        "             for i in range(int(sys.argv[1]))])\n"
+        "    rebuild_submission_stats()\n"
+    )
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + path, FLASK_CONFIG='production')
+    subprocess.run([sys.executable, '-c', code, str(rows)], cwd=ROOT, env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def start_server(server, args):
+    """Start server against a fresh seeded database; returns (process, port)"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench-asgi-'), 'bench.db')
+    seed_database(db_path, args.rows)
+    port = free_port()
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + db_path, FLASK_CONFIG='production',
+               RATE_LIMIT_ENABLED='false')
+    process = subprocess.Popen(server_command(server, port, args), cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f'{server} server did not start')
+
+
+def build_request(method, path):
+    if method == 'POST':
+        n = next(_submit_ids)
+        body = json.dumps({'name': 'Bench User', 'email': f'bench{n}@example.com',
+                           'message': f'Benchmark message {n}'}).encode()
+        head = (f'POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n\r\n')
+        return head.encode() + body
+    return f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode()
+
+
+async def read_response(reader):
+    """Read one response; returns its status"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split(' ', 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return status
+
+
+async def client(port, method, path, stop_at, samples, failures, opened):
+    """Send requests on one keep-alive connection until stop_at"""
+    writer = None
+    while time.perf_counter() < stop_at:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                opened[0] += 1
+            start = time.perf_counter()
+            writer.write(build_request(method, path))
+            status = await read_response(reader)
+            elapsed = time.perf_counter() - start
+            if 200 <= status < 300:
+                samples.append(elapsed)
+            else:
+                failures[0] += 1
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            failures[0] += 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.05)
+    if writer is not None:
+        writer.close()
+
+
+async def slow_client(port, stop_at):
+    """Hold a connection open, sending a request's headers one byte a second"""
+    request = b'GET /api/submissions/stats HTTP/1.1\r\nHost: localhost\r\nX-Padding: ' + b'x' * 64
+    try:
+        _, writer = await asyncio.open_connection('127.0.0.1', port)
+    except OSError:
+        return
+    try:
+        for byte in request:
+            if time.perf_counter() >= stop_at:
+                break
+            writer.write(bytes([byte]))
+            await writer.drain()
+            await asyncio.sleep(1)
+    except OSError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_scenario(port, scenario, args):
+    method, path = SCENARIOS[scenario]
+    fast = args.connections
+    slow = []
+    if scenario == 'slow':
+        fast = max(1, args.connections - args.slow)
+        stop_at = time.perf_counter() + args.duration + 1
+        slow = [asyncio.ensure_future(slow_client(port, stop_at)) for _ in range(args.slow)]
+        await asyncio.sleep(1)  # let the slow clients take their seats first
+    samples, failures, opened = [], [0], [0]
+    began = time.perf_counter()
+    stop_at = began + args.duration
+    await asyncio.gather(*[client(port, method, path, stop_at, samples, failures, opened) for _ in range(fast)])
+    elapsed = time.perf_counter() - began
+    for task in slow:
+        task.cancel()
+    await asyncio.gather(*slow, return_exceptions=True)
+    return {
+        'connections': fast,
+        'slow_clients': len(slow),
+        'opened': opened[0],
+        'requests': len(samples),
+        'errors': failures[0],
+        'rps': len(samples) / elapsed,
+        'p50_ms': percentile(samples, 50) * 1000 if samples else None,
+        'p95_ms': percentile(samples, 95) * 1000 if samples else None,
+        'p99_ms': percentile(samples, 99) * 1000 if samples else None,
+    }
+
+
+def importable(name):
+    try:
+        __import__(name)
+        return True
+    except ImportError:
+        return False
+
+
+def fmt(value):
+    return f'{value:>9.1f}' if value is not None else f'{"-":>9}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--servers', default='asgi,wsgi')
+    parser.add_argument('--connections', type=int, default=1000)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--slow', type=int, default=200, help='slow clients in the slow scenario')
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--wsgi-threads', type=int, default=16)
+    parser.add_argument('--output', help='write results as JSON')
+    args = parser.parse_args()
+
+    # Every connection is a socket on both ends
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, max(soft, args.connections * 2 + 256))
+    resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+
+    modules = {'asgi': ('uvicorn', 'aiosqlite'), 'wsgi': ('gunicorn',)}
+    results = []
+    print(f"{'server':<7}{'scenario':<9}{'conns':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for server in args.servers.split(','):
+        missing = [name for name in modules[server] if not importable(name)]
+        if missing:
+            print(f"{server:<7}skipped: {', '.join(missing)} not installed")
+            continue
+        process, port = start_server(server, args)
+        try:
+            for scenario in args.scenarios.split(','):
+                stats = asyncio.run(run_scenario(port, scenario, args))
+                results.append(dict(server=server, scenario=scenario, **stats))
+                print(f"{server:<7}{scenario:<9}{stats['connections']:>6}{stats['rps']:>9.0f}"
+                      f"{fmt(stats['p50_ms'])}{fmt(stats['p95_ms'])}{fmt(stats['p99_ms'])}"
+                      f"{stats['errors']:>8}", flush=True)
+        finally:
+            process.terminate()
+            process.wait(10)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'connections': args.connections, 'duration': args.duration,
+                       'wsgi_threads': args.wsgi_threads, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
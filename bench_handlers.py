@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Cold-start and warm-call timing for the Vercel functions in api/
+
+Cold start: each run spawns a fresh interpreter that loads the function
+module, serves one request on a local port and reports import time and
+time to first response. Warm calls: one process keeps the module loaded
+and sends repeated requests, like a warm serverless instance.
+
+create-checkout runs against a local stub Stripe API (stripe_stub.py)
+unless --real-stripe is given, in which case STRIPE_SECRET_KEY is used.
+
+Usage:
+    python3 bench_handlers.py [--cold-runs 5] [--warm-calls 200] [--function contact]
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+FUNCTIONS = {
+    'contact': {'name': 'Test User', 'email': 'test@example.com', 'message': 'Timing run'},
+    'quote': {'name': 'Test User', 'email': 'test@example.com', 'project': 'Timing run'},
+    'create-checkout': {'orderSummary': 'Timing run', 'customerEmail': 'test@example.com'},
+}
+
+
+def load_handler(function):
+    """Import api/<function>/index.py and return its handler class"""
+    path = os.path.join(ROOT, 'api', function, 'index.py')
+    spec = importlib.util.spec_from_file_location(f'vercel_{function.replace("-", "_")}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+def serve(handler_class):
+    """Start a local server for handler_class and return (server, port)"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler_class)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def request(port, method, payload):
+    """Send one request and return (status, elapsed seconds)"""
+    body = json.dumps(payload).encode() if method == 'POST' else None
+    headers = {'Content-Type': 'application/json', 'Origin': 'http://localhost'}
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    conn.request(method, '/', body=body, headers=headers)
+    response = conn.getresponse()
+    response.read()
+    conn.close()
+    return response.status, time.perf_counter() - start
+
+
+def child(function, method):
+    """Cold-start child: import, serve one request, print timings as JSON"""
+    start = time.perf_counter()
+    handler_class = load_handler(function)
+    imported = time.perf_counter()
+    server, port = serve(handler_class)
+    status, _ = request(port, method, FUNCTIONS[function])
+    done = time.perf_counter()
+    server.shutdown()
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'first_response_ms': (done - start) * 1000,
+        'status': status,
+        'stripe_loaded': 'stripe' in sys.modules
+    }))
+
+
+def cold(function, method, runs):
+    """Spawn runs fresh interpreters and collect their timings"""
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', function, '--method', method],
+            capture_output=True, text=True, check=True, cwd=ROOT
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['process_ms'] = (time.perf_counter() - start) * 1000
+        results.append(result)
+    return results
+
+
+def warm(function, method, calls):
+    """Time repeated calls against one loaded instance"""
+    server, port = serve(load_handler(function))
+    request(port, method, FUNCTIONS[function])  # first call outside the sample
+    samples = [request(port, method, FUNCTIONS[function])[1] for _ in range(calls)]
+    server.shutdown()
+    return sorted(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--warm-calls', type=int, default=200)
+    parser.add_argument('--function', choices=sorted(FUNCTIONS), action='append')
+    parser.add_argument('--real-stripe', action='store_true', help='call the real Stripe API')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--method', default='POST', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.method)
+        return
+
+    if not args.real_stripe:
+        from stripe_stub import start_stub
+        stub = start_stub()
+        # Inherited by the cold-start children too
+        os.environ['STRIPE_API_BASE'] = f'http://127.0.0.1:{stub.server_address[1]}'
+        os.environ['STRIPE_SECRET_KEY'] = 'sk_test_stub'
+
+    print(f"{'function':<17}{'method':<9}{'import ms':>10}{'cold 1st ms':>12}{'process ms':>11}"
+          f"{'warm p50':>10}{'warm p95':>10}{'status':>8}  stripe")
+    for function in args.function or sorted(FUNCTIONS):
+        for method in ('OPTIONS', 'POST'):
+            runs = cold(function, method, args.cold_runs)
+            samples = warm(function, method, args.warm_calls)
+            p95 = samples[min(len(samples) - 1, int(0.95 * len(samples)))]
+            print(f"{function:<17}{method:<9}"
+                  f"{statistics.median(r['import_ms'] for r in runs):>10.2f}"
+                  f"{statistics.median(r['first_response_ms'] for r in runs):>12.2f}"
+                  f"{statistics.median(r['process_ms'] for r in runs):>11.1f}"
+                  f"{statistics.median(samples) * 1000:>10.3f}{p95 * 1000:>10.3f}"
+                  f"{runs[-1]['status']:>8}  {'loaded' if runs[-1]['stripe_loaded'] else '-'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Route benchmark suite
+
+Builds create_app('testing') against a fresh database per table size,
+seeds that many contact and quote submissions, then drives every page
+route, the static catch-all, the admin list/stats/dashboard/search
+endpoints and the submit endpoints through two transports:
+
+    client   Flask test client in this process (app code only)
+    wsgi     werkzeug server on a local port, HTTP/1.1 keep-alive
+             connections from --concurrency client threads
+
+Each endpoint reports throughput and p50/p95/p99 latency. Submit
+endpoints run last for each size since they grow the tables. Results go
+to a JSON file (with the git commit) and --compare prints the p50 change
+against an earlier file.
+
+Usage:
+    python3 bench_routes.py [--sizes 0,1000,10000] [--requests 300]
+                            [--transport client,wsgi] [--concurrency 4]
+                            [--output bench-routes.json] [--compare old.json]
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+from bench_sqlite import percentile
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+PAGES = ['/', '/work', '/about', '/contact', '/quote', '/stickers', '/order-stickers',
+         '/process', '/payments', '/terms', '/portfolio', '/admin']
+STATIC = ['/assets/css/style.css', '/assets/images/Visualize.svg', '/index.html']
+ADMIN = ['/api/submissions/contact?limit=50', '/api/submissions/quote?limit=50',
+         '/api/submissions/contact?limit=50&read=false', '/api/submissions/stats',
+         '/api/dashboard', '/api/submissions/search?q=website']
+SUBMIT = ['/api/contact', '/api/quote']
+
+# Unique payloads so dedupe never short-circuits a submit
+_submit_ids = itertools.count()
+
+
+def submit_body(path):
+    n = next(_submit_ids)
+    if path == '/api/contact':
+        data = {'name': 'Bench User', 'email': f'bench{n}@example.com', 'message': f'Benchmark message {n}'}
+    else:
+        data = {'name': 'Bench User', 'email': f'bench{n}@example.com', 'project': f'Benchmark website {n}'}
+    return json.dumps(data).encode()
+
+
+def seed(db, rows, batch_size=5000):
+    """Insert rows contact and rows quote submissions"""
+    with db.engine.begin() as conn:
+        for start in range(0, rows, batch_size):
+            batch = range(start, min(rows, start + batch_size))
+            conn.execute(text(
+                "INSERT INTO contact_submissions (name, email, project_type, message, submitted_at, read) "
+                "VALUES (:name, :email, 'website', :message, CURRENT_TIMESTAMP, :read)"
+            ), [{'name': f'Seed {i}', 'email': f'seed{i}@example.com',
+                 'message': f'Seed message {i} about a new website', 'read': i % 3 == 0} for i in batch])
+            conn.execute(text(
+                "INSERT INTO quote_submissions (name, email, package, project_details, submitted_at, read) "
+                "VALUES (:name, :email, 'starter', :details, CURRENT_TIMESTAMP, :read)"
+            ), [{'name': f'Seed {i}', 'email': f'seed{i}@example.com',
+                 'details': f'Seed quote {i} for a website', 'read': i % 3 == 0} for i in batch])
+
+
+def summarize(samples, elapsed, errors):
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'rps': len(samples) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(samples, 50) * 1000,
+        'p95_ms': percentile(samples, 95) * 1000,
+        'p99_ms': percentile(samples, 99) * 1000
+    }
+
+
+def ok(method, status):
+    return status in (200, 201, 202) if method == 'POST' else status == 200
+
+
+def bench_client(app, method, path, count, warmup):
+    """Time count sequential requests through the test client"""
+    client = app.test_client()
+
+    def call():
+        if method == 'POST':
+            return client.post(path, data=submit_body(path), content_type='application/json').status_code
+        return client.get(path).status_code
+
+    for _ in range(warmup):
+        call()
+    samples, errors = [], 0
+    began = time.perf_counter()
+    for _ in range(count):
+        start = time.perf_counter()
+        errors += not ok(method, call())
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - began, errors)
+
+
+class KeepAliveHandler(WSGIRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_request(self, *args):
+        pass
+
+
+def serve(app):
+    """Start a threaded werkzeug server for app and return (server, port)"""
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=KeepAliveHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_port
+
+
+def bench_wsgi(port, method, path, count, warmup, concurrency):
+    """Time count requests split across concurrency keep-alive connections"""
+    headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
+    per_thread = max(1, count // concurrency)
+    samples, errors = [], [0]
+    lock = threading.Lock()
+    ready = threading.Barrier(concurrency + 1)
+
+    def call(conn):
+        body = submit_body(path) if method == 'POST' else None
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        return response.status
+
+    def worker():
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        for _ in range(max(1, warmup // concurrency)):
+            call(conn)
+        local, failed = [], 0
+        ready.wait()
+        for _ in range(per_thread):
+            start = time.perf_counter()
+            failed += not ok(method, call(conn))
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            samples.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    began = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return summarize(samples, time.perf_counter() - began, errors[0])
+
+
+def run_size(rows, args):
+    """Benchmark every endpoint against a fresh database of rows per kind"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench-routes-'), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+    from app import create_app
+    from models import db, rebuild_submission_stats
+
+    app = create_app('testing')
+    with app.app_context():
+        seed(db, rows)
+        rebuild_submission_stats()
+
+    endpoints = ([('page', 'GET', p) for p in PAGES] + [('static', 'GET', p) for p in STATIC]
+                 + [('admin', 'GET', p) for p in ADMIN] + [('submit', 'POST', p) for p in SUBMIT])
+    results = []
+    server, port = serve(app) if 'wsgi' in args.transport else (None, None)
+    try:
+        for group, method, path in endpoints:
+            for transport in args.transport:
+                if transport == 'client':
+                    stats = bench_client(app, method, path, args.requests, args.warmup)
+                else:
+                    stats = bench_wsgi(port, method, path, args.requests, args.warmup, args.concurrency)
+                result = dict(rows=rows, transport=transport, group=group, method=method, path=path, **stats)
+                results.append(result)
+                print(f"{rows:>8}  {transport:<7}{method:<5}{path:<46}{stats['rps']:>9.0f}"
+                      f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['p99_ms']:>9.2f}"
+                      f"{stats['errors']:>7}", flush=True)
+    finally:
+        if server is not None:
+            server.shutdown()
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, path):
+    """Print the p50 change of each endpoint against an earlier results file"""
+    with open(path) as f:
+        previous = json.load(f)
+    key = lambda r: (r['rows'], r['transport'], r['method'], r['path'])
+    old = {key(r): r for r in previous['results']}
+    print(f"\nvs {path} (commit {previous.get('commit')}): p50 change")
+    for result in results:
+        before = old.get(key(result))
+        if before is None or not before['p50_ms']:
+            continue
+        change = (result['p50_ms'] / before['p50_ms'] - 1) * 100
+        print(f"{result['rows']:>8}  {result['transport']:<7}{result['method']:<5}{result['path']:<46}"
+              f"{before['p50_ms']:>9.2f} -> {result['p50_ms']:>7.2f} ms {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='0,1000,10000', help='comma-separated rows per submission kind')
+    parser.add_argument('--requests', type=int, default=300, help='timed requests per endpoint and transport')
+    parser.add_argument('--warmup', type=int, default=20, help='untimed requests first')
+    parser.add_argument('--transport', default='client,wsgi', help='client, wsgi or both')
+    parser.add_argument('--concurrency', type=int, default=4, help='client threads for the wsgi transport')
+    parser.add_argument('--output', default='bench-routes.json', help='where to write the JSON results')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+    args.transport = [t.strip() for t in args.transport.split(',') if t.strip()]
+    if not set(args.transport) <= {'client', 'wsgi'}:
+        parser.error('--transport takes client and/or wsgi')
+
+    print(f"{'rows':>8}  {'via':<7}{'':<5}{'path':<46}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>7}")
+    results = []
+    for rows in (int(size) for size in args.sizes.split(',')):
+        results.extend(run_size(rows, args))
+
+    report = {
+        'commit': git_commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'settings': {key: getattr(args, key) for key in ('sizes', 'requests', 'warmup', 'transport', 'concurrency')},
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ {len(results)} results written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+    if any(r['errors'] for r in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Full-text search benchmark
+
+Loads synthetic contact submissions into a fresh database (the FTS5
+triggers index them as they are inserted), then times the first page of
+/api/submissions/search against a LIKE scan of every row over the same
+columns, which is roughly what searching the downloaded list used to
+cost. Words matching most rows are slow to rank: bm25 scores every match.
+Also times a full `rebuild-search`.
+
+Usage:
+    python3 bench_search.py [--rows 1000000] [--repeat 20] [--like-repeat 3]
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import text
+
+from bench_sqlite import percentile
+
+# Zipf-ish vocabulary so there are both rare and very common terms
+VOCABULARY = [f'{a}{b}{c}' for a in 'bcdfgklmnprst' for b in 'aeiou' for c in ('n', 'r', 'l', 'st', 'k')]
+FIRST_NAMES = ['Jane', 'John', 'Maria', 'Wei', 'Amara', 'Lukas', 'Priya', 'Omar', 'Sofia', 'Kenji']
+LAST_NAMES = ['Doe', 'Smith', 'Garcia', 'Chen', 'Okafor', 'Muller', 'Patel', 'Haddad', 'Rossi', 'Sato']
+
+
+def synthetic_rows(count, seed=1):
+    """Yield (name, email, message) tuples"""
+    rng = random.Random(seed)
+    weights = [1.0 / (rank + 1) for rank in range(len(VOCABULARY))]
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        words = rng.choices(VOCABULARY, weights, k=rng.randint(8, 30))
+        yield (f'{first} {last}', f'{first.lower()}.{last.lower()}{i}@example.com', ' '.join(words))
+
+
+def load_rows(db, rows, batch_size=10000):
+    """Insert rows in batches with the triggers active; returns seconds taken"""
+    start = time.perf_counter()
+    batch = []
+    with db.engine.begin() as conn:
+        for name, email, message in rows:
+            batch.append({'name': name, 'email': email, 'message': message})
+            if len(batch) >= batch_size:
+                insert_batch(conn, batch)
+                batch = []
+        if batch:
+            insert_batch(conn, batch)
+    return time.perf_counter() - start
+
+
+def insert_batch(conn, batch):
+    conn.execute(text(
+        "INSERT INTO contact_submissions (name, email, message, submitted_at, read) "
+        "VALUES (:name, :email, :message, CURRENT_TIMESTAMP, 0)"
+    ), batch)
+
+
+def time_calls(call, repeat):
+    """Run call repeat times and return sorted durations in seconds"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+    return sorted(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20, help='timed calls per FTS query')
+    parser.add_argument('--like-repeat', type=int, default=3, help='timed calls per LIKE scan')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench-search-'), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+    from api import fts_query
+    from app import create_app
+    from models import db, rebuild_search_index
+
+    app = create_app('production')
+    if not app.extensions['search']:
+        raise SystemExit('This SQLite build has no FTS5')
+
+    with app.app_context():
+        seconds = load_rows(db, synthetic_rows(args.rows))
+        print(f"Loaded {args.rows} rows with FTS triggers in {seconds:.1f}s "
+              f"({args.rows / seconds:,.0f} rows/s), database {os.path.getsize(db_path) / 1e6:.0f} MB\n")
+
+    queries = [
+        ('rare word', VOCABULARY[-1]),
+        ('common word', VOCABULARY[0]),
+        ('two words', f'{VOCABULARY[3]} {VOCABULARY[40]}'),
+        ('prefix', VOCABULARY[200][:2]),
+        ('email', 'jane.doe1234'),
+    ]
+
+    client = app.test_client()
+    print(f"{'query':<13}{'matches':>10}{'fts p50 ms':>12}{'fts p95 ms':>12}{'scan p50 ms':>13}{'speedup':>9}")
+    for label, q in queries:
+        url = f'/api/submissions/search?kind=contact&limit=50&q={q}'
+        assert client.get(url).status_code == 200
+        fts = time_calls(lambda: client.get(url), args.repeat)
+
+        pattern = f'%{q.split()[0]}%'
+        # Every row is checked, as when the whole list was searched in the browser
+        like_sql = text(
+            "SELECT COUNT(*) FROM contact_submissions "
+            "WHERE name LIKE :p OR email LIKE :p OR message LIKE :p"
+        )
+        with app.app_context():
+            matches = db.session.execute(
+                text("SELECT COUNT(*) FROM contact_submissions_fts WHERE contact_submissions_fts MATCH :m"),
+                {'m': fts_query(q)}
+            ).scalar()
+            like = time_calls(lambda: db.session.execute(like_sql, {'p': pattern}).scalar(), args.like_repeat)
+
+        fts_p50, like_p50 = percentile(fts, 50), percentile(like, 50)
+        print(f"{label:<13}{matches:>10}{fts_p50 * 1000:>12.2f}{percentile(fts, 95) * 1000:>12.2f}"
+              f"{like_p50 * 1000:>13.1f}{like_p50 / fts_p50:>8.0f}x")
+
+    with app.app_context():
+        start = time.perf_counter()
+        rebuild_search_index()
+        print(f"\nrebuild-search: {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+List endpoint serialization benchmark
+
+Seeds contact submissions into a fresh database, then walks every page
+of /api/submissions/contact (at the maximum page size) three ways and
+reports time and memory per 10k rows:
+
+    orm      the previous path: ORM objects, to_dict() per row, jsonify
+    json     column tuples encoded with the json module
+    orjson   column tuples encoded with orjson (skipped if not installed)
+
+Only the page call is timed, not decoding its body for the next cursor.
+Memory is tracemalloc's peak while walking the pages, which counts the
+objects each path allocates per page. The ORM path is timed with the
+session cleared per page, as each request starts with an empty one.
+
+Usage:
+    python3 bench_serialize.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import and_, or_, text
+from werkzeug.datastructures import MultiDict
+
+
+def orm_page(model, args):
+    """The list path before column projection: ORM rows, to_dict(), jsonify"""
+    from flask import jsonify
+    from api import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
+    limit = min(args.get('limit', type=int), MAX_PAGE_SIZE)
+    query = model.query
+    before = args.get('before')
+    if before:
+        submitted_at, submission_id = decode_cursor(before)
+        query = query.filter(or_(
+            model.submitted_at < submitted_at,
+            and_(model.submitted_at == submitted_at, model.id < submission_id)
+        ))
+    rows = query.order_by(model.submitted_at.desc(), model.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return jsonify({
+        'success': True,
+        'submissions': [s.to_dict() for s in rows],
+        'has_more': has_more,
+        'next_before': encode_cursor(rows[-1]) if has_more else None
+    }).get_data()
+
+
+def walk(page, model, page_size):
+    """
+    Fetch every page in order
+
+    Returns:
+        (seconds spent in page(), rows seen); decoding each body to find
+        the next cursor is not timed
+    """
+    import json
+    from models import db
+
+    before, seen, seconds = None, 0, 0.0
+    while True:
+        args = MultiDict({'limit': page_size, **({'before': before} if before else {})})
+        start = time.perf_counter()
+        body = page(model, args)
+        seconds += time.perf_counter() - start
+        db.session.remove()
+        body = json.loads(body)
+        seen += len(body['submissions'])
+        before = body['next_before']
+        if not before:
+            return seconds, seen
+
+
+def measure(app, page, model, page_size, repeat):
+    """Return (best seconds per walk, peak traced bytes, rows per walk)"""
+    with app.test_request_context():
+        _, rows = walk(page, model, page_size)
+        best = min(walk(page, model, page_size)[0] for _ in range(repeat))
+        tracemalloc.start()
+        walk(page, model, page_size)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5, help='timed walks per path (best is kept)')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench-serialize-'), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+    import serialize
+    from api import MAX_PAGE_SIZE, list_submissions
+    from app import create_app
+    from models import db, ContactSubmission
+
+    app = create_app('production')
+    start = datetime.datetime(2024, 1, 1)
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO contact_submissions (name, email, project_type, message, submitted_at, read) "
+                "VALUES (:name, :email, :project_type, :message, :submitted_at, :read)"
+            ), [{
+                'name': f'Customer {i}', 'email': f'customer{i}@example.com',
+                'project_type': 'website' if i % 2 else None,
+                'message': f'Hi, I would like a new website for my shop ({i}). ' * 3,
+                'submitted_at': start + datetime.timedelta(seconds=i, microseconds=i % 1000),
+                'read': i % 3 == 0
+            } for i in range(args.rows)])
+
+    def fast_page(model, page_args):
+        return list_submissions(model, (), page_args)
+
+    installed_orjson = serialize.orjson
+    paths = [('orm', orm_page, None), ('json', fast_page, None)]
+    if installed_orjson is not None:
+        paths.append(('orjson', fast_page, installed_orjson))
+
+    print(f"{args.rows} rows in pages of {MAX_PAGE_SIZE}\n")
+    print(f"{'path':<8}{'ms/10k rows':>12}{'peak MB':>9}{'speedup':>9}")
+    baseline = None
+    for label, page, encoder in paths:
+        serialize.orjson = encoder
+        seconds, peak, rows = measure(app, page, ContactSubmission, MAX_PAGE_SIZE, args.repeat)
+        per_10k = seconds * 10000 / rows
+        baseline = baseline or per_10k
+        print(f"{label:<8}{per_10k * 1000:>12.1f}{peak / 1e6:>9.2f}{baseline / per_10k:>8.1f}x")
+    serialize.orjson = installed_orjson
+
+
+if __name__ == '__main__':
+    main()
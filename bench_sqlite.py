@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+SQLite contention benchmark
+
+Runs admin-style readers (list + stats) and form writers concurrently
+against a fresh database, once with the default engine profile and once
+with ProductionConfig's WAL/pragma/pool profile, and prints throughput
+and latency for each side.
+
+Usage:
+    python3 bench_sqlite.py [--seconds 5] [--readers 4] [--writers 4] [--rows 5000]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile of samples (nearest rank)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_profile(config_name, args):
+    """Run one contention round and return per-role results"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix='bench-sqlite-'), 'bench.db')
+    os.environ['DATABASE_URL'] = 'sqlite:///' + db_path
+
+    from app import create_app
+    from models import db, ContactSubmission
+
+    app = create_app(config_name)
+    # Every bench client shares one IP; measure the database, not the limiter
+    app.extensions.pop('rate_limiter', None)
+    with app.app_context():
+        db.session.add_all([
+            ContactSubmission(name=f'Seed {i}', email=f'seed{i}@example.com', message='Seed message')
+            for i in range(args.rows)
+        ])
+        db.session.commit()
+
+    stop = threading.Event()
+    results = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    lock = threading.Lock()
+
+    def reader():
+        client = app.test_client()
+        samples, failed = [], 0
+        while not stop.is_set():
+            start = time.perf_counter()
+            ok = client.get('/api/submissions/contact?limit=50').status_code == 200
+            ok = client.get('/api/submissions/stats').status_code == 200 and ok
+            samples.append(time.perf_counter() - start)
+            failed += not ok
+        with lock:
+            results['read'].extend(samples)
+            errors['read'] += failed
+
+    def writer():
+        client = app.test_client()
+        samples, failed = [], 0
+        payload = {'name': 'Bench', 'email': 'bench@example.com', 'message': 'Benchmark message'}
+        while not stop.is_set():
+            start = time.perf_counter()
+            ok = client.post('/api/contact', json=payload).status_code in (201, 202)
+            samples.append(time.perf_counter() - start)
+            failed += not ok
+        with lock:
+            results['write'].extend(samples)
+            errors['write'] += failed
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer) for _ in range(args.writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+
+    report = {}
+    for role, samples in results.items():
+        report[role] = {
+            'ops_per_sec': len(samples) / args.seconds,
+            'p50_ms': percentile(samples, 50) * 1000,
+            'p95_ms': percentile(samples, 95) * 1000,
+            'p99_ms': percentile(samples, 99) * 1000,
+            'mean_ms': (statistics.mean(samples) * 1000) if samples else 0.0,
+            'errors': errors[role]
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"SQLite contention: {args.readers} readers, {args.writers} writers, "
+          f"{args.rows} seed rows, {args.seconds:.0f}s per profile\n")
+    print(f"{'profile':<12}{'role':<7}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for label, config_name in (('default', 'testing'), ('production', 'production')):
+        report = run_profile(config_name, args)
+        for role, row in report.items():
+            print(f"{label:<12}{role:<7}{row['ops_per_sec']:>10.1f}{row['p50_ms']:>10.2f}"
+                  f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
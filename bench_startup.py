@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Import time and time-to-first-request benchmark for app.py
+
+Each run spawns a fresh interpreter that imports app.py, builds the app
+with create_app() and serves its first requests through the test client,
+reporting how long each step took since the import started. Runs go
+against two databases:
+
+    fresh    empty database; the schema is created (first deploy)
+    current  database already at models.SCHEMA_VERSION (every later boot)
+
+The child also times a forced schema setup on its already-built app, which
+is what every boot paid before the version check. Budgets make the script
+exit non-zero when a median is exceeded, so it can gate CI.
+
+Usage:
+    python3 bench_startup.py [--runs 5] [--config production] [--json]
+                             [--max-import-ms 1500] [--max-boot-ms 100]
+                             [--max-first-request-ms 2000]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Served in order by the child; the first one is the time to first request
+FIRST_REQUESTS = ('/api/submissions/stats', '/', '/api/dashboard')
+
+
+def child(config_name):
+    """Import, build, serve the first requests and print timings as JSON"""
+    start = time.perf_counter()
+    from app import create_app
+    imported = time.perf_counter()
+    app = create_app(config_name)
+    built = time.perf_counter()
+
+    client = app.test_client()
+    first = None
+    for url in FIRST_REQUESTS:
+        status = client.get(url).status_code
+        assert status == 200, f'{url} returned {status}'
+        first = first or time.perf_counter()
+    served = time.perf_counter()
+
+    from models import ensure_schema
+    with app.app_context():
+        forced_start = time.perf_counter()
+        ensure_schema(force=True)
+        forced = time.perf_counter() - forced_start
+
+    print(json.dumps({
+        'import_ms': (imported - start) * 1000,
+        'boot_ms': (built - imported) * 1000,
+        'first_request_ms': (first - start) * 1000,
+        'all_requests_ms': (served - start) * 1000,
+        'forced_schema_ms': forced * 1000,
+        'modules': len(sys.modules),
+        'pil_loaded': 'PIL' in sys.modules
+    }))
+
+
+def run_child(config_name, database_url):
+    """Spawn one fresh interpreter and return its timings"""
+    env = dict(os.environ, DATABASE_URL=database_url)
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, __file__, '--child', '--config', config_name],
+        capture_output=True, text=True, check=True, cwd=ROOT, env=env
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def scenario(name, config_name, runs, directory):
+    """Run one scenario runs times and return the per-run results"""
+    results = []
+    for i in range(runs):
+        path = os.path.join(directory, f'{name}-{i}.db' if name == 'fresh' else 'current.db')
+        if name == 'current' and not os.path.exists(path):
+            # Set up once outside the sample
+            run_child(config_name, 'sqlite:///' + path)
+        results.append(run_child(config_name, 'sqlite:///' + path))
+    return results
+
+
+def summarize(results):
+    keys = ('import_ms', 'boot_ms', 'first_request_ms', 'all_requests_ms', 'forced_schema_ms', 'process_ms')
+    summary = {key: statistics.median(r[key] for r in results) for key in keys}
+    summary['modules'] = results[-1]['modules']
+    summary['pil_loaded'] = results[-1]['pil_loaded']
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='fresh interpreters per scenario')
+    parser.add_argument('--config', default='production', help='create_app config name')
+    parser.add_argument('--json', action='store_true', help='print the results as JSON')
+    parser.add_argument('--max-import-ms', type=float, help='budget for importing app.py')
+    parser.add_argument('--max-boot-ms', type=float, help='budget for create_app() on a current database')
+    parser.add_argument('--max-first-request-ms', type=float,
+                        help='budget for import to first response on a current database')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.config)
+        return
+
+    directory = tempfile.mkdtemp(prefix='bench-startup-')
+    summaries = {
+        name: summarize(scenario(name, args.config, args.runs, directory))
+        for name in ('fresh', 'current')
+    }
+
+    if args.json:
+        print(json.dumps({'config': args.config, 'runs': args.runs, 'scenarios': summaries}, indent=2))
+    else:
+        print(f"{'database':<10}{'import ms':>10}{'boot ms':>9}{'1st req ms':>11}{'3 reqs ms':>10}"
+              f"{'forced DDL ms':>14}{'process ms':>11}{'modules':>9}  PIL")
+        for name, s in summaries.items():
+            print(f"{name:<10}{s['import_ms']:>10.1f}{s['boot_ms']:>9.1f}{s['first_request_ms']:>11.1f}"
+                  f"{s['all_requests_ms']:>10.1f}{s['forced_schema_ms']:>14.1f}{s['process_ms']:>11.1f}"
+                  f"{s['modules']:>9}  {'loaded' if s['pil_loaded'] else '-'}")
+
+    current = summaries['current']
+    budgets = (
+        ('import', args.max_import_ms, current['import_ms']),
+        ('boot', args.max_boot_ms, current['boot_ms']),
+        ('first request', args.max_first_request_ms, current['first_request_ms']),
+    )
+    over = [(label, budget, value) for label, budget, value in budgets if budget is not None and value > budget]
+    for label, budget, value in over:
+        print(f"✗ {label}: {value:.1f} ms over the {budget:.0f} ms budget", file=sys.stderr)
+    if over:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,72 @@ class Config:
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'False').lower() == 'true'
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
+    
+    # Static asset cache (see static_cache.py)
+    STATIC_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    STATIC_CACHE_CHECK_INTERVAL = 1.0
+    STATIC_CACHE_WARM = False
+    
+    # Submission ingest: 'sync' commits on the request thread,
+    # 'queue' acknowledges with 202 and batches commits (see ingest.py)
+    INGEST_MODE = os.environ.get('INGEST_MODE', 'sync')
+    INGEST_SPILL_DIR = os.environ.get('INGEST_SPILL_DIR')
+    INGEST_BATCH_SIZE = 100
+    INGEST_FLUSH_INTERVAL = 0.05
+    INGEST_FSYNC = True
+    INGEST_MAX_ATTEMPTS = 5            # tries before a failing batch is split and bad records set aside
+    
+    # Token-bucket load shedding on the public form endpoints (see rate_limit.py)
+    RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True').lower() == 'true'
+    RATE_LIMIT_CLIENT_RATE = 0.2       # one request per 5 seconds per IP...
+    RATE_LIMIT_CLIENT_BURST = 5        # ...after an initial burst of 5
+    RATE_LIMIT_GLOBAL_RATE = 50
+    RATE_LIMIT_GLOBAL_BURST = 200
+    RATE_LIMIT_MAX_CLIENTS = 10000
+    RATE_LIMIT_ENDPOINTS = ('api.submit_contact', 'api.submit_quote')
+    # Proxies in front of the app that append to X-Forwarded-For (0: use the peer address)
+    RATE_LIMIT_PROXY_HOPS = int(os.environ.get('RATE_LIMIT_PROXY_HOPS', '0'))
+
+    # SQLite connection pragmas applied on every new connection (see models.configure_sqlite)
+    SQLITE_PRAGMAS = {}
+
+    # Admin change feed (/api/submissions/stream, see events.py)
+    EVENTS_ENABLED = True
+    EVENTS_BUFFER_SIZE = 1000      # events kept for Last-Event-ID resume
+    EVENTS_MAX_SUBSCRIBERS = 50    # each open stream holds a worker thread
+    EVENTS_KEEPALIVE = 15.0        # seconds between keepalive comments
+
+    # Request/SQL metrics served at /api/metrics (see metrics.py)
+    METRICS_ENABLED = True
+    METRICS_SQL_SAMPLE_RATE = float(os.environ.get('METRICS_SQL_SAMPLE_RATE', '1.0'))  # fraction of statements timed
+
+    # Archival of read submissions (flask archive-submissions, see archive.py)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '180'))
+    ARCHIVE_BATCH_SIZE = 500           # rows moved per write transaction
+    ARCHIVE_BATCH_PAUSE = 0.05         # seconds between batches
+
+    # New-submission notification emails (see outbox.py); off unless MAIL_NOTIFY_TO is set
+    MAIL_NOTIFY_TO = os.environ.get('MAIL_NOTIFY_TO')    # comma-separated recipients
+    MAIL_FROM = os.environ.get('MAIL_FROM', 'Visualize Studio <noreply@localhost>')
+    MAIL_SMTP_HOST = os.environ.get('MAIL_SMTP_HOST', 'localhost')
+    MAIL_SMTP_PORT = int(os.environ.get('MAIL_SMTP_PORT', '25'))
+    MAIL_SMTP_USERNAME = os.environ.get('MAIL_SMTP_USERNAME')
+    MAIL_SMTP_PASSWORD = os.environ.get('MAIL_SMTP_PASSWORD')
+    MAIL_SMTP_STARTTLS = os.environ.get('MAIL_SMTP_STARTTLS', 'False').lower() == 'true'
+    MAIL_SMTP_TIMEOUT = 10.0
+    MAIL_SMTP_IDLE = 30.0              # seconds an unused SMTP connection is kept open
+    # Seconds a notification may wait to be sent in a digest; 0 sends one email per submission
+    MAIL_DIGEST_INTERVAL = int(os.environ.get('MAIL_DIGEST_INTERVAL', '0'))
+    MAIL_BATCH_SIZE = 50               # notifications claimed (or listed in one digest) at a time
+    MAIL_POLL_INTERVAL = 5.0           # seconds between checks for rows from other processes
+    MAIL_MAX_ATTEMPTS = 8
+    MAIL_RETRY_BASE = 30.0             # seconds before the first retry, doubling each time...
+    MAIL_RETRY_MAX = 3600.0            # ...up to an hour
+    MAIL_CLAIM_LEASE = 300.0           # seconds before rows claimed by a stopped worker are retried
+
+    # ASGI mode (uvicorn asgi:app, see asgi.py)
+    ASGI_WSGI_THREADS = 16                # threads running routes without an async handler
+    ASGI_MAX_BODY_BYTES = 1024 * 1024     # larger request bodies get 413
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -25,10 +91,33 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SESSION_COOKIE_SECURE = True
+    STATIC_CACHE_CHECK_INTERVAL = 60.0
+    STATIC_CACHE_WARM = True
+    
+    # WAL lets admin reads run alongside form writes; NORMAL sync is
+    # durable across app crashes and only loses the last commits on power loss
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -64000,      # KiB, i.e. 64 MB of page cache per connection
+        'mmap_size': 268435456,    # 256 MB
+        'temp_store': 'MEMORY'
+    }
+    
+    # Pool sized for a threaded WSGI server (e.g. gunicorn --threads 8)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 10,
+        'max_overflow': 10,
+        'pool_timeout': 10,
+        'pool_recycle': 3600
+    }
 
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
+    RATE_LIMIT_ENABLED = False
+    MAIL_NOTIFY_TO = None
 
 # Configuration mapping
 config = {
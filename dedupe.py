@@ -0,0 +1,74 @@
+"""
+Duplicate-submission detection shared by the Flask API and Vercel functions
+
+A submission is identified by its Idempotency-Key header when the client
+sends one, otherwise by a hash of its normalized email and message body.
+Repeats inside the key's time window get the original id back instead
+of creating a new row. This module has no Flask imports so the
+serverless handlers can use it too.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+# How long a key is remembered
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60   # explicit client keys: one day
+CONTENT_HASH_TTL = 10 * 60           # double-clicks and retries: ten minutes
+
+
+def normalize(text):
+    """Collapse whitespace and case so trivial edits still match"""
+    return ' '.join((text or '').split()).casefold()
+
+
+def dedupe_key(kind, idempotency_key, email, content):
+    """
+    Build the lookup key for a submission
+
+    Args:
+        kind: 'contact' or 'quote'
+        idempotency_key: Idempotency-Key header value, or None
+        email: Submitter email
+        content: Message / project details
+
+    Returns:
+        (key, ttl_seconds)
+    """
+    if idempotency_key and idempotency_key.strip():
+        digest = hashlib.sha256(f'{kind}\0{idempotency_key.strip()}'.encode('utf-8')).hexdigest()
+        return f'idem:{digest}', IDEMPOTENCY_KEY_TTL
+    digest = hashlib.sha256(
+        f'{kind}\0{normalize(email)}\0{normalize(content)}'.encode('utf-8')
+    ).hexdigest()
+    return f'hash:{digest}', CONTENT_HASH_TTL
+
+
+class TTLCache:
+    """Bounded in-memory map whose entries expire (for warm serverless instances)"""
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value stored for key, or None if missing or expired"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        """Store value under key for ttl seconds"""
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (value, time.monotonic() + ttl)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
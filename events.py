@@ -0,0 +1,189 @@
+"""
+In-process change feed for the admin dashboard
+
+The submit and mark-read routes (and the ingest writer) publish events to
+an EventBus kept in app.extensions['events']; /api/submissions/stream
+relays them to browsers as Server-Sent Events. Each event is encoded as
+an SSE frame once, at publish time, and kept in a bounded ring buffer so
+a reconnecting client can resume from its Last-Event-ID. A client whose
+id has fallen out of the buffer (or predates a restart) gets a single
+'reset' event telling it to reload.
+
+Events only reach subscribers of the same process: with several worker
+processes, each dashboard sees the changes its own worker handled.
+"""
+import itertools
+import json
+import queue
+import threading
+from collections import deque
+
+from flask import current_app
+
+from models import read_stats
+
+# Tells a subscriber to stop (sent on close)
+CLOSED = object()
+
+
+def format_event(event_id, event_type, data):
+    """Encode one SSE frame"""
+    payload = json.dumps(data, separators=(',', ':'))
+    return f'id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n'
+
+
+class Subscription:
+    """One connected stream; frames are delivered through a bounded queue"""
+
+    def __init__(self, bus, max_pending, notify=None):
+        self.bus = bus
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+        # Called (under the bus lock) after each delivery, for async waiters
+        self.notify = notify
+
+    def get(self, timeout):
+        """
+        Wait for the next frame
+
+        Returns:
+            SSE frame string, None on timeout, or CLOSED when the bus closed
+        """
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        """Return the next frame (or CLOSED) if one is queued, else None"""
+        try:
+            return self.queue.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    """Fan-out pub/sub with a replay ring buffer"""
+
+    def __init__(self, buffer_size=1000, max_subscribers=50):
+        """
+        Args:
+            buffer_size: Frames kept for Last-Event-ID resume (also the
+                most a slow subscriber may fall behind before it is reset)
+            max_subscribers: Open streams allowed at once
+        """
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._last_id = 0
+        self._buffer = deque(maxlen=buffer_size)
+        self._subscribers = set()
+        self.published = 0
+
+    def publish(self, event_type, data):
+        """Send an event to every subscriber; returns its id"""
+        with self._lock:
+            event_id = next(self._ids)
+            frame = format_event(event_id, event_type, data)
+            self._last_id = event_id
+            self._buffer.append((event_id, frame))
+            self.published += 1
+            for subscription in self._subscribers:
+                if subscription.overflowed:
+                    continue
+                try:
+                    subscription.queue.put_nowait(frame)
+                except queue.Full:
+                    # Stop feeding it; the stream sends a reset and closes
+                    subscription.overflowed = True
+                if subscription.notify is not None:
+                    subscription.notify()
+        return event_id
+
+    def subscribe(self, last_event_id=None, notify=None):
+        """
+        Register a subscriber
+
+        Args:
+            last_event_id: Last id the client saw, or None for live events only
+            notify: Optional callable run whenever a frame is queued for
+                the subscriber (or it overflows or the bus closes); must
+                not block, e.g. loop.call_soon_threadsafe(event.set)
+
+        Returns:
+            (subscription, backlog frames, reset) or None when at capacity.
+            reset is True when the client missed events that are no longer
+            buffered and must reload instead of replaying.
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            backlog, reset = [], False
+            if last_event_id is not None:
+                oldest = self._buffer[0][0] if self._buffer else self._last_id + 1
+                if last_event_id > self._last_id or last_event_id < oldest - 1:
+                    reset = True
+                else:
+                    backlog = [frame for event_id, frame in self._buffer if event_id > last_event_id]
+            subscription = Subscription(self, self.buffer_size, notify)
+            self._subscribers.add(subscription)
+        return subscription, backlog, reset
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def close(self):
+        """Wake every subscriber so its stream ends"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(CLOSED)
+            except queue.Full:
+                subscription.overflowed = True
+            if subscription.notify is not None:
+                subscription.notify()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': len(self._subscribers),
+                'published': self.published,
+                'last_id': self._last_id,
+                'buffered': len(self._buffer)
+            }
+
+
+def publish_change(event_type, kind, **data):
+    """
+    Publish a submission change with the current counters attached
+
+    Needs an app context; does nothing when the app has no event bus.
+    Call after the change is committed so the counters include it.
+    """
+    bus = current_app.extensions.get('events')
+    if bus is None:
+        return
+    bus.publish(event_type, dict(data, kind=kind, stats=read_stats()))
+
+
+def publish_submissions(submissions):
+    """
+    Publish 'submission' events for newly committed rows
+
+    Args:
+        submissions: List of (kind, submission dict) pairs; the counters
+            are read once for the whole list
+    """
+    bus = current_app.extensions.get('events')
+    if bus is None or not submissions:
+        return
+    stats = read_stats()
+    for kind, submission in submissions:
+        bus.publish('submission', {'kind': kind, 'submission': submission, 'stats': stats})
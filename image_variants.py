@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Responsive image variants for assets/images and public/showcase
+
+The build step (flask build-images, or this script) writes resized WebP
+and, when Pillow has AVIF support, AVIF copies of every PNG/JPEG under
+the source directories into variants/, plus variants/manifest.json with
+the dimensions, sizes and hashes of each source and variant. Sources
+whose hash is unchanged are not re-encoded.
+
+At request time the static route asks ImageVariants for the best variant
+of an original image URL: the smallest file among the formats the
+browser lists in Accept, at the smallest built width covering ?w=.
+Variants no smaller than their source are not kept, and browsers that
+accept neither format keep getting the original. Pillow is only needed
+for the build (pip install Pillow), not for serving.
+
+Usage:
+    python3 image_variants.py [--force]
+"""
+import argparse
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+import time
+
+# Older mimetypes tables lack these
+mimetypes.add_type('image/webp', '.webp')
+mimetypes.add_type('image/avif', '.avif')
+
+SOURCE_DIRS = ('assets/images', 'public/showcase')
+SOURCE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+VARIANTS_DIR = 'variants'
+WIDTHS = (320, 640, 960, 1280, 1920)
+
+# Encoder settings per format. AVIF speed 6 is ~15% smaller than 8 for ~4x
+# the build time; WebP method 6 is only ~2% smaller than 4 but >10x slower
+# on images with alpha
+FORMATS = {
+    'avif': {'mimetype': 'image/avif', 'options': {'quality': 55, 'speed': 6}},
+    'webp': {'mimetype': 'image/webp', 'options': {'quality': 80, 'method': 4}},
+}
+
+MANIFEST_VERSION = 1
+
+
+def available_formats():
+    """Formats the installed Pillow can encode, in preference order"""
+    # Imported here: Pillow is only needed to build variants, and importing
+    # it would slow down every app start
+    try:
+        from PIL import features
+    except ImportError:
+        return []
+    return [name for name in FORMATS if features.check(name)]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def find_sources(root, source_dirs=SOURCE_DIRS):
+    """Yield source image paths relative to root, with '/' separators"""
+    for source_dir in source_dirs:
+        for dirpath, _, filenames in os.walk(os.path.join(root, source_dir)):
+            for filename in sorted(filenames):
+                if filename.lower().endswith(SOURCE_EXTENSIONS):
+                    path = os.path.join(dirpath, filename)
+                    yield os.path.relpath(path, root).replace(os.sep, '/')
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def _build_image(root, source, digest, widths, formats):
+    """Encode every variant of one source; returns its manifest entry"""
+    from PIL import Image, ImageOps
+
+    source_path = os.path.join(root, source)
+    with Image.open(source_path) as opened:
+        image = ImageOps.exif_transpose(opened)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    width, height = image.size
+    source_bytes = os.path.getsize(source_path)
+    entry = {'width': width, 'height': height, 'bytes': source_bytes, 'sha256': digest, 'variants': []}
+
+    # Never upscale; the full width is built too so large screens still get the smaller format
+    targets = sorted({w for w in widths if w < width} | {min(width, max(widths))})
+    stem = os.path.splitext(source)[0]
+    for target in targets:
+        resized = image if target == width else image.resize(
+            (target, max(1, round(height * target / width))), Image.LANCZOS
+        )
+        for name in formats:
+            path = f'{VARIANTS_DIR}/{stem}-{target}.{name}'
+            output = os.path.join(root, path)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            resized.save(output, name.upper(), **FORMATS[name]['options'])
+            size = os.path.getsize(output)
+            if size >= source_bytes:
+                # Small or flat-colour PNGs can beat lossy formats; keep the original
+                os.remove(output)
+                continue
+            entry['variants'].append({
+                'path': path,
+                'format': name,
+                'width': resized.width,
+                'height': resized.height,
+                'bytes': size,
+                'sha256': file_sha256(output)
+            })
+    return entry
+
+
+def build_variants(root, widths=WIDTHS, force=False):
+    """
+    Build variants for every source image and write the manifest
+
+    Args:
+        root: Site root (the directory holding assets/ and public/)
+        widths: Target widths in pixels
+        force: Re-encode even when the source hash is unchanged
+
+    Returns:
+        (manifest, images built, images reused)
+    """
+    formats = available_formats()
+    if not formats:
+        raise RuntimeError('Building image variants needs Pillow with WebP support')
+
+    manifest_path = os.path.join(root, VARIANTS_DIR, 'manifest.json')
+    previous = load_manifest(manifest_path) or {'images': {}}
+    settings = {'widths': list(widths), 'formats': formats}
+    same_settings = all(previous.get(key) == value for key, value in settings.items())
+
+    images, built, reused = {}, 0, 0
+    for source in find_sources(root):
+        digest = file_sha256(os.path.join(root, source))
+        old = previous['images'].get(source)
+        if (not force and same_settings and old is not None and old['sha256'] == digest
+                and all(os.path.exists(os.path.join(root, v['path'])) for v in old['variants'])):
+            images[source] = old
+            reused += 1
+            continue
+        images[source] = _build_image(root, source, digest, widths, formats)
+        built += 1
+
+    # Remove variants of deleted or re-encoded sources that were not rewritten
+    kept = {v['path'] for entry in images.values() for v in entry['variants']}
+    for entry in previous['images'].values():
+        for variant in entry['variants']:
+            if variant['path'] not in kept:
+                try:
+                    os.remove(os.path.join(root, variant['path']))
+                except FileNotFoundError:
+                    pass
+
+    manifest = dict(settings, version=MANIFEST_VERSION, images=images)
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    temp_path = manifest_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+    return manifest, built, reused
+
+
+class ImageVariants:
+    """Picks a built variant for an original image request"""
+
+    def __init__(self, root, check_interval=1.0):
+        """
+        Args:
+            root: Site root holding variants/manifest.json
+            check_interval: Seconds between checks for a rebuilt manifest
+        """
+        self.path = os.path.join(root, VARIANTS_DIR, 'manifest.json')
+        self.check_interval = check_interval
+        self._images = {}
+        self._mtime = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+
+    def _current(self):
+        """Return the image map, reloading it if the manifest changed"""
+        now = time.monotonic()
+        if now - self._checked < self.check_interval:
+            return self._images
+        with self._lock:
+            self._checked = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except FileNotFoundError:
+                self._images, self._mtime = {}, None
+                return self._images
+            if mtime != self._mtime:
+                manifest = load_manifest(self.path)
+                self._images = manifest['images'] if manifest else {}
+                self._mtime = mtime
+        return self._images
+
+    def has(self, filename):
+        """Return True if filename is a source image with built variants"""
+        return filename in self._current()
+
+    def choose(self, filename, accept_mimetypes, width=None):
+        """
+        Pick the variant to serve for an original image
+
+        Args:
+            filename: Original image path relative to the site root
+            accept_mimetypes: Request's parsed Accept header
+            width: Requested display width in pixels (the ?w= parameter)
+
+        Returns:
+            (variant path relative to the site root, mimetype), or None to
+            serve the original
+        """
+        entry = self._current().get(filename)
+        if entry is None:
+            return None
+        # Only formats named explicitly; */* does not mean AVIF is decodable
+        accepted = {value for value, quality in accept_mimetypes if quality > 0}
+        formats = {name for name, spec in FORMATS.items() if spec['mimetype'] in accepted}
+        candidates = [v for v in entry['variants'] if v['format'] in formats]
+        if not candidates:
+            return None
+
+        # Smallest built width covering the request, else the largest built
+        widths = sorted({v['width'] for v in candidates})
+        target = next((w for w in widths if w >= width), widths[-1]) if width else widths[-1]
+        # Neither format always wins; serve whichever file is smaller
+        chosen = min((v for v in candidates if v['width'] == target), key=lambda v: v['bytes'])
+        return chosen['path'], FORMATS[chosen['format']]['mimetype']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--force', action='store_true', help='re-encode unchanged sources')
+    args = parser.parse_args()
+    root = os.path.dirname(os.path.abspath(__file__))
+    manifest, built, reused = build_variants(root, force=args.force)
+    print(f"✓ {built} images built, {reused} unchanged ({', '.join(manifest['formats'])})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,447 @@
+"""
+Write-behind ingest queue for form submissions
+
+With INGEST_MODE = 'queue' the submit routes validate the request, hand
+the submission to an IngestQueue and answer 202 with a provisional id. A
+background writer thread drains the queue and inserts submissions in
+batches, one commit per batch, so a burst of POSTs shares a few commits
+instead of each request waiting its turn behind SQLite's single writer.
+
+Durability: each submission is appended to a spill file (and fsynced
+when INGEST_FSYNC is on) before the 202 goes out. The writer records
+how far into the spill file it has committed in a checkpoint file, and
+the writer replays anything past the checkpoint when it starts. A crash
+between a batch commit and its checkpoint replays that batch, so delivery is
+at-least-once; records carrying a dedupe key (see dedupe.py) are
+skipped on replay if their key was already committed.
+
+Each process claims its own spill file with an exclusive flock, so
+several WSGI workers can share one spill directory. Spill files left
+unlocked by a dead process are replayed by the next one to start.
+
+A database outage (OperationalError) is retried until it passes. A batch
+that keeps failing for any other reason (a bad field, a constraint) is
+retried INGEST_MAX_ATTEMPTS times and then split in half, down to the
+single records that cannot be committed; those are appended to
+rejected.log in the spill directory instead of blocking everything
+queued behind them.
+
+A repeat of a submission (same dedupe key) gets the original's
+provisional id back, whether it is still queued or already committed:
+the dedupe row keeps the provisional id next to the database id, so a
+submission is only ever known to the client by the id its 202 carried.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import OperationalError
+
+from events import publish_submissions
+from models import db, SubmissionDedupe, SUBMISSION_MODELS
+from outbox import queue_notifications, wake_outbox
+
+# Dead-letter file, in the spill directory
+REJECTED_FILE = 'rejected.log'
+
+
+def _open_locked(path):
+    """Open path for appending and take an exclusive lock, or return None"""
+    spill = open(path, 'a+b')
+    try:
+        fcntl.flock(spill.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        spill.close()
+        return None
+    return spill
+
+
+def insert_records(records):
+    """
+    Insert queued submission records in one transaction (needs an app context)
+
+    Records are dicts with 'kind', 'submitted_at', 'fields' and an optional
+    'dedupe' (key, ttl) pair. Records whose dedupe key is already stored
+    and unexpired, or repeated within the batch, are skipped.
+
+    Returns:
+        Number of submissions inserted
+    """
+    now = datetime.utcnow()
+    try:
+        keys = [record['dedupe'][0] for record in records if record.get('dedupe')]
+        seen = set()
+        if keys:
+            # Drop expired keys so they can be reused, then skip live repeats
+            SubmissionDedupe.query.filter(
+                SubmissionDedupe.key.in_(keys),
+                SubmissionDedupe.expires_at <= now
+            ).delete(synchronize_session=False)
+            seen.update(row.key for row in SubmissionDedupe.query.filter(
+                SubmissionDedupe.key.in_(keys)
+            ))
+
+        added = []
+        for record in records:
+            dedupe = record.get('dedupe')
+            if dedupe:
+                if dedupe[0] in seen:
+                    continue
+                seen.add(dedupe[0])
+            model = SUBMISSION_MODELS[record['kind']]
+            submission = model(
+                submitted_at=datetime.fromisoformat(record['submitted_at']),
+                **record['fields']
+            )
+            db.session.add(submission)
+            added.append((record, submission))
+
+        db.session.flush()
+        # Serialized before commit expires the attributes
+        published = [(record['kind'], submission.to_dict()) for record, submission in added]
+        for record, submission in added:
+            if record.get('dedupe'):
+                key, ttl = record['dedupe']
+                db.session.add(SubmissionDedupe(
+                    key=key,
+                    kind=record['kind'],
+                    submission_id=submission.id,
+                    provisional_id=record.get('id'),
+                    expires_at=now + timedelta(seconds=ttl)
+                ))
+        queue_notifications(published)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    publish_submissions(published)
+    wake_outbox()
+    return len(added)
+
+
+class IngestQueue:
+    """In-process submission queue with a batching background writer"""
+
+    def __init__(self, app, spill_dir, batch_size=100, flush_interval=0.05, fsync=True, max_attempts=5):
+        """
+        Args:
+            app: Flask app used for the writer's app context
+            spill_dir: Directory holding the spill, checkpoint and rejected files
+            batch_size: Most submissions written per commit
+            flush_interval: Longest a queued submission waits for its batch to fill (seconds)
+            fsync: fsync the spill file before acknowledging a submission
+            max_attempts: Tries before a failing batch is split (database outages excepted)
+        """
+        self.app = app
+        self.spill_dir = spill_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_attempts = max_attempts
+        self.committed = 0
+        self.rejected = 0
+        # Dedupe key -> provisional id of submissions queued but not yet committed
+        self._pending_keys = {}
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._spill = None
+        self._spill_path = None
+
+    # ----- Spill files -----
+
+    def _checkpoint_path(self, spill_path):
+        return spill_path + '.ckpt'
+
+    def _read_checkpoint(self, spill_path):
+        try:
+            with open(self._checkpoint_path(spill_path)) as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _write_checkpoint(self, spill_path, offset):
+        path = self._checkpoint_path(spill_path)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _reset(self, spill, spill_path):
+        """Empty a fully committed spill file"""
+        spill.seek(0)
+        spill.truncate(0)
+        self._write_checkpoint(spill_path, 0)
+
+    def _read_spill(self, spill, spill_path):
+        """
+        Read the records in a spill file past its checkpoint
+
+        Returns:
+            (list of (record, offset just past it) as queued by submit(),
+            offset just past the last complete line)
+        """
+        offset = self._read_checkpoint(spill_path)
+        spill.seek(0, os.SEEK_END)
+        if offset > spill.tell():
+            # Truncated before the checkpoint was reset
+            offset = 0
+        spill.seek(offset)
+
+        entries = []
+        for line in spill:
+            if not line.endswith(b'\n'):
+                break  # torn final append, never acknowledged
+            offset += len(line)
+            try:
+                entries.append((json.loads(line), offset))
+            except ValueError:
+                continue
+        return entries, offset
+
+    def _replay(self, spill, spill_path, wait_for_database=False):
+        """
+        Commit everything in a spill file past its checkpoint, then empty it
+
+        Returns:
+            Number of records replayed, or None if stopping interrupted
+            the wait for the database (the file is left as it was)
+        """
+        entries, _ = self._read_spill(spill, spill_path)
+        records = [record for record, _ in entries]
+        for start in range(0, len(records), self.batch_size):
+            if not self._commit_batch(records[start:start + self.batch_size], wait_for_database):
+                return None
+        self._reset(spill, spill_path)
+        return len(records)
+
+    def replay_orphans(self, wait_for_database=False):
+        """
+        Replay spill files not held by a live process
+
+        Args:
+            wait_for_database: Retry OperationalError until it passes
+                (else raise it)
+
+        Returns:
+            Number of submissions replayed
+        """
+        os.makedirs(self.spill_dir, exist_ok=True)
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.spill_dir, 'ingest-*.log'))):
+            if path == self._spill_path:
+                continue
+            spill = _open_locked(path)
+            if spill is None:
+                continue
+            try:
+                count = self._replay(spill, path, wait_for_database)
+            finally:
+                spill.close()
+            if count is None:
+                break
+            replayed += count
+        return replayed
+
+    def _claim_spill(self):
+        """
+        Lock a spill file for this process and queue what it still holds
+
+        Leftover records are committed by the writer before anything
+        submitted after them, so the request that starts the queue never
+        waits on the database.
+        """
+        slot = 0
+        while True:
+            path = os.path.join(self.spill_dir, f'ingest-{slot}.log')
+            spill = _open_locked(path)
+            if spill is not None:
+                break
+            slot += 1
+        entries, end = self._read_spill(spill, path)
+        spill.truncate(end)  # new appends must not follow a torn line
+        spill.seek(0, os.SEEK_END)
+        self._spill = spill
+        self._spill_path = path
+        for record, end in entries:
+            if record.get('dedupe') and record.get('id'):
+                self._pending_keys[record['dedupe'][0]] = record['id']
+            self._queue.put((record, end))
+
+    # ----- Lifecycle -----
+
+    def start(self):
+        """Claim a spill file and start the writer, which replays leftovers (idempotent)"""
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._claim_spill()
+            self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def close(self, timeout=10):
+        """Flush the queue and stop the writer"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    # ----- Request path -----
+
+    def submit(self, kind, fields, dedupe=None):
+        """
+        Queue a validated submission
+
+        Args:
+            kind: 'contact' or 'quote'
+            fields: Column values for the submission model
+            dedupe: Optional (key, ttl_seconds) from dedupe.dedupe_key
+
+        Returns:
+            Provisional id for the submission (the original's for a
+            repeat of a submission still queued)
+        """
+        self.start()
+        key = dedupe[0] if dedupe else None
+        record = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'submitted_at': datetime.utcnow().isoformat(),
+            'fields': fields,
+            'dedupe': list(dedupe) if dedupe else None
+        }
+        line = (json.dumps(record) + '\n').encode('utf-8')
+
+        # Appending and enqueueing under one lock keeps spill order == queue order
+        with self._lock:
+            if key is not None and key in self._pending_keys:
+                return self._pending_keys[key]
+            self._spill.write(line)
+            self._spill.flush()
+            self._queue.put((record, self._spill.tell()))
+            if key is not None:
+                self._pending_keys[key] = record['id']
+        if self.fsync:
+            os.fsync(self._spill.fileno())
+        return record['id']
+
+    def pending(self):
+        """Number of submissions waiting to be written"""
+        return self._queue.qsize()
+
+    # ----- Writer thread -----
+
+    def _take_batch(self):
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _commit(self, records):
+        with self.app.app_context():
+            insert_records(records)
+
+    def _reject(self, record, error):
+        """Append a record that cannot be committed to the rejected file"""
+        line = json.dumps({
+            'record': record,
+            'error': f'{type(error).__name__}: {error}',
+            'rejected_at': datetime.utcnow().isoformat()
+        }) + '\n'
+        with open(os.path.join(self.spill_dir, REJECTED_FILE), 'ab') as f:
+            f.write(line.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+        self.rejected += 1
+        print(f"Ingest record {record.get('id')} moved to {REJECTED_FILE}: {error}")
+
+    def _commit_batch(self, records, wait_for_database=True):
+        """
+        Commit records, setting aside any that can never be committed
+
+        Args:
+            records: Queued submission records
+            wait_for_database: Retry OperationalError until it passes
+                (else raise it)
+
+        Returns:
+            False if stopping interrupted the wait for the database
+        """
+        delay = 0.1
+        attempts = 0
+        while True:
+            try:
+                self._commit(records)
+                return True
+            except OperationalError:
+                print(f"Error in ingest writer: {traceback.format_exc()}")
+                if not wait_for_database:
+                    raise
+                if self._stopping.is_set():
+                    return False  # left in the spill file for the next start
+            except Exception as e:
+                print(f"Error in ingest writer: {traceback.format_exc()}")
+                error = e
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    break
+            time.sleep(delay)
+            delay = min(delay * 2, 5.0)
+
+        # Split until the records that keep failing are alone
+        if len(records) == 1:
+            self._reject(records[0], error)
+            return True
+        middle = len(records) // 2
+        return (self._commit_batch(records[:middle], wait_for_database)
+                and self._commit_batch(records[middle:], wait_for_database))
+
+    def _write_batch(self, batch):
+        """Commit a batch; return False if stopped while waiting for the database"""
+        records = [record for record, _ in batch]
+        rejected = self.rejected
+        if not self._commit_batch(records):
+            return False
+
+        self.committed += len(records) - (self.rejected - rejected)
+        end = batch[-1][1]
+        self._write_checkpoint(self._spill_path, end)
+        with self._lock:
+            for record in records:
+                if record.get('dedupe'):
+                    self._pending_keys.pop(record['dedupe'][0], None)
+            if self._queue.empty() and self._spill.tell() == end:
+                self._reset(self._spill, self._spill_path)
+        return True
+
+    def _run(self):
+        self.replay_orphans(wait_for_database=True)
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._take_batch()
+            if batch and not self._write_batch(batch):
+                break
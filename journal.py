@@ -0,0 +1,256 @@
+"""
+Append-only segmented submission journal
+
+Used as a storage backend by the Vercel functions (see api/_storage.py):
+a submission is one sequential append to the active segment file, with
+no database round-trip on the request path. Segments roll over at a
+size limit, and a compaction step later loads sealed segments into the
+contact_submissions / quote_submissions tables (flask compact-journal).
+
+Several writer processes can share a directory. Each writes its own
+segment-NNNNNNNN.active file and holds an exclusive flock on it while it
+is open; at rollover or close the writer syncs it and renames it to
+segment-NNNNNNNN.log, which seals it. Compaction only loads sealed
+segments, plus active ones whose lock is free (their writer is gone),
+which it seals first.
+
+Record format: 4-byte big-endian payload length, 4-byte CRC32 of the
+payload, then the payload (UTF-8 JSON). A reader stops at the first
+short or corrupt record, which can only be a torn final append.
+
+fsync is batched with group commit: a writer that finds its record
+already covered by another writer's fsync returns without syncing.
+
+This module has no Flask imports so the serverless handlers can use it.
+"""
+import fcntl
+import glob
+import json
+import os
+import struct
+import threading
+import uuid
+import zlib
+
+HEADER = struct.Struct('>II')
+ACTIVE_PATTERN = 'segment-{:08d}.active'
+DEFAULT_SEGMENT_BYTES = 4 * 1024 * 1024
+
+
+def segment_paths(directory):
+    """Return sealed segment file paths in sequence order"""
+    return sorted(glob.glob(os.path.join(directory, 'segment-*.log')))
+
+
+def active_segment_paths(directory):
+    """Return paths of segments not sealed yet, in sequence order"""
+    return sorted(glob.glob(os.path.join(directory, 'segment-*.active')))
+
+
+def _segment_number(path):
+    return int(os.path.basename(path)[len('segment-'):].split('.', 1)[0])
+
+
+def _sealed_path(active_path):
+    return active_path[:-len('.active')] + '.log'
+
+
+def seal_orphan(path):
+    """
+    Seal an active segment whose writer has stopped
+
+    Returns:
+        False if a writer still holds it (or sealed it meanwhile)
+    """
+    try:
+        fd = os.open(path, os.O_RDWR)
+    except FileNotFoundError:
+        return False
+    try:
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        # Its writer may have sealed it between the open and the lock
+        if not os.path.exists(path):
+            return False
+        os.rename(path, _sealed_path(path))
+        return True
+    finally:
+        os.close(fd)
+
+
+def read_segment(path):
+    """Yield (offset, record) for every intact record in a segment"""
+    with open(path, 'rb') as f:
+        offset = 0
+        while True:
+            header = f.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            length, checksum = HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                return
+            yield offset, json.loads(payload)
+            offset += HEADER.size + length
+
+
+class Journal:
+    """Appends records to size-limited segment files"""
+
+    def __init__(self, directory, segment_bytes=DEFAULT_SEGMENT_BYTES, fsync=True):
+        """
+        Args:
+            directory: Directory holding the segment files
+            segment_bytes: Active segment is sealed once it grows past this
+            fsync: Make each append durable before returning (group commit)
+        """
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._segment = None
+        self._written = 0
+        self._synced = 0
+
+    def _open_next_segment(self):
+        """Seal the active segment and start one after the highest existing one"""
+        os.makedirs(self.directory, exist_ok=True)
+        existing = segment_paths(self.directory) + active_segment_paths(self.directory)
+        number = max(map(_segment_number, existing), default=0) + 1
+
+        # Locked before it gets a segment name, so compact() never finds it unlocked
+        temp_path = os.path.join(self.directory, f'.segment-{uuid.uuid4().hex}.tmp')
+        fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_APPEND, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            while True:
+                path = os.path.join(self.directory, ACTIVE_PATTERN.format(number))
+                if os.path.exists(_sealed_path(path)):
+                    number += 1
+                    continue
+                try:
+                    # link() fails if another process took this number meanwhile
+                    os.link(temp_path, path)
+                except FileExistsError:
+                    number += 1
+                    continue
+                break
+        except BaseException:
+            os.close(fd)
+            raise
+        finally:
+            os.unlink(temp_path)
+
+        self._seal()
+        self._file = os.fdopen(fd, 'ab', buffering=0)
+        self._path = path
+        self._segment = number
+        self._written = 0
+        self._synced = 0
+
+    def _seal(self):
+        """Sync the active segment, rename it to its sealed name and release it"""
+        if self._file is None:
+            return
+        self._sync_file(self._file)
+        os.rename(self._path, _sealed_path(self._path))
+        self._file.close()  # releases the flock
+        self._file = None
+
+    def _sync_file(self, f):
+        if self.fsync:
+            os.fsync(f.fileno())
+
+    def append(self, record):
+        """
+        Append one record
+
+        Args:
+            record: JSON-serialisable dict
+
+        Returns:
+            Journal id of the record ('<segment>-<offset>')
+        """
+        payload = json.dumps(record, separators=(',', ':')).encode('utf-8')
+        data = HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+        with self._lock:
+            if self._file is None or self._written >= self.segment_bytes:
+                self._open_next_segment()
+            offset = self._written
+            self._file.write(data)
+            self._written += len(data)
+            f, segment, end = self._file, self._segment, self._written
+
+        if self.fsync:
+            self._group_sync(f, segment, end)
+        return f'{segment:08d}-{offset}'
+
+    def _group_sync(self, f, segment, end):
+        """fsync unless a concurrent writer's fsync already covered end"""
+        with self._sync_lock:
+            with self._lock:
+                if segment != self._segment:
+                    return  # sealed segments are synced when they roll over
+                if self._synced >= end:
+                    return
+                target = self._written
+            try:
+                os.fsync(f.fileno())
+            except (ValueError, OSError):
+                # A concurrent rollover synced and closed this segment
+                with self._lock:
+                    if segment != self._segment:
+                        return
+                raise
+            with self._lock:
+                if segment == self._segment:
+                    self._synced = max(self._synced, target)
+
+    def close(self):
+        """Sync, seal and close the active segment"""
+        with self._lock:
+            self._seal()
+
+
+def compact(directory, load_batch, batch_size=500):
+    """
+    Load sealed segments into the database and delete them
+
+    Segments a live writer holds are left alone; those of stopped writers
+    are sealed and loaded.
+
+    Args:
+        directory: Journal directory
+        load_batch: Callable taking a list of records; must commit them
+        batch_size: Records passed to load_batch at a time
+
+    Returns:
+        (segments compacted, records loaded)
+    """
+    for path in active_segment_paths(directory):
+        seal_orphan(path)
+    paths = segment_paths(directory)
+
+    segments = records = 0
+    for path in paths:
+        batch = []
+        for _, record in read_segment(path):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                load_batch(batch)
+                records += len(batch)
+                batch = []
+        if batch:
+            load_batch(batch)
+            records += len(batch)
+        # Only removed once every record is committed; a crash before this
+        # reloads the segment and dedupe keys skip the repeats
+        os.remove(path)
+        segments += 1
+    return segments, records
@@ -0,0 +1,221 @@
+"""
+Request and SQL metrics with a Prometheus text exposition
+
+Request hooks registered by Metrics.register() record, per endpoint and
+method, a latency histogram and counts by status, plus an in-flight gauge
+per endpoint. SQLAlchemy cursor events count every statement and charge
+it to the request running on the same thread (statements from background
+threads such as the ingest writer are reported under endpoint="background").
+Statement timing can be sampled: with sql_sample_rate below 1 only that
+fraction of statements is timed, and db_statement_seconds_count says how
+many were, so sum / count stays an unbiased mean.
+
+Updates take one short lock per request; /api/metrics renders the
+snapshot in the Prometheus text format (version 0.0.4).
+"""
+import bisect
+import random
+import threading
+import time
+
+from flask import request
+from sqlalchemy import event
+
+# Seconds; an implicit +Inf bucket follows
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+EXPOSITION_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+BACKGROUND = 'background'
+UNMATCHED = 'unmatched'
+
+
+class RouteStats:
+    """Counters for one (endpoint, method) pair"""
+
+    __slots__ = ('buckets', 'latency_sum', 'count', 'statuses', 'sql_statements', 'sql_seconds', 'sql_timed')
+
+    def __init__(self, bucket_count):
+        self.buckets = [0] * (bucket_count + 1)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.statuses = {}
+        self.sql_statements = 0
+        self.sql_seconds = 0.0
+        self.sql_timed = 0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+class Metrics:
+    """Per-endpoint request and SQL counters"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, sql_sample_rate=1.0):
+        """
+        Args:
+            buckets: Latency histogram upper bounds in seconds, ascending
+            sql_sample_rate: Fraction of SQL statements timed (all are counted)
+        """
+        self.buckets = tuple(buckets)
+        self.sql_sample_rate = sql_sample_rate
+        self.started = time.time()
+        self._routes = {}
+        self._in_flight = {}
+        self._background = [0, 0.0, 0]
+        self._lock = threading.Lock()
+        # [statements, seconds, timed] for the request on this thread
+        self._local = threading.local()
+
+    def register(self, app):
+        """Install the request hooks on app"""
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def instrument_engine(self, engine):
+        """Count (and sample-time) every statement run through engine"""
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def begin(self, endpoint):
+        """Count a request as in flight"""
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+
+    def finish(self, endpoint, method, status, elapsed, sql=(0, 0.0, 0)):
+        """
+        Record a finished request (and take it out of the in-flight gauge)
+
+        Args:
+            endpoint: Endpoint name used as the label
+            method: HTTP method
+            status: Response status code
+            elapsed: Seconds to build the response
+            sql: (statements, seconds timed, statements timed)
+        """
+        index = bisect.bisect_left(self.buckets, elapsed)
+        key = (endpoint, method)
+        with self._lock:
+            self._in_flight[endpoint] -= 1
+            route = self._routes.get(key)
+            if route is None:
+                route = self._routes[key] = RouteStats(len(self.buckets))
+            route.buckets[index] += 1
+            route.latency_sum += elapsed
+            route.count += 1
+            route.statuses[status] = route.statuses.get(status, 0) + 1
+            route.sql_statements += sql[0]
+            route.sql_seconds += sql[1]
+            route.sql_timed += sql[2]
+
+    def _before_request(self):
+        endpoint = request.endpoint or UNMATCHED
+        self._local.request = [endpoint, time.perf_counter(), None, None]
+        self._local.sql = [0, 0.0, 0]
+        self.begin(endpoint)
+
+    def _after_request(self, response):
+        state = getattr(self._local, 'request', None)
+        if state is not None:
+            # Streams are timed to their first byte; teardown runs when they end
+            state[2] = time.perf_counter() - state[1]
+            state[3] = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        state = getattr(self._local, 'request', None)
+        if state is None:
+            return
+        sql = self._local.sql
+        self._local.request = self._local.sql = None
+        endpoint, started, elapsed, status = state
+        if elapsed is None:
+            # after_request never ran: an unhandled exception
+            elapsed, status = time.perf_counter() - started, 500
+        self.finish(endpoint, request.method, status, elapsed, sql)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        sql = getattr(self._local, 'sql', None)
+        if sql is not None:
+            sql[0] += 1
+        else:
+            with self._lock:
+                self._background[0] += 1
+        if self.sql_sample_rate >= 1 or random.random() < self.sql_sample_rate:
+            context.metrics_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, 'metrics_started', None)
+        if started is None:
+            return
+        context.metrics_started = None
+        elapsed = time.perf_counter() - started
+        sql = getattr(self._local, 'sql', None)
+        if sql is not None:
+            sql[1] += elapsed
+            sql[2] += 1
+        else:
+            with self._lock:
+                self._background[1] += elapsed
+                self._background[2] += 1
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            routes = {
+                key: (list(r.buckets), r.latency_sum, r.count, dict(r.statuses),
+                      r.sql_statements, r.sql_seconds, r.sql_timed)
+                for key, r in self._routes.items()
+            }
+            in_flight = dict(self._in_flight)
+            background = list(self._background)
+
+        lines = [
+            '# HELP http_request_duration_seconds Time to build the response, by endpoint',
+            '# TYPE http_request_duration_seconds histogram',
+        ]
+        for (endpoint, method), (buckets, total, count, _, _, _, _) in sorted(routes.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + ('+Inf',), buckets):
+                cumulative += bucket
+                labels = _labels(endpoint=endpoint, method=method, le=bound)
+                lines.append(f'http_request_duration_seconds_bucket{labels} {cumulative}')
+            labels = _labels(endpoint=endpoint, method=method)
+            lines.append(f'http_request_duration_seconds_sum{labels} {total}')
+            lines.append(f'http_request_duration_seconds_count{labels} {count}')
+
+        lines += ['# HELP http_requests_total Requests finished, by endpoint and status',
+                  '# TYPE http_requests_total counter']
+        for (endpoint, method), route in sorted(routes.items()):
+            for status, count in sorted(route[3].items()):
+                lines.append(f'http_requests_total{_labels(endpoint=endpoint, method=method, status=status)} {count}')
+
+        lines += ['# HELP http_requests_in_flight Requests (and open streams) being handled',
+                  '# TYPE http_requests_in_flight gauge']
+        for endpoint, count in sorted(in_flight.items()):
+            lines.append(f'http_requests_in_flight{_labels(endpoint=endpoint)} {count}')
+
+        sql_rows = [((endpoint, method), statements, seconds, timed)
+                    for (endpoint, method), (_, _, _, _, statements, seconds, timed) in sorted(routes.items())]
+        sql_rows.append(((BACKGROUND, ''), *background))
+        lines += ['# HELP db_statements_total SQL statements executed, by endpoint',
+                  '# TYPE db_statements_total counter']
+        for (endpoint, method), statements, _, _ in sql_rows:
+            lines.append(f'db_statements_total{_labels(endpoint=endpoint, method=method)} {statements}')
+        lines += ['# HELP db_statement_seconds Time in SQL statements; count is the statements timed (sampled)',
+                  '# TYPE db_statement_seconds summary']
+        for (endpoint, method), _, seconds, timed in sql_rows:
+            labels = _labels(endpoint=endpoint, method=method)
+            lines.append(f'db_statement_seconds_sum{labels} {seconds}')
+            lines.append(f'db_statement_seconds_count{labels} {timed}')
+
+        lines += ['# HELP process_start_time_seconds Start time of the process since the epoch',
+                  '# TYPE process_start_time_seconds gauge',
+                  f'process_start_time_seconds {self.started}']
+        return '\n'.join(lines) + '\n'
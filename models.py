@@ -3,12 +3,19 @@ Database models for Visualize Studio
 """
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, event, inspect, text
 
 db = SQLAlchemy()
 
 class ContactSubmission(db.Model):
     """Model for contact form submissions"""
     __tablename__ = 'contact_submissions'
+    __table_args__ = (
+        # Keyset pagination walks (submitted_at, id) newest first, optionally filtered
+        db.Index('ix_contact_submitted_at_id', 'submitted_at', 'id'),
+        db.Index('ix_contact_read_submitted_at_id', 'read', 'submitted_at', 'id'),
+        db.Index('ix_contact_project_type_submitted_at_id', 'project_type', 'submitted_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -33,6 +40,11 @@ class ContactSubmission(db.Model):
 class QuoteSubmission(db.Model):
     """Model for quote request form submissions"""
     __tablename__ = 'quote_submissions'
+    __table_args__ = (
+        db.Index('ix_quote_submitted_at_id', 'submitted_at', 'id'),
+        db.Index('ix_quote_read_submitted_at_id', 'read', 'submitted_at', 'id'),
+        db.Index('ix_quote_package_submitted_at_id', 'package', 'submitted_at', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(200), nullable=False)
@@ -55,9 +67,446 @@ class QuoteSubmission(db.Model):
         }
 
 
+# Submission models by URL kind
+SUBMISSION_MODELS = {
+    'contact': ContactSubmission,
+    'quote': QuoteSubmission
+}
 
+class ContactSubmissionArchive(db.Model):
+    """Read contact submissions moved out of contact_submissions by archive.py"""
+    __tablename__ = 'contact_submissions_archive'
+    __table_args__ = (
+        db.Index('ix_contact_archive_submitted_at_id', 'submitted_at', 'id'),
+        db.Index('ix_contact_archive_project_type_submitted_at_id', 'project_type', 'submitted_at', 'id'),
+    )
+    
+    # Ids are kept from the hot table
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    email = db.Column(db.String(200), nullable=False)
+    project_type = db.Column(db.String(100))
+    message = db.Column(db.Text, nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=False)
+    read = db.Column(db.Boolean, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+class QuoteSubmissionArchive(db.Model):
+    """Read quote submissions moved out of quote_submissions by archive.py"""
+    __tablename__ = 'quote_submissions_archive'
+    __table_args__ = (
+        db.Index('ix_quote_archive_submitted_at_id', 'submitted_at', 'id'),
+        db.Index('ix_quote_archive_package_submitted_at_id', 'package', 'submitted_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(200), nullable=False)
+    email = db.Column(db.String(200), nullable=False)
+    package = db.Column(db.String(100))
+    project_details = db.Column(db.Text, nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=False)
+    read = db.Column(db.Boolean, nullable=False)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+# Archive model by URL kind
+ARCHIVE_MODELS = {
+    'contact': ContactSubmissionArchive,
+    'quote': QuoteSubmissionArchive
+}
+
+# Archive model of each submission model
+ARCHIVES = {SUBMISSION_MODELS[kind]: model for kind, model in ARCHIVE_MODELS.items()}
+
+class SubmissionDedupe(db.Model):
+    """Recently seen idempotency keys / content hashes and the submission they created"""
+    __tablename__ = 'submission_dedupe'
+    
+    key = db.Column(db.String(80), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    submission_id = db.Column(db.Integer, nullable=False)
+    # Id a queued submission was acknowledged with (ingest.py); repeats get it back
+    provisional_id = db.Column(db.String(32))
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+
+class EmailOutbox(db.Model):
+    """Notification emails written with their submission and sent by outbox.py"""
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        # The worker claims due rows oldest first
+        db.Index('ix_email_outbox_next_attempt_at_id', 'next_attempt_at', 'id'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)
+    submission_id = db.Column(db.Integer, nullable=False)
+    subject = db.Column(db.String(300), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    reply_to = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    # NULL once the row has used up its attempts (sent rows are deleted)
+    next_attempt_at = db.Column(db.DateTime)
+    claimed_by = db.Column(db.String(32))
+    last_error = db.Column(db.Text)
+
+class SubmissionStats(db.Model):
+    """
+    Single-row table of submission counters
+
+    Kept current by SQLite triggers on the submission and archive tables
+    (see ensure_stats_triggers), so reading stats is one primary-key
+    lookup. The totals count the hot tables only; <kind>_archived counts
+    the archive tables. version is bumped by every insert, delete and
+    read-state change, so it doubles as a change token for conditional GETs.
+    """
+    __tablename__ = 'submission_stats'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    contact_total = db.Column(db.Integer, default=0, nullable=False)
+    contact_unread = db.Column(db.Integer, default=0, nullable=False)
+    quote_total = db.Column(db.Integer, default=0, nullable=False)
+    quote_unread = db.Column(db.Integer, default=0, nullable=False)
+    contact_archived = db.Column(db.Integer, default=0, nullable=False)
+    quote_archived = db.Column(db.Integer, default=0, nullable=False)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    
+    def to_dict(self, include_archived=False):
+        """Convert counters to the /api/submissions/stats shape"""
+        stats = {
+            'contact_total': self.contact_total,
+            'quote_total': self.quote_total,
+            'contact_unread': self.contact_unread,
+            'quote_unread': self.quote_unread
+        }
+        if include_archived:
+            stats = with_archived(stats, {'contact': self.contact_archived, 'quote': self.quote_archived})
+        return stats
+
+# Primary key of the only SubmissionStats row
+STATS_ROW_ID = 1
+
+def _stats_trigger_sql(table, prefix):
+    """CREATE TRIGGER statements keeping one kind's counters in sync"""
+    return [
+        f"""
+        CREATE TRIGGER {table}_stats_insert AFTER INSERT ON {table}
+        BEGIN
+            UPDATE submission_stats
+            SET {prefix}_total = {prefix}_total + 1,
+                {prefix}_unread = {prefix}_unread + (NEW.read = 0),
+                version = version + 1
+            WHERE id = {STATS_ROW_ID};
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_stats_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE submission_stats
+            SET {prefix}_total = {prefix}_total - 1,
+                {prefix}_unread = {prefix}_unread - (OLD.read = 0),
+                version = version + 1
+            WHERE id = {STATS_ROW_ID};
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_stats_update AFTER UPDATE OF read ON {table}
+        WHEN NEW.read IS NOT OLD.read
+        BEGIN
+            UPDATE submission_stats
+            SET {prefix}_unread = {prefix}_unread + (NEW.read = 0) - (OLD.read = 0),
+                version = version + 1
+            WHERE id = {STATS_ROW_ID};
+        END
+        """
+    ]
+
+def _archive_trigger_sql(table, prefix):
+    """CREATE TRIGGER statements keeping one kind's archived counter in sync"""
+    return [
+        f"""
+        CREATE TRIGGER {table}_stats_insert AFTER INSERT ON {table}
+        BEGIN
+            UPDATE submission_stats
+            SET {prefix}_archived = {prefix}_archived + 1, version = version + 1
+            WHERE id = {STATS_ROW_ID};
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_stats_delete AFTER DELETE ON {table}
+        BEGIN
+            UPDATE submission_stats
+            SET {prefix}_archived = {prefix}_archived - 1, version = version + 1
+            WHERE id = {STATS_ROW_ID};
+        END
+        """
+    ]
+
+def rebuild_submission_stats():
+    """Re-derive the counters from the submission and archive tables in one statement"""
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            f"INSERT OR IGNORE INTO submission_stats "
+            f"(id, contact_total, contact_unread, quote_total, quote_unread, "
+            f"contact_archived, quote_archived, version) "
+            f"VALUES ({STATS_ROW_ID}, 0, 0, 0, 0, 0, 0, 0)"
+        ))
+        conn.execute(text(f"""
+            UPDATE submission_stats SET
+                contact_total = (SELECT COUNT(*) FROM contact_submissions),
+                contact_unread = (SELECT COUNT(*) FROM contact_submissions WHERE read = 0),
+                quote_total = (SELECT COUNT(*) FROM quote_submissions),
+                quote_unread = (SELECT COUNT(*) FROM quote_submissions WHERE read = 0),
+                contact_archived = (SELECT COUNT(*) FROM contact_submissions_archive),
+                quote_archived = (SELECT COUNT(*) FROM quote_submissions_archive),
+                version = version + 1
+            WHERE id = {STATS_ROW_ID}
+        """))
+
+def with_archived(stats, archived):
+    """
+    Extend hot-table stats with archived rows
+
+    Args:
+        stats: Counters of the hot tables (the /api/submissions/stats shape)
+        archived: Archived row count per kind
+
+    Returns:
+        New dict whose totals span both tables, plus <kind>_archived
+        (archived rows are all read, so the unread counts are unchanged)
+    """
+    stats = dict(stats)
+    for kind, count in archived.items():
+        stats[f'{kind}_total'] += count
+        stats[f'{kind}_archived'] = count
+    return stats
+
+def count_stats(include_archived=False):
+    """Count submissions directly (used when no counters row exists)"""
+    stats = {
+        'contact_total': ContactSubmission.query.count(),
+        'quote_total': QuoteSubmission.query.count(),
+        'contact_unread': ContactSubmission.query.filter_by(read=False).count(),
+        'quote_unread': QuoteSubmission.query.filter_by(read=False).count()
+    }
+    if include_archived:
+        stats = with_archived(stats, {kind: model.query.count() for kind, model in ARCHIVE_MODELS.items()})
+    return stats
+
+def read_stats(include_archived=False):
+    """
+    Read the trigger-maintained counters with a single primary-key lookup
+
+    Args:
+        include_archived: Count archived submissions too (see with_archived)
+    """
+    stats = db.session.get(SubmissionStats, STATS_ROW_ID)
+    if stats is None:
+        return count_stats(include_archived)
+    return stats.to_dict(include_archived)
+
+def ensure_stats_triggers():
+    """
+    Install the counter triggers and seed the counters row (SQLite only)
+
+    On other databases no triggers are installed and the stats endpoint
+    falls back to counting rows.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    with db.engine.begin() as conn:
+        # Counters tables created before the version column existed
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(submission_stats)"))}
+        for column in ('version', 'contact_archived', 'quote_archived'):
+            if column not in columns:
+                conn.execute(text(
+                    f"ALTER TABLE submission_stats ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0"
+                ))
+        # Recreated on every schema setup; bump SCHEMA_VERSION when a trigger body changes
+        for table, prefix in (('contact_submissions', 'contact'), ('quote_submissions', 'quote')):
+            for event_name in ('insert', 'delete', 'update'):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_stats_{event_name}"))
+            for statement in _stats_trigger_sql(table, prefix):
+                conn.execute(text(statement))
+            archive = f'{table}_archive'
+            for event_name in ('insert', 'delete'):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {archive}_stats_{event_name}"))
+            for statement in _archive_trigger_sql(archive, prefix):
+                conn.execute(text(statement))
+    if db.session.get(SubmissionStats, STATS_ROW_ID) is None:
+        rebuild_submission_stats()
+    db.session.remove()
+
+# Columns indexed for full-text search, per submission kind
+SEARCH_COLUMNS = {
+    'contact': ('name', 'email', 'message'),
+    'quote': ('name', 'email', 'project_details')
+}
+
+def search_table(kind):
+    """Name of the FTS5 table indexing one submission kind"""
+    return f'{SUBMISSION_MODELS[kind].__tablename__}_fts'
+
+def _search_sql(kind):
+    """CREATE statements for one kind's FTS5 table and its sync triggers"""
+    table = SUBMISSION_MODELS[kind].__tablename__
+    fts = search_table(kind)
+    columns = ', '.join(SEARCH_COLUMNS[kind])
+    new_values = ', '.join(f'NEW.{c}' for c in SEARCH_COLUMNS[kind])
+    old_values = ', '.join(f'OLD.{c}' for c in SEARCH_COLUMNS[kind])
+    return [
+        # External content: the index stores tokens only, text stays in the table
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {columns}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER {table}_fts_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO {fts}(rowid, {columns}) VALUES (NEW.id, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_fts_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', OLD.id, {old_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER {table}_fts_update AFTER UPDATE OF {columns} ON {table}
+        BEGIN
+            INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', OLD.id, {old_values});
+            INSERT INTO {fts}(rowid, {columns}) VALUES (NEW.id, {new_values});
+        END
+        """
+    ]
+
+def rebuild_search_index():
+    """Re-derive every FTS5 index from its submission table"""
+    with db.engine.begin() as conn:
+        for kind in SEARCH_COLUMNS:
+            fts = search_table(kind)
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('optimize')"))
+
+def ensure_search_index():
+    """
+    Install the FTS5 tables and sync triggers (SQLite with FTS5 only)
+
+    Tables created here for an existing database are filled from the
+    submission tables once.
+
+    Returns:
+        True if full-text search is available
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    with db.engine.begin() as conn:
+        if not conn.execute(text("SELECT sqlite_compileoption_used('ENABLE_FTS5')")).scalar():
+            return False
+        existing = {row[0] for row in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%\\_fts' ESCAPE '\\'"
+        ))}
+        for kind in SEARCH_COLUMNS:
+            table = SUBMISSION_MODELS[kind].__tablename__
+            for event_name in ('insert', 'delete', 'update'):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_fts_{event_name}"))
+            for statement in _search_sql(kind):
+                conn.execute(text(statement))
+        missing = [kind for kind in SEARCH_COLUMNS if search_table(kind) not in existing]
+        for kind in missing:
+            fts = search_table(kind)
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+    return True
+
+def configure_sqlite(engine, pragmas):
+    """
+    Apply PRAGMA settings to every new connection of a SQLite engine
+
+    Args:
+        engine: SQLAlchemy engine
+        pragmas: Mapping of pragma name to value, e.g. {'journal_mode': 'WAL'}
+    """
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+def ensure_indexes():
+    """
+    Create any indexes missing from existing tables
+
+    db.create_all() only creates indexes together with new tables, so
+    databases created before an index was added need this step.
+    """
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
+
+def ensure_columns():
+    """
+    Add nullable columns missing from existing tables
+
+    Like indexes, db.create_all() leaves the columns of existing tables
+    alone; new columns stay nullable so they can be added in place.
+    """
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing and column.nullable:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+# Bump whenever tables, columns, indexes or trigger bodies change so
+# existing databases are set up again on their next start
+SCHEMA_VERSION = 4
 
+def ensure_schema(force=False):
+    """
+    Create tables, indexes, counter triggers and the search index
 
+    A SQLite database records the SCHEMA_VERSION it was set up for in
+    PRAGMA user_version; when it matches, startup skips the DDL (and its
+    write lock) entirely. Other databases are always checked.
 
+    Args:
+        force: Run the setup even if the recorded version is current
 
+    Returns:
+        True if the setup ran
+    """
+    sqlite = db.engine.dialect.name == 'sqlite'
+    if sqlite and not force:
+        with db.engine.connect() as conn:
+            if conn.execute(text("PRAGMA user_version")).scalar() == SCHEMA_VERSION:
+                return False
+    db.create_all()
+    ensure_columns()
+    ensure_indexes()
+    ensure_stats_triggers()
+    ensure_search_index()
+    if sqlite:
+        with db.engine.begin() as conn:
+            conn.execute(text(f"PRAGMA user_version = {SCHEMA_VERSION}"))
+    return True
 
+def search_index_available():
+    """Return True if the FTS5 tables exist (without touching the schema)"""
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    tables = [search_table(kind) for kind in SEARCH_COLUMNS]
+    with db.engine.connect() as conn:
+        found = conn.execute(
+            text("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name IN :names")
+            .bindparams(bindparam('names', expanding=True)),
+            {'names': tables}
+        ).scalar()
+    return found == len(tables)
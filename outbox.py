@@ -0,0 +1,400 @@
+"""
+Transactional outbox for new-submission notification emails
+
+Sending mail from the submit routes would put the mail server's latency
+(and outages) on every form POST. Instead each stored submission gets a
+row in email_outbox written in the same transaction (api.save_submission,
+ingest.insert_records, which also loads the serverless journal, and the
+ASGI submit), so a notification is queued exactly when its submission is
+committed. An OutboxWorker thread in each process sends them:
+
+    - due rows are claimed in batches of MAIL_BATCH_SIZE (a claimed_by
+      token and a lease on next_attempt_at), so several processes can run
+      workers without sending a row twice; rows claimed by a worker that
+      stopped mid-batch are retried once the lease runs out, so delivery
+      is at-least-once
+    - a batch goes out over one SMTP connection, which stays open between
+      batches until it has been idle for MAIL_SMTP_IDLE seconds
+    - with MAIL_DIGEST_INTERVAL set, a batch is sent as one digest email
+      once its oldest notification has waited that long
+    - failed sends are retried after MAIL_RETRY_BASE * 2**(attempts - 1)
+      seconds (at most MAIL_RETRY_MAX); after MAIL_MAX_ATTEMPTS a row is
+      kept with next_attempt_at NULL and its last_error for inspection
+
+Sent rows are deleted. The worker starts with the process's first
+request and is woken after each commit that queued a notification; rows
+from other processes (and from flask compact-journal) are picked up every
+MAIL_POLL_INTERVAL seconds. flask send-outbox sends everything due from
+the command line. Notifications are off unless MAIL_NOTIFY_TO is set;
+smtp_sink.py is a local SMTP server to point MAIL_SMTP_HOST and
+MAIL_SMTP_PORT at while trying this out.
+"""
+import atexit
+import smtplib
+import ssl
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid, parseaddr
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, select, update
+
+from models import db, EmailOutbox
+
+
+def _one_line(value):
+    """Collapse whitespace, so user input cannot add header lines"""
+    return ' '.join((value or '').split())
+
+
+def notification_content(kind, submission):
+    """
+    Subject and body of a submission's notification, as in the
+    EMAILJS_SETUP.md templates
+
+    Args:
+        kind: 'contact' or 'quote'
+        submission: Column values of the submission
+
+    Returns:
+        (subject, body)
+    """
+    name = _one_line(submission['name'])
+    lines = [f"From: {name}", f"Email: {submission['email']}"]
+    if kind == 'contact':
+        subject = f"New Contact Form Submission from {name}"
+        lines += [f"Project Type: {submission.get('project_type') or ''}", "", "Message:", submission['message']]
+    else:
+        subject = f"New Quote Request from {name}"
+        lines += [f"Package Interest: {submission.get('package') or ''}", "", "Project Details:",
+                  submission['project_details']]
+    return subject[:300], '\n'.join(lines) + '\n'
+
+
+def outbox_values(kind, submission, now=None):
+    """
+    Column values of the email_outbox row for a stored submission
+
+    Args:
+        kind: 'contact' or 'quote'
+        submission: Column values of the submission, including its id
+        now: Creation time, due at once (default utcnow)
+    """
+    now = now or datetime.utcnow()
+    subject, body = notification_content(kind, submission)
+    return {
+        'kind': kind,
+        'submission_id': submission['id'],
+        'subject': subject,
+        'body': body,
+        'reply_to': _one_line(submission['email'])[:200] or None,
+        'created_at': now,
+        'attempts': 0,
+        'next_attempt_at': now
+    }
+
+
+def queue_notifications(submissions):
+    """
+    Add outbox rows for new submissions to the session (needs an app context)
+
+    Call after the submissions are flushed and before the commit, so each
+    notification is stored exactly when its submission is. Does nothing
+    unless MAIL_NOTIFY_TO is set.
+
+    Args:
+        submissions: List of (kind, submission dict) pairs
+    """
+    if not current_app.config['MAIL_NOTIFY_TO']:
+        return
+    now = datetime.utcnow()
+    db.session.add_all([EmailOutbox(**outbox_values(kind, submission, now)) for kind, submission in submissions])
+
+
+def wake_outbox():
+    """Have this process's worker send newly committed notifications (needs an app context)"""
+    worker = current_app.extensions.get('outbox')
+    if worker is not None:
+        worker.wake()
+
+
+class OutboxWorker:
+    """Background sender of the email_outbox table"""
+
+    def __init__(self, app):
+        """
+        Args:
+            app: Flask app whose MAIL_* settings and database the worker uses
+        """
+        config = app.config
+        self.app = app
+        self.recipients = [address.strip() for address in config['MAIL_NOTIFY_TO'].split(',') if address.strip()]
+        self.sender = config['MAIL_FROM']
+        self.smtp_host = config['MAIL_SMTP_HOST']
+        self.smtp_port = config['MAIL_SMTP_PORT']
+        self.smtp_username = config['MAIL_SMTP_USERNAME']
+        self.smtp_password = config['MAIL_SMTP_PASSWORD']
+        self.smtp_starttls = config['MAIL_SMTP_STARTTLS']
+        self.smtp_timeout = config['MAIL_SMTP_TIMEOUT']
+        self.smtp_idle = config['MAIL_SMTP_IDLE']
+        self.digest_interval = config['MAIL_DIGEST_INTERVAL']
+        self.batch_size = config['MAIL_BATCH_SIZE']
+        self.poll_interval = config['MAIL_POLL_INTERVAL']
+        self.max_attempts = config['MAIL_MAX_ATTEMPTS']
+        self.retry_base = config['MAIL_RETRY_BASE']
+        self.retry_max = config['MAIL_RETRY_MAX']
+        self.claim_lease = config['MAIL_CLAIM_LEASE']
+        # make_msgid() would look up the host name for every message
+        self._msgid_domain = parseaddr(self.sender)[1].rpartition('@')[2] or 'localhost'
+        self.sent = 0
+        self.failed = 0
+        self.connections = 0
+        self._smtp = None
+        self._smtp_used = 0.0
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    # ----- Lifecycle -----
+
+    def start(self):
+        """Start the worker thread (idempotent)"""
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name='outbox-worker', daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def wake(self):
+        """Have a started worker check for due notifications now rather than at the next poll"""
+        self._wake.set()
+
+    def close(self, timeout=10):
+        """Stop the worker after its current batch"""
+        if self._thread is None:
+            return
+        self._stopping.set()
+        self._wake.set()
+        self._thread.join(timeout)
+
+    def _wait_time(self):
+        if self._smtp is None:
+            return self.poll_interval
+        return max(0.0, min(self.poll_interval, self._smtp_used + self.smtp_idle - time.monotonic()))
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Cleared first, so a commit during the batch triggers another round
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    busy = self.send_due() == self.batch_size
+            except Exception:
+                print(f"Error in outbox worker: {traceback.format_exc()}")
+                busy = False
+            if busy:
+                continue
+            if self._smtp is not None and time.monotonic() - self._smtp_used >= self.smtp_idle:
+                self.disconnect()
+            self._wake.wait(self._wait_time())
+        self.disconnect()
+
+    # ----- SMTP -----
+
+    def _connect(self):
+        if self._smtp is None:
+            smtp = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=self.smtp_timeout)
+            try:
+                if self.smtp_starttls:
+                    smtp.starttls(context=ssl.create_default_context())
+                if self.smtp_username:
+                    smtp.login(self.smtp_username, self.smtp_password)
+            except Exception:
+                smtp.close()
+                raise
+            self._smtp = smtp
+            self._smtp_used = time.monotonic()
+            self.connections += 1
+        return self._smtp
+
+    def disconnect(self):
+        """Close the SMTP connection, if one is open"""
+        if self._smtp is None:
+            return
+        smtp, self._smtp = self._smtp, None
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _send(self, message):
+        """Send over the open connection, reconnecting once if the server closed it"""
+        for retry in (False, True):
+            smtp = self._connect()
+            try:
+                smtp.send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # Usually an idle connection the server timed out
+                self.disconnect()
+                if retry:
+                    raise
+                continue
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused):
+                raise  # refused, but the connection is still usable
+            except OSError:
+                self.disconnect()
+                raise
+            self._smtp_used = time.monotonic()
+            return
+
+    def _message(self, subject, body, reply_to=None):
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message['Subject'] = subject
+        message['Date'] = formatdate(localtime=True)
+        message['Message-ID'] = make_msgid(domain=self._msgid_domain)
+        if reply_to:
+            message['Reply-To'] = reply_to
+        message.set_content(body)
+        return message
+
+    def _send_each(self, rows):
+        """Send one email per row over the shared connection; returns row id -> error"""
+        errors = {}
+        for index, row in enumerate(rows):
+            try:
+                self._send(self._message(row.subject, row.body, row.reply_to))
+            except (OSError, ValueError) as e:
+                errors[row.id] = e
+                if self._smtp is None:
+                    # No connection: fail the rest now instead of timing out on each
+                    errors.update((later.id, e) for later in rows[index + 1:])
+                    break
+        return errors
+
+    def _send_digest(self, rows):
+        """Send all rows as one email; returns row id -> error"""
+        count = len(rows)
+        subject = f"{count} new form submission{'s' if count != 1 else ''}"
+        body = f"\n{'-' * 60}\n\n".join(f"{row.subject}\n\n{row.body}" for row in rows)
+        try:
+            self._send(self._message(subject, body))
+        except (OSError, ValueError) as e:
+            return {row.id: e for row in rows}
+        return {}
+
+    # ----- Outbox table -----
+
+    def _claim(self, now, force=False):
+        """Claim a batch of due rows; returns (claim token, rows)"""
+        table = EmailOutbox.__table__
+        due = table.c.next_attempt_at <= now
+        # Candidates are picked outside the write transaction (next_attempt_at index)
+        with db.engine.connect() as conn:
+            if self.digest_interval and not force:
+                # A digest goes out once its oldest notification has waited the interval
+                oldest = conn.execute(select(func.min(table.c.created_at)).where(due)).scalar()
+                if oldest is None or oldest > now - timedelta(seconds=self.digest_interval):
+                    return None, []
+            ids = conn.execute(
+                select(table.c.id)
+                .where(due)
+                .order_by(table.c.next_attempt_at, table.c.id)
+                .limit(self.batch_size)
+            ).scalars().all()
+        if not ids:
+            return None, []
+
+        # Re-checked under the write lock, in case another worker claimed them meanwhile
+        token = uuid.uuid4().hex
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(and_(table.c.id.in_(ids), due))
+                .values(
+                    claimed_by=token,
+                    attempts=table.c.attempts + 1,
+                    next_attempt_at=now + timedelta(seconds=self.claim_lease)
+                )
+            )
+            rows = conn.execute(
+                select(table).where(table.c.id.in_(ids), table.c.claimed_by == token).order_by(table.c.id)
+            ).all()
+        return token, rows
+
+    def _finish(self, token, rows, errors):
+        """Delete the sent rows and schedule retries of the failed ones in one transaction"""
+        table = EmailOutbox.__table__
+        claimed = table.c.claimed_by == token
+        now = datetime.utcnow()
+        sent = [row.id for row in rows if row.id not in errors]
+        with db.engine.begin() as conn:
+            if sent:
+                conn.execute(delete(table).where(table.c.id.in_(sent), claimed))
+            for row in rows:
+                error = errors.get(row.id)
+                if error is None:
+                    continue
+                if row.attempts >= self.max_attempts:
+                    retry_at = None
+                    print(f"Giving up on outbox row {row.id} after {row.attempts} attempts: {error}")
+                else:
+                    delay = min(self.retry_base * 2 ** (row.attempts - 1), self.retry_max)
+                    retry_at = now + timedelta(seconds=delay)
+                conn.execute(
+                    update(table)
+                    .where(table.c.id == row.id, claimed)
+                    .values(next_attempt_at=retry_at, claimed_by=None,
+                            last_error=f'{type(error).__name__}: {error}'[:1000])
+                )
+        self.sent += len(sent)
+        self.failed += len(errors)
+
+    def send_due(self, force=False):
+        """
+        Claim one batch of due notifications and send it (needs an app context)
+
+        Args:
+            force: In digest mode, send without waiting for the interval
+
+        Returns:
+            Number of notifications claimed
+        """
+        token, rows = self._claim(datetime.utcnow(), force)
+        if not rows:
+            return 0
+        errors = self._send_digest(rows) if self.digest_interval else self._send_each(rows)
+        self._finish(token, rows, errors)
+        return len(rows)
+
+    def drain(self, force=False):
+        """
+        Send every due notification, then disconnect (needs an app context;
+        for the command line, not while the worker thread runs)
+
+        Args:
+            force: In digest mode, send without waiting for the interval
+
+        Returns:
+            Number of notifications claimed
+        """
+        if self._thread is not None:
+            raise RuntimeError('drain() would share the SMTP connection with the running worker thread')
+        claimed = 0
+        try:
+            while True:
+                count = self.send_due(force)
+                claimed += count
+                if count < self.batch_size:
+                    return claimed
+        finally:
+            self.disconnect()
@@ -0,0 +1,126 @@
+"""
+Server-side page assembly for the clean-URL routes
+
+Pages in pages/*.html load includes/header.html and includes/footer.html
+with fetch() after the page arrives. The PageCache stitches both includes
+into the page on the server, keeps the finished bytes in memory and only
+rebuilds a page when one of its source files changes on disk. With an
+AssetManifest, asset references are pointed at their hashed URLs (see
+asset_manifest.py) and pages are rebuilt after a new asset build.
+"""
+import hashlib
+import os
+import re
+import threading
+
+HEADER_FILE = os.path.join('includes', 'header.html')
+FOOTER_FILE = os.path.join('includes', 'footer.html')
+
+# Placeholder div followed by the inline <script> that fetches the include
+HEADER_INCLUDE = re.compile(
+    r'(<div id="site-header"[^>]*>)</div>\s*'
+    r'<script>(?:(?!</script>).)*?includes/header\.html(?:(?!</script>).)*</script>',
+    re.S
+)
+FOOTER_INCLUDE = re.compile(
+    r'(<div id="site-footer"[^>]*>)</div>\s*'
+    r'<script>(?:(?!</script>).)*?includes/footer\.html(?:(?!</script>).)*</script>',
+    re.S
+)
+
+
+class CachedPage:
+    """Assembled page bytes plus the source mtimes they were built from"""
+
+    __slots__ = ('body', 'etag', 'mtimes', 'last_modified')
+
+    def __init__(self, body, mtimes):
+        self.body = body
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.mtimes = mtimes
+        self.last_modified = max(mtimes)
+
+
+class PageCache:
+    """In-memory cache of assembled HTML pages keyed by path"""
+
+    def __init__(self, root, asset_manifest=None):
+        """
+        Args:
+            root: Site root directory that contains pages/ and includes/
+            asset_manifest: Optional AssetManifest used to rewrite asset URLs
+        """
+        self.root = root
+        self.asset_manifest = asset_manifest
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def _sources(self, filename):
+        return (
+            os.path.join(self.root, filename),
+            os.path.join(self.root, HEADER_FILE),
+            os.path.join(self.root, FOOTER_FILE),
+        )
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return 0.0
+
+    def _read(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def _build(self, filename, mtimes):
+        page_path, header_path, footer_path = self._sources(filename)
+        html = self._read(page_path)
+
+        # Only read the includes when the page actually has placeholders
+        if HEADER_INCLUDE.search(html):
+            header = self._read(header_path)
+            html = HEADER_INCLUDE.sub(lambda m: m.group(1) + header + '</div>', html, count=1)
+        if FOOTER_INCLUDE.search(html):
+            footer = self._read(footer_path)
+            html = FOOTER_INCLUDE.sub(lambda m: m.group(1) + footer + '</div>', html, count=1)
+        if self.asset_manifest is not None:
+            html = self.asset_manifest.rewrite(html)
+
+        return CachedPage(html.encode('utf-8'), mtimes)
+
+    def get(self, filename):
+        """
+        Return the assembled page, rebuilding it if any source changed
+
+        Args:
+            filename: Page path relative to the site root (e.g. 'pages/About.html')
+
+        Returns:
+            CachedPage
+
+        Raises:
+            FileNotFoundError: If the page itself does not exist
+        """
+        page_path, header_path, footer_path = self._sources(filename)
+        mtimes = (
+            os.stat(page_path).st_mtime,
+            self._mtime(header_path),
+            self._mtime(footer_path),
+            self.asset_manifest.mtime if self.asset_manifest is not None else 0.0,
+        )
+
+        page = self._pages.get(filename)
+        if page is not None and page.mtimes == mtimes:
+            return page
+
+        with self._lock:
+            page = self._pages.get(filename)
+            if page is None or page.mtimes != mtimes:
+                page = self._build(filename, mtimes)
+                self._pages[filename] = page
+        return page
+
+    def clear(self):
+        """Drop every cached page"""
+        with self._lock:
+            self._pages.clear()
@@ -0,0 +1,121 @@
+"""
+Token-bucket load shedding for the public form endpoints
+
+Each client IP gets a bucket in a bounded LRU map, and one global bucket
+caps the total rate. A request that finds either bucket empty is shed
+with 429 and Retry-After before its body is parsed, so a bot flood
+cannot occupy the worker threads and database writer real customers need.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+
+def client_address(remote_addr, forwarded_for, proxy_hops):
+    """
+    Address to key a client's bucket on
+
+    Only the last proxy_hops entries of X-Forwarded-For were appended by
+    our own proxies; anything to their left came from the client and can
+    be forged, so the entry proxy_hops from the right is used (the
+    address the outermost trusted proxy saw), as werkzeug's ProxyFix does.
+
+    Args:
+        remote_addr: Peer address of the connection
+        forwarded_for: X-Forwarded-For header value, or None
+        proxy_hops: Number of trusted proxies in front of the app (0: none)
+
+    Returns:
+        Client address, or remote_addr if the header is missing or too short
+    """
+    if proxy_hops and forwarded_for:
+        addresses = [address.strip() for address in forwarded_for.split(',')]
+        if len(addresses) >= proxy_hops:
+            return addresses[-proxy_hops]
+    return remote_addr
+
+
+class TokenBucket:
+    """Refills at rate tokens/second up to capacity"""
+
+    __slots__ = ('rate', 'capacity', 'tokens', 'updated')
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """Seconds until one token is available"""
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    """Per-client and global token buckets with shed counters"""
+
+    def __init__(self, client_rate, client_burst, global_rate, global_burst, max_clients=10000):
+        """
+        Args:
+            client_rate: Requests per second allowed per client IP
+            client_burst: Requests a client IP may send back to back
+            global_rate: Requests per second allowed across all clients
+            global_burst: Burst size across all clients
+            max_clients: Client buckets kept before the least recently seen is evicted
+        """
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_clients = max_clients
+        self._clients = OrderedDict()
+        self._global = TokenBucket(global_rate, global_burst, time.monotonic())
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.shed_client = 0
+        self.shed_global = 0
+
+    def check(self, client):
+        """
+        Take a token for client if both its bucket and the global bucket allow it
+
+        Returns:
+            (allowed, retry_after) where retry_after is whole seconds to wait
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._clients.get(client)
+            if bucket is None:
+                bucket = TokenBucket(self.client_rate, self.client_burst, now)
+                self._clients[client] = bucket
+                if len(self._clients) > self.max_clients:
+                    self._clients.popitem(last=False)
+            else:
+                self._clients.move_to_end(client)
+                bucket.refill(now)
+            self._global.refill(now)
+
+            if bucket.tokens < 1:
+                self.shed_client += 1
+                return False, math.ceil(bucket.wait_time())
+            if self._global.tokens < 1:
+                self.shed_global += 1
+                return False, math.ceil(self._global.wait_time())
+
+            bucket.tokens -= 1
+            self._global.tokens -= 1
+            self.allowed += 1
+            return True, 0
+
+    def stats(self):
+        """Return allowed/shed counters and the number of tracked clients"""
+        with self._lock:
+            return {
+                'allowed': self.allowed,
+                'shed_client': self.shed_client,
+                'shed_global': self.shed_global,
+                'tracked_clients': len(self._clients)
+            }
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Minimal local SMTP server that accepts and keeps every message
+
+A stand-in mail server for the notification outbox (outbox.py): it
+speaks enough SMTP for smtplib (EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP,
+QUIT), prints a line per message and counts connections, so connection
+reuse and batching can be checked. Point the app at it with
+MAIL_SMTP_HOST=127.0.0.1 MAIL_SMTP_PORT=<port>.
+
+Usage:
+    python3 smtp_sink.py [--port 8025] [--save-dir DIR] [--fail-first N]
+
+    --save-dir    also write each message to DIR as <n>.eml
+    --fail-first  answer the first N messages with 451 (temporary
+                  failure), to watch the outbox retry them
+"""
+import argparse
+import email
+import email.policy
+import os
+import re
+import socketserver
+import threading
+
+ADDRESS = re.compile(r'<([^>]*)>')
+
+
+class SMTPSinkState:
+    """Messages and counters shared by all sink connections"""
+
+    def __init__(self, save_dir=None, fail_first=0, quiet=False):
+        self.lock = threading.Lock()
+        self.save_dir = save_dir
+        self.fail_first = fail_first
+        self.quiet = quiet
+        self.messages = []
+        self.rejected = 0
+        self.connections = 0
+
+    def deliver(self, mail_from, rcpt_to, data):
+        """Keep a message; returns False if it is to be refused"""
+        with self.lock:
+            if self.fail_first > 0:
+                self.fail_first -= 1
+                self.rejected += 1
+                return False
+            message = email.message_from_bytes(data, policy=email.policy.default)
+            self.messages.append({'from': mail_from, 'to': rcpt_to, 'message': message})
+            number = len(self.messages)
+        if self.save_dir:
+            os.makedirs(self.save_dir, exist_ok=True)
+            with open(os.path.join(self.save_dir, f'{number}.eml'), 'wb') as f:
+                f.write(data)
+        if not self.quiet:
+            print(f"#{number} {mail_from} -> {', '.join(rcpt_to)}: {message['Subject']}", flush=True)
+        return True
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def reply(self, line):
+        self.wfile.write(line.encode('ascii') + b'\r\n')
+
+    def read_data(self):
+        """Read a DATA payload up to the lone '.' line, undoing dot-stuffing"""
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                return b''.join(lines), bool(line)
+            lines.append(line[1:] if line.startswith(b'.') else line)
+
+    def handle(self):
+        self.reply('220 localhost SMTP sink ready')
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline(65536)
+            if not line:
+                return
+            command, _, argument = line.decode('utf-8', 'replace').rstrip('\r\n').partition(' ')
+            command = command.upper()
+            if command == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250-8BITMIME')
+                self.reply('250 SMTPUTF8')
+            elif command == 'HELO':
+                self.reply('250 localhost')
+            elif command == 'MAIL':
+                match = ADDRESS.search(argument)
+                mail_from, rcpt_to = (match.group(1) if match else argument), []
+                self.reply('250 OK')
+            elif command == 'RCPT':
+                if mail_from is None:
+                    self.reply('503 Need MAIL first')
+                    continue
+                match = ADDRESS.search(argument)
+                rcpt_to.append(match.group(1) if match else argument)
+                self.reply('250 OK')
+            elif command == 'DATA':
+                if mail_from is None or not rcpt_to:
+                    self.reply('503 Need MAIL and RCPT first')
+                    continue
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data, complete = self.read_data()
+                if not complete:
+                    return
+                if self.server.state.deliver(mail_from, rcpt_to, data):
+                    self.reply('250 OK: queued')
+                else:
+                    self.reply('451 Temporary failure, try again later')
+                mail_from, rcpt_to = None, []
+            elif command == 'RSET':
+                mail_from, rcpt_to = None, []
+                self.reply('250 OK')
+            elif command == 'NOOP':
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSinkServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def start_sink(port=0, **options):
+    """Start the sink in a background thread and return the server (options as SMTPSinkState)"""
+    server = SMTPSinkServer(('127.0.0.1', port), SMTPSinkHandler)
+    server.state = SMTPSinkState(**options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--save-dir')
+    parser.add_argument('--fail-first', type=int, default=0)
+    args = parser.parse_args()
+    server = SMTPSinkServer(('127.0.0.1', args.port), SMTPSinkHandler)
+    server.state = SMTPSinkState(save_dir=args.save_dir, fail_first=args.fail_first)
+    print(f"SMTP sink listening on 127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+"""
+In-memory static asset cache for the catch-all static route
+
+Files under assets/ and public/ are read once, hashed for a strong ETag,
+precompressed with gzip (and brotli when the package is installed) and
+kept in a bounded LRU. Conditional requests are answered with 304 from
+memory, so a hot file never touches the filesystem on the request path.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Types worth compressing; images like PNG are already compressed
+COMPRESSIBLE_TYPES = {
+    'application/javascript',
+    'application/json',
+    'application/xml',
+    'image/svg+xml',
+    'text/css',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+    'text/xml',
+}
+
+# Skip tiny files, the encoding overhead outweighs the savings
+MIN_COMPRESS_SIZE = 256
+
+
+class StaticEntry:
+    """A cached file with its encoded variants"""
+
+    __slots__ = ('path', 'mtime', 'size', 'mimetype', 'etag', 'bodies', 'checked_at', 'nbytes')
+
+    def __init__(self, path, mtime, size, mimetype, etag, bodies):
+        self.path = path
+        self.mtime = mtime
+        self.size = size
+        self.mimetype = mimetype
+        self.etag = etag
+        self.bodies = bodies
+        self.checked_at = time.monotonic()
+        self.nbytes = sum(len(body) for body in bodies.values())
+
+
+class StaticCache:
+    """Bounded LRU of precompressed static files"""
+
+    def __init__(self, root, dirs=('assets', 'public'), max_bytes=32 * 1024 * 1024,
+                 max_file_size=2 * 1024 * 1024, check_interval=1.0):
+        """
+        Args:
+            root: Site root directory
+            dirs: Top-level directories whose files are cached
+            max_bytes: Upper bound on cached bytes across all variants
+            max_file_size: Larger files are left to send_from_directory
+            check_interval: Seconds between mtime checks of a cached file
+        """
+        self.root = root
+        self.dirs = tuple(d.strip('/') + '/' for d in dirs)
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.check_interval = check_interval
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def handles(self, filename):
+        """Return True if filename falls under one of the cached directories"""
+        return filename.startswith(self.dirs)
+
+    def _load(self, filename):
+        path = safe_join(self.root, filename)
+        if path is None or not os.path.isfile(path):
+            return None
+
+        stat = os.stat(path)
+        if stat.st_size > self.max_file_size:
+            return None
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        bodies = {'identity': raw}
+        if mimetype in COMPRESSIBLE_TYPES and len(raw) >= MIN_COMPRESS_SIZE:
+            gzipped = gzip.compress(raw, compresslevel=9, mtime=0)
+            if len(gzipped) < len(raw):
+                bodies['gzip'] = gzipped
+            if brotli is not None:
+                brotlied = brotli.compress(raw, quality=11)
+                if len(brotlied) < len(raw):
+                    bodies['br'] = brotlied
+
+        etag = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        return StaticEntry(path, stat.st_mtime, stat.st_size, mimetype, etag, bodies)
+
+    def _is_fresh(self, entry):
+        now = time.monotonic()
+        if now - entry.checked_at < self.check_interval:
+            return True
+        try:
+            stat = os.stat(entry.path)
+        except OSError:
+            return False
+        if stat.st_mtime != entry.mtime or stat.st_size != entry.size:
+            return False
+        entry.checked_at = now
+        return True
+
+    def _store(self, filename, entry):
+        with self._lock:
+            old = self._entries.pop(filename, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._entries[filename] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def get(self, filename):
+        """
+        Return the cached entry for filename, loading it if needed
+
+        Returns:
+            StaticEntry, or None if the file is missing or not cacheable
+        """
+        entry = self._entries.get(filename)
+        if entry is not None and self._is_fresh(entry):
+            with self._lock:
+                if filename in self._entries:
+                    self._entries.move_to_end(filename)
+            return entry
+
+        entry = self._load(filename)
+        if entry is None:
+            with self._lock:
+                old = self._entries.pop(filename, None)
+                if old is not None:
+                    self._bytes -= old.nbytes
+            return None
+
+        self._store(filename, entry)
+        return entry
+
+    def warm(self):
+        """Load and precompress every cacheable file up front"""
+        for directory in self.dirs:
+            top = os.path.join(self.root, directory)
+            for dirpath, _, filenames in os.walk(top):
+                for name in filenames:
+                    if name.startswith('.'):
+                        continue
+                    full = os.path.join(dirpath, name)
+                    self.get(os.path.relpath(full, self.root).replace(os.sep, '/'))
+
+    def serve(self, filename, request):
+        """
+        Build a response for filename from the cache
+
+        Args:
+            filename: Path relative to the site root
+            request: Current request, used for content negotiation and conditionals
+
+        Returns:
+            Response, or None if the caller should fall back to the filesystem
+        """
+        entry = self.get(filename)
+        if entry is None:
+            return None
+
+        encoding = 'identity'
+        accepted = request.accept_encodings
+        if 'br' in entry.bodies and accepted['br']:
+            encoding = 'br'
+        elif 'gzip' in entry.bodies and accepted['gzip']:
+            encoding = 'gzip'
+
+        response = Response(entry.bodies[encoding], mimetype=entry.mimetype)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        if len(entry.bodies) > 1:
+            response.vary.add('Accept-Encoding')
+
+        # Strong ETags must differ per representation
+        etag = entry.etag if encoding == 'identity' else f'{entry.etag}-{encoding}'
+        response.set_etag(etag)
+        response.last_modified = int(entry.mtime)
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+    def stats(self):
+        """Return entry and byte counts for the cache"""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
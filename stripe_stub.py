@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Minimal local stand-in for the Stripe API
+
+Implements just the calls api/create-checkout makes (price lookup,
+product/price creation, Checkout Session create/retrieve/expire) with
+Idempotency-Key support as Stripe does it: a replay answers with the
+original object and Idempotent-Replayed: true, and reusing a key with
+different params is an idempotency_error. Requests and TCP connections
+are counted so client reuse can be checked. Point the function at it with
+STRIPE_API_BASE=http://127.0.0.1:<port>.
+
+Usage:
+    python3 stripe_stub.py [--port 12111]
+    GET /__stats  -> request and connection counters
+"""
+import argparse
+import itertools
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+class StripeStubState:
+    """Objects and counters shared by all stub connections"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.products = {}
+        self.prices = {}
+        self.sessions = {}
+        self.idempotent = {}
+        self.requests = {}
+        self.connections = 0
+
+    def new_id(self, prefix):
+        return f'{prefix}_stub{next(self.ids)}'
+
+
+class StripeStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible
+    disable_nagle_algorithm = True  # headers and body are separate writes
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, data, replayed=False):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if replayed:
+            self.send_header('Idempotent-Replayed', 'true')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _count(self, route):
+        state = self.server.state
+        with state.lock:
+            state.requests[route] = state.requests.get(route, 0) + 1
+
+    def do_GET(self):
+        state = self.server.state
+        url = urlsplit(self.path)
+        query = dict(parse_qsl(url.query))
+
+        if url.path == '/__stats':
+            with state.lock:
+                self._send(200, {'requests': dict(state.requests), 'connections': state.connections})
+            return
+
+        if url.path == '/v1/prices':
+            self._count('GET /v1/prices')
+            lookup_keys = {v for k, v in query.items() if k.startswith('lookup_keys')}
+            with state.lock:
+                data = [p for p in state.prices.values() if p['lookup_key'] in lookup_keys]
+            self._send(200, {'object': 'list', 'url': '/v1/prices', 'has_more': False, 'data': data})
+            return
+
+        if url.path.startswith('/v1/checkout/sessions/'):
+            self._count('GET /v1/checkout/sessions/:id')
+            session = state.sessions.get(url.path.rsplit('/', 1)[-1])
+            if session is None:
+                self._send(404, {'error': {'type': 'invalid_request_error', 'message': 'No such session'}})
+            else:
+                self._send(200, session)
+            return
+
+        self._send(404, {'error': {'type': 'invalid_request_error', 'message': 'Unrecognized request URL'}})
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length', 0))
+        pairs = parse_qsl(self.rfile.read(length).decode())
+        params = dict(pairs)
+        path = urlsplit(self.path).path
+        idempotency_key = self.headers.get('Idempotency-Key')
+
+        with state.lock:
+            replay = state.idempotent.get((path, idempotency_key)) if idempotency_key else None
+        if replay is not None:
+            replay_pairs, obj = replay
+            if replay_pairs != pairs:
+                self._count(f'POST {path} (idempotency error)')
+                self._send(400, {'error': {
+                    'type': 'idempotency_error',
+                    'message': 'Keys for idempotent requests can only be used with the same parameters'
+                }})
+                return
+            self._count(f'POST {path} (idempotent replay)')
+            self._send(200, obj, replayed=True)
+            return
+
+        with state.lock:
+            if path == '/v1/products':
+                obj = {'id': state.new_id('prod'), 'object': 'product', 'name': params.get('name')}
+                state.products[obj['id']] = obj
+            elif path == '/v1/prices':
+                obj = {
+                    'id': state.new_id('price'),
+                    'object': 'price',
+                    'active': True,
+                    'currency': params.get('currency'),
+                    'unit_amount': int(params.get('unit_amount', 0)),
+                    'product': params.get('product'),
+                    'lookup_key': params.get('lookup_key')
+                }
+                state.prices[obj['id']] = obj
+            elif path == '/v1/checkout/sessions':
+                session_id = state.new_id('cs_test')
+                obj = {
+                    'id': session_id,
+                    'object': 'checkout.session',
+                    'status': 'open',
+                    'url': f'http://127.0.0.1:{self.server.server_address[1]}/pay/{session_id}',
+                    'customer_email': params.get('customer_email')
+                }
+                state.sessions[session_id] = obj
+            elif path.startswith('/v1/checkout/sessions/') and path.endswith('/expire'):
+                session = state.sessions.get(path.split('/')[-2])
+                if session is None:
+                    self._send(404, {'error': {'type': 'invalid_request_error', 'message': 'No such session'}})
+                    return
+                session['status'] = 'expired'
+                obj = dict(session)
+            else:
+                self._send(404, {'error': {'type': 'invalid_request_error', 'message': 'Unrecognized request URL'}})
+                return
+
+            if idempotency_key:
+                state.idempotent[(path, idempotency_key)] = (pairs, dict(obj))
+        self._count(f'POST {path}')
+        self._send(200, obj)
+
+
+def start_stub(port=0):
+    """Start the stub in a background thread and return the server"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StripeStubHandler)
+    server.state = StripeStubState()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=12111)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StripeStubHandler)
+    server.state = StripeStubState()
+    print(f"Stripe stub listening on http://127.0.0.1:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
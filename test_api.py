@@ -1,9 +1,19 @@
 #!/usr/bin/env python3
 """
 Simple test script to verify API endpoints are working
+
+The live checks at the top call a running server (python app.py); the
+Flask test-client tests below build their own app on a temporary
+database and run under pytest.
 """
 import requests
 import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
 
 BASE_URL = "http://localhost:5001"
 
@@ -61,6 +71,305 @@ def test_quote_submission():
         print(f"\n✗ Quote Form Test Failed: {e}")
         return False
 
+def test_submission_pagination():
+    """Test keyset pagination of the contact submission list"""
+    try:
+        response = requests.get(f"{BASE_URL}/api/submissions/contact", params={"limit": 1})
+        data = response.json()
+        print(f"\n✓ Contact Submissions Page: {response.status_code}")
+        print(f"  Rows: {len(data['submissions'])}, has_more: {data['has_more']}")
+        if data['has_more']:
+            response = requests.get(
+                f"{BASE_URL}/api/submissions/contact",
+                params={"limit": 1, "before": data['next_before']}
+            )
+            print(f"✓ Next Page: {response.status_code}")
+        return response.status_code == 200
+    except Exception as e:
+        print(f"\n✗ Pagination Test Failed: {e}")
+        return False
+
+# ----- Flask test-client tests (pytest) -----
+
+CONTACT = {"name": "Test User", "email": "test@example.com", "message": "This is a test message"}
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """App from create_app('testing') on a fresh database file"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from app import create_app
+    return create_app("testing")
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def add_contacts(app, count, start=datetime(2026, 1, 1), step=timedelta(minutes=1), read=False):
+    """Insert contact submissions directly, oldest first; returns their ids"""
+    from models import db, ContactSubmission
+    with app.app_context():
+        rows = [
+            ContactSubmission(name=f"n{i}", email="a@example.com", message=f"m{i}",
+                              submitted_at=start + step * i, read=read)
+            for i in range(count)
+        ]
+        db.session.add_all(rows)
+        db.session.commit()
+        return [row.id for row in rows]
+
+
+def list_all(client, limit, **params):
+    """Follow next_before cursors through every page; returns the ids in order"""
+    ids, before = [], None
+    while True:
+        query = dict(params, limit=limit, **({"before": before} if before else {}))
+        response = client.get("/api/submissions/contact", query_string=query)
+        assert response.status_code == 200
+        data = response.get_json()
+        ids += [row["id"] for row in data["submissions"]]
+        if not data["has_more"]:
+            assert data["next_before"] is None
+            return ids
+        before = data["next_before"]
+
+
+def test_keyset_cursor_pages(app, client):
+    """Pages follow (submitted_at, id) newest first, ties included, without gaps or repeats"""
+    ids = add_contacts(app, 5) + add_contacts(app, 4, step=timedelta(0))
+    # The last four share ids[0]'s timestamp, so that group is ordered by id alone
+    expected = sorted(ids[1:5], reverse=True) + sorted([ids[0]] + ids[5:], reverse=True)
+    assert list_all(client, 2) == expected
+    assert list_all(client, 200) == expected
+
+
+@pytest.mark.parametrize("cursor", [
+    "garbage",
+    "_5",
+    "2026-01-01T00:00:00_abc",
+    "2026-13-01T00:00:00_1",
+    "2026-01-01T00:00:00_" + "9" * 30,
+])
+def test_keyset_bad_cursors(client, cursor):
+    """Malformed cursors, and ids SQLite cannot bind, get 400 rather than 500"""
+    response = client.get("/api/submissions/contact", query_string={"before": cursor})
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.get_json()["error"]
+
+
+def test_keyset_cursor_outside_data(app, client):
+    """Cursors before or after every row are valid and select all or nothing"""
+    ids = add_contacts(app, 3)
+    future = client.get("/api/submissions/contact", query_string={"before": "9999-12-31T23:59:59_1"})
+    assert [row["id"] for row in future.get_json()["submissions"]] == sorted(ids, reverse=True)
+    past = client.get("/api/submissions/contact", query_string={"before": "0001-01-01T00:00:00_1"})
+    assert past.get_json()["submissions"] == []
+    assert client.get("/api/submissions/contact", query_string={"read": "maybe"}).status_code == 400
+
+
+def test_idempotency_key_dedupe(client):
+    """A repeated Idempotency-Key or identical content gets the original id back"""
+    first = client.post("/api/contact", json=CONTACT, headers={"Idempotency-Key": "abc"})
+    assert first.status_code == 201
+    again = client.post("/api/contact", json=dict(CONTACT, message="edited"), headers={"Idempotency-Key": "abc"})
+    assert again.status_code == 200
+    assert again.get_json()["duplicate"] is True
+    assert again.get_json()["id"] == first.get_json()["id"]
+
+    assert client.post("/api/contact", json=CONTACT, headers={"Idempotency-Key": "def"}).status_code == 201
+
+    # Without a key, content differing only in case and spacing is a repeat
+    first = client.post("/api/contact", json=dict(CONTACT, message="  THIS is a test   message "))
+    assert first.status_code == 201
+    again = client.post("/api/contact", json=CONTACT)
+    assert again.status_code == 200
+    assert again.get_json()["id"] == first.get_json()["id"]
+
+
+def test_idempotency_key_concurrent(app):
+    """Simultaneous repeats store one submission and all answer with its id"""
+    from models import ContactSubmission
+    barrier = threading.Barrier(8)
+    results = []
+
+    def post():
+        client = app.test_client()
+        barrier.wait()
+        response = client.post("/api/contact", json=CONTACT, headers={"Idempotency-Key": "same"})
+        results.append((response.status_code, response.get_json()["id"]))
+
+    threads = [threading.Thread(target=post) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(status for status, _ in results) == [200] * 7 + [201]
+    assert len({submission_id for _, submission_id in results}) == 1
+    with app.app_context():
+        assert ContactSubmission.query.count() == 1
+
+
+def test_expired_dedupe_key_is_reused(app, client):
+    """Once its window has passed, a key stores a new submission"""
+    from models import db, SubmissionDedupe
+    first = client.post("/api/contact", json=CONTACT, headers={"Idempotency-Key": "abc"})
+    with app.app_context():
+        SubmissionDedupe.query.update({SubmissionDedupe.expires_at: datetime(2000, 1, 1)})
+        db.session.commit()
+    second = client.post("/api/contact", json=CONTACT, headers={"Idempotency-Key": "abc"})
+    assert second.status_code == 201
+    assert second.get_json()["id"] != first.get_json()["id"]
+
+
+def test_bulk_mark_read(app, client):
+    """ids and before each update in one statement; only changed rows are counted"""
+    ids = add_contacts(app, 4)
+    response = client.put("/api/submissions/contact/read", json={"ids": ids[:2]})
+    assert response.get_json() == {"success": True, "updated": 2}
+    assert client.put("/api/submissions/contact/read", json={"ids": ids[:2]}).get_json()["updated"] == 0
+
+    before = (datetime(2026, 1, 1) + timedelta(minutes=3)).isoformat()
+    response = client.put("/api/submissions/contact/read", json={"before": before})
+    assert response.get_json()["updated"] == 1
+    stats = client.get("/api/submissions/stats").get_json()["stats"]
+    assert (stats["contact_total"], stats["contact_unread"]) == (4, 1)
+
+    response = client.put("/api/submissions/contact/read", json={"ids": ids, "read": False})
+    assert response.get_json()["updated"] == 3
+    listed = client.get("/api/submissions/contact", query_string={"read": "false"}).get_json()
+    assert len(listed["submissions"]) == 4
+
+
+@pytest.mark.parametrize("body", [
+    {"ids": [True]},
+    {"ids": [1, "2"]},
+    {"ids": 1},
+    {"ids": [1], "before": "2026-01-01T00:00:00"},
+    {},
+    {"ids": [1], "read": "yes"},
+    {"before": "yesterday"},
+])
+def test_bulk_mark_read_rejects(client, body):
+    assert client.put("/api/submissions/contact/read", json=body).status_code == 400
+
+
+def test_dashboard_not_modified(app, client):
+    """A matching If-None-Match gets 304 until a submission changes the counters"""
+    add_contacts(app, 2)
+    first = client.get("/api/dashboard")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert len(first.get_json()["contact"]["submissions"]) == 2
+
+    cached = client.get("/api/dashboard", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+    # The page size is part of the ETag
+    assert client.get("/api/dashboard?limit=1", headers={"If-None-Match": etag}).status_code == 200
+
+    client.post("/api/contact", json=CONTACT)
+    changed = client.get("/api/dashboard", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_streaming_export(app, client, monkeypatch):
+    """Exports stream every row in id order, in batches, as NDJSON or CSV"""
+    import api
+    monkeypatch.setattr(api, "EXPORT_BATCH_SIZE", 2)
+    ids = add_contacts(app, 5)
+
+    response = client.get("/api/submissions/contact/export")
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [row["id"] for row in rows] == ids
+    assert rows[0]["submitted_at"] == "2026-01-01T00:00:00"
+
+    response = client.get("/api/submissions/contact/export", query_string={"format": "csv"})
+    lines = response.data.decode().splitlines()
+    assert response.mimetype == "text/csv"
+    assert lines[0].split(",")[0] == "id"
+    assert len(lines) == 6
+
+    assert client.get("/api/submissions/contact/export?format=xml").status_code == 400
+    assert client.get("/api/submissions/nope/export").status_code == 404
+
+
+def test_include_archived(app, client, monkeypatch):
+    """Archived rows leave the default lists and exports but come back with include_archived"""
+    import api
+    from archive import archive_submissions
+    monkeypatch.setattr(api, "EXPORT_BATCH_SIZE", 2)
+    old = add_contacts(app, 4, start=datetime(2020, 1, 1), read=True)
+    new = add_contacts(app, 2)
+    with app.app_context():
+        moved = archive_submissions(older_than_days=30, kinds=["contact"])
+    assert moved == {"contact": 4}
+
+    assert list_all(client, 2) == sorted(new, reverse=True)
+    assert list_all(client, 2, include_archived="true") == sorted(old + new, reverse=True)
+    assert client.get("/api/submissions/contact?include_archived=maybe").status_code == 400
+
+    def exported(**params):
+        response = client.get("/api/submissions/contact/export", query_string=params)
+        return [json.loads(line)["id"] for line in response.data.decode().splitlines()]
+
+    assert exported() == new
+    assert exported(include_archived="true") == sorted(old + new)
+    stats = client.get("/api/submissions/stats?include_archived=true").get_json()["stats"]
+    assert (stats["contact_total"], stats["contact_archived"]) == (6, 4)
+
+
+def spill_record(i, key=None):
+    return {
+        "id": f"provisional{i}",
+        "kind": "contact",
+        "submitted_at": "2026-01-01T00:00:00",
+        "fields": {"name": f"n{i}", "email": "a@example.com", "message": f"m{i}"},
+        "dedupe": [key, 600] if key else None
+    }
+
+
+def test_ingest_replay(app, tmp_path):
+    """Leftover and orphaned spill records are committed by the writer; torn tails are dropped"""
+    from ingest import IngestQueue
+    from models import ContactSubmission
+    from api import find_duplicate
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir()
+    with open(spill_dir / "ingest-0.log", "wb") as f:
+        for i in range(5):
+            f.write((json.dumps(spill_record(i, key=f"k{i}")) + "\n").encode())
+        f.write(b'{"torn')
+    (spill_dir / "ingest-1.log").write_bytes((json.dumps(spill_record(9)) + "\n").encode())
+
+    queue = IngestQueue(app, str(spill_dir), batch_size=2, fsync=False)
+    queue.start()
+    # A repeat of a leftover record is answered before the writer has reached it
+    assert queue.submit("contact", spill_record(0)["fields"], ("k0", 600)) == "provisional0"
+    new_id = queue.submit("contact", {"name": "new", "email": "a@example.com", "message": "new"})
+    deadline = time.monotonic() + 10
+    while queue.pending() or queue.committed < 6:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    queue.close()
+
+    with app.app_context():
+        names = sorted(row.name for row in ContactSubmission.query)
+        assert names == ["n0", "n1", "n2", "n3", "n4", "n9", "new"]
+        # Repeats after the commit still get the provisional id
+        assert find_duplicate("k3") == "provisional3"
+    assert os.path.getsize(spill_dir / "ingest-0.log") == 0
+    assert os.path.getsize(spill_dir / "ingest-1.log") == 0
+    assert len(new_id) == 32
+
+
 if __name__ == "__main__":
     print("Testing Visualize Studio API Endpoints\n")
     print("=" * 50)
@@ -68,6 +377,7 @@ if __name__ == "__main__":
     if test_api_connection():
         test_contact_submission()
         test_quote_submission()
+        test_submission_pagination()
     
     print("\n" + "=" * 50)
     print("Test complete!")